@@ -0,0 +1,148 @@
+# assembler/autobase.py
+"""Automatic BASE placement.
+
+Lines whose operand is out of PC-relative reach either need a BASE
+register that covers them or get promoted to format 4 (see
+assembler.relax). plan_base() looks at where those far references point
+after Pass 1 and picks the label (or EQU * symbol) whose 4096-byte base
+window covers the most of them (a sliding window over the sorted targets). If the program
+never touches register B, it inserts
+
+    FIRST   LDB     #label
+            BASE    label
+
+at the entry point, relaxes the program both ways and keeps the
+version with the smaller image; otherwise the label is only suggested.
+"""
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from assembler.macros import MacroProcessor
+from assembler.parser import split_statement
+from assembler.pass1 import Pass1
+from assembler.relax import layout_of, address_lines, is_external
+
+BASE_REACH = 4095   # largest base-relative displacement
+
+
+class BasePlan:
+    """What plan_base() found, and the source to assemble"""
+
+    def __init__(self, lines):
+        self.lines = lines            # source lines, with LDB/BASE inserted if they pay off
+        self.label = None             # label the BASE register should hold, None if none helps
+        self.covered = 0              # far references its window reaches
+        self.promoted = 0             # format 4 promotions without it
+        self.promoted_with_base = 0   # ... and with it
+        self.saved = 0                # bytes the inserted LDB/BASE saved
+        self.applied = False
+        self.reason = ""              # why nothing was inserted
+
+    def summary(self):
+        if self.label is None:
+            return f"no BASE placed ({self.reason})"
+        if not self.applied:
+            return (f"BASE {self.label} would cover {self.covered} far references - "
+                    f"not inserted ({self.reason})")
+        return (f"BASE {self.label} covers {self.covered} far references: "
+                f"{self.promoted - self.promoted_with_base} format 4 promotions saved "
+                f"({self.promoted} -> {self.promoted_with_base}), {self.saved} bytes smaller")
+
+
+def relaxed(lines):
+    """Pass 1 with relaxation over lines"""
+    pass1 = Pass1()
+    pass1.assemble(lines, relax=True)
+    return pass1
+
+
+def best_base(pass1):
+    """(label, far references covered, far references) of the best base for a Pass 1 without promotions"""
+    layout = layout_of(pass1)
+    extrefs = pass1.symtab.extrefs
+    targets = []
+    for record, base in address_lines(pass1.intermediate):
+        if base is not None or (extrefs and is_external(record.symbol, extrefs)):
+            continue
+        target = layout.target(record.symbol, record.locctr)
+        if target is not None and not -2048 <= target - (record.locctr + 3) <= 2047:
+            targets.append(target)
+    targets.sort()
+
+    # Any label or EQU * style symbol can be the base: one that moves with the program
+    moved = layout_of(pass1)
+    moved.promote(-1)   # every address one byte on
+    bases = []
+    for name in chain(layout.labels, layout.equates):
+        address = layout.get(name)
+        if address is not None and moved.get(name) == address + 1:
+            bases.append((address, name))
+    bases.sort(key=lambda base: base[0])
+
+    best, covered = None, 0
+    for address, label in bases:
+        count = bisect_right(targets, address + BASE_REACH) - bisect_left(targets, address)
+        if count > covered:
+            best, covered = label, count
+    return best, covered, len(targets)
+
+
+def uses_register_b(records):
+    for record in records:
+        if record.mnemonic in ("LDB", "STB") or (record.format == 2 and "B" in record.operand.split(",")):
+            return True
+    return False
+
+
+def with_base(lines, records, label):
+    """lines with LDB #label / BASE label as the first statements executed, or None if no entry is found"""
+    start = next((record for record in records if record.mnemonic == "START"), None)
+    end = next((record for record in records if record.mnemonic == "END"), None)
+    entry = end.operand if end is not None else ""
+    setup = [f"        LDB     #{label}", f"        BASE    {label}"]
+    if not entry or (start is not None and entry == start.label):
+        # Execution starts at the first byte: right after START
+        at = next((i + 1 for i, line in enumerate(lines) if split_statement(line)[1] == "START"), 0)
+        return lines[:at] + setup + lines[at:]
+    for i, line in enumerate(lines):
+        line_label, opcode, operand, _ = split_statement(line)
+        if line_label == entry:
+            # The entry label moves to the LDB so it runs first
+            setup[0] = f"{entry:<7} LDB     #{label}"
+            return lines[:i] + setup + [f"        {opcode:<7} {operand}".rstrip()] + lines[i + 1:]
+    return None
+
+
+def plan_base(lines):
+    """Choose a BASE for lines (any iterable of source lines) and return a BasePlan"""
+    lines = list(MacroProcessor().expand(lines))
+    plan = BasePlan(lines)
+    pass1 = Pass1()
+    pass1.assemble(lines)
+    records = pass1.intermediate
+    if any(record.mnemonic in ("BASE", "CSECT") for record in records):
+        plan.reason = "the program places BASE itself" if any(record.mnemonic == "BASE" for record in records) \
+            else "control sections are not planned"
+        return plan
+
+    plan.label, plan.covered, far = best_base(pass1)
+    if plan.label is None:
+        plan.reason = f"no symbol within base reach of the {far} far references" if far else "no far references"
+        return plan
+    if uses_register_b(records):
+        plan.reason = "the program uses register B"
+        return plan
+    rewritten = with_base(lines, records, plan.label)
+    if rewritten is None:
+        plan.reason = "no entry point to load B at"
+        return plan
+
+    without, based = relaxed(lines), relaxed(rewritten)
+    plan.promoted, plan.promoted_with_base = without.promoted, based.promoted
+    saved = (without.locctr - without.start_addr) - (based.locctr - based.start_addr)
+    if saved <= 0:
+        plan.reason = f"LDB costs more than it saves: {without.promoted} -> {based.promoted} promotions"
+        return plan
+    plan.lines = rewritten
+    plan.saved = saved
+    plan.applied = True
+    return plan
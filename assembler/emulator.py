@@ -0,0 +1,458 @@
+# assembler/emulator.py
+"""SIC/XE emulator with a predecoded instruction cache.
+
+An instruction is decoded the first time it is reached: its format,
+opcode, n/i/x/b/p/e bits and displacement are turned into one Python
+closure that performs the operation and returns the next PC, with the
+target address folded into a constant wherever it does not depend on a
+register. Later visits only look the closure up by address. A write into
+memory that holds cached code drops the affected entries, so
+self-modifying programs still run correctly.
+
+With blocks=True straight-line runs of instructions (up to a jump or a
+store) are chained into a single closure as well, saving the dispatch
+between them.
+
+Floating point, SVC and the I/O channel instructions (SIO/TIO/HIO) are
+not emulated.
+"""
+from assembler.tables import INSTRUCTION_TABLE
+
+MEMORY_SIZE = 1 << 20    # SIC/XE has 2^20 bytes of memory
+MASK = 0xFFFFFF          # registers and words are 24 bits
+HALT = MASK              # return address that stops the machine (L starts here)
+MAX_BLOCK = 64           # instructions chained into one block closure at most
+A, X, L, B, S, T, F, PC, SW = 0, 1, 2, 3, 4, 5, 6, 8, 9
+
+# First byte (n/i bits cleared) -> (mnemonic, format)
+OPCODES = {instr.opcode: (instr.mnemonic, instr.format) for instr in INSTRUCTION_TABLE.values()}
+
+
+def signed(value):
+    """A 24-bit word as a signed integer"""
+    return value - 0x1000000 if value & 0x800000 else value
+
+
+def compare(a, b):
+    """Condition code of comparing a with b: -1 (<), 0 (=) or 1 (>)"""
+    a, b = signed(a), signed(b)
+    return (a > b) - (a < b)
+
+
+class Emulator:
+    def __init__(self, memory_size=MEMORY_SIZE, blocks=False):
+        self.memory = bytearray(memory_size)
+        self.code = bytearray(memory_size)   # 1 for every byte of a cached instruction
+        self.registers = [0] * 10            # A X L B S T F - PC SW (PC lives in self.pc)
+        self.registers[L] = HALT
+        self.cc = 0                          # condition code: -1 (<), 0 (=), 1 (>)
+        self.pc = 0
+        self.steps = 0                       # instructions executed so far
+        self.devices = {}                    # device number -> bytearray (RD takes from the front, WD appends)
+        self.decoded = {}                    # address -> (handler, size)
+        self.blocks = {} if blocks else None # address -> (handler, instruction count)
+
+    # ----------------------------------------------------
+    # MEMORY
+    # ----------------------------------------------------
+    def load(self, image, address=0):
+        """Copy a memory image (e.g. LinkingLoader.memory) in at address"""
+        self.memory[address:address + len(image)] = image
+        self.invalidate(address, len(image))
+
+    def word(self, address):
+        return int.from_bytes(self.memory[address:address + 3], "big")
+
+    def store(self, address, data):
+        """Write bytes to memory, dropping cached instructions they overwrite"""
+        self.memory[address:address + len(data)] = data
+        if self.code.find(1, address, address + len(data)) >= 0:
+            self.invalidate(address, len(data))
+
+    def invalidate(self, address, length):
+        """Forget decoded instructions overlapping address..address+length-1"""
+        decoded = self.decoded
+        for start in range(max(0, address - 3), address + length):
+            entry = decoded.pop(start, None)
+            if entry is not None:
+                self.code[start:start + entry[1]] = bytes(entry[1])
+        if self.blocks:
+            self.blocks.clear()
+
+    # ----------------------------------------------------
+    # DEVICES
+    # ----------------------------------------------------
+    def read_device(self, device):
+        data = self.devices.get(device)
+        if not data:
+            return 0   # nothing left to read: end of record
+        value = data[0]
+        del data[0]
+        return value
+
+    def write_device(self, device, value):
+        self.devices.setdefault(device, bytearray()).append(value)
+
+    # ----------------------------------------------------
+    # EXECUTION
+    # ----------------------------------------------------
+    def run(self, start=None, max_steps=None):
+        """Execute from start (default: the current PC) until the machine halts.
+
+        The machine halts when it returns to HALT (RSUB or J @RETADR from
+        the top level, since L starts there) or reaches a jump to itself
+        (J *). max_steps bounds the instructions executed (checked between
+        blocks when blocks are enabled). Returns the instructions executed.
+        """
+        pc = self.pc if start is None else start
+        limit = max_steps if max_steps is not None else float("inf")
+        decoded = self.decoded
+        blocks = self.blocks
+        steps = 0
+        while pc != HALT and steps < limit:
+            if blocks is not None:
+                entry = blocks.get(pc) or self.build_block(pc)
+            else:
+                entry = decoded.get(pc) or self.decode(pc)
+            pc = entry[0]()
+            steps += 1 if blocks is None else entry[1]
+        self.pc = pc
+        self.steps += steps
+        return steps
+
+    @property
+    def halted(self):
+        return self.pc == HALT
+
+    def build_block(self, address):
+        """Chain the instructions from address up to a jump or store into one closure"""
+        handlers = []
+        pc = address
+        while len(handlers) < MAX_BLOCK:
+            handler, size = self.decoded.get(pc) or self.decode(pc)
+            handlers.append(handler)
+            pc += size
+            if OPCODES[self.memory[pc - size] & 0xFC][0] in BLOCK_ENDS:
+                break
+        body, last = tuple(handlers[:-1]), handlers[-1]
+
+        def run_block():
+            for handler in body:
+                handler()
+            return last()
+
+        entry = self.blocks[address] = (run_block, len(handlers))
+        return entry
+
+    def decode(self, address):
+        """Decode the instruction at address into (handler, size) and cache it"""
+        memory = self.memory
+        first = memory[address]
+        info = OPCODES.get(first & 0xFC)
+        if info is None:
+            raise ValueError(f"Invalid opcode {first:02X} at {address:06X}")
+        mnemonic, fmt = info
+
+        if fmt == 2:
+            size = 2
+            make = FORMAT2.get(mnemonic)
+            if make is None:
+                raise ValueError(f"{mnemonic} at {address:06X} is not supported")
+            handler = make(self, memory[address + 1] >> 4, memory[address + 1] & 0xF, address + 2)
+        elif fmt == 3:
+            make = FORMAT34.get(mnemonic)
+            if make is None:
+                raise ValueError(f"{mnemonic} at {address:06X} is not supported")
+            size, handler = self.decode_format3_4(make, address, first & 3)
+        else:
+            raise ValueError(f"{mnemonic} at {address:06X} is not supported")
+
+        self.decoded[address] = entry = (handler, size)
+        self.code[address:address + size] = b"\x01" * size
+        return entry
+
+    def decode_format3_4(self, make, address, ni):
+        """Resolve the addressing mode of a format 3/4 (or SIC) instruction into closures"""
+        memory = self.memory
+        regs = self.registers
+        second = memory[address + 1]
+        if ni == 0:
+            # Standard SIC: 15-bit address, x bit on top
+            size, indexed, relative = 3, second & 0x80, None
+            disp = ((second & 0x7F) << 8) | memory[address + 2]
+            ni = 3
+        elif second & 0x10:
+            # Format 4: 20-bit address
+            size, indexed, relative = 4, second & 0x80, None
+            disp = ((second & 0xF) << 16) | (memory[address + 2] << 8) | memory[address + 3]
+        else:
+            size, indexed = 3, second & 0x80
+            disp = ((second & 0xF) << 8) | memory[address + 2]
+            relative = "pc" if second & 0x20 else "base" if second & 0x40 else None
+            if relative == "pc" and disp & 0x800:
+                disp -= 0x1000
+        next_pc = address + size
+
+        # Target address: a constant unless it reads B or X
+        if relative == "base":
+            target = (lambda: (regs[B] + disp + regs[X]) & MASK) if indexed else (lambda: (regs[B] + disp) & MASK)
+            fixed = False
+        else:
+            constant = (next_pc + disp if relative == "pc" else disp) & MASK
+            target = (lambda: (constant + regs[X]) & MASK) if indexed else (lambda: constant)
+            fixed = not indexed
+
+        word = self.word
+        if ni == 1:      # immediate: the operand is the target address itself
+            operand_address = None
+            value = target
+            byte = lambda: target() & 0xFF
+        elif ni == 2:    # indirect: the target holds the operand's address
+            operand_address = lambda: word(target())
+            value = lambda: word(word(target()))
+            byte = lambda: memory[word(target())]
+            fixed = False
+        else:            # simple
+            operand_address = target
+            value = lambda: word(target())
+            byte = lambda: memory[target()]
+
+        if fixed and constant == address and make is FORMAT34["J"]:
+            return size, lambda: HALT   # J * - the program has stopped
+        return size, make(self, operand_address, value, byte, next_pc)
+
+
+# ----------------------------------------------------
+# INSTRUCTION HANDLERS
+# ----------------------------------------------------
+# Each factory takes the emulator and the decoded operand accessors and
+# returns a closure that executes the instruction and returns the next PC.
+
+def _load(r):
+    def make(m, address, value, byte, next_pc):
+        regs = m.registers
+
+        def run():
+            regs[r] = value()
+            return next_pc
+        return run
+    return make
+
+
+def _store(r):
+    def make(m, address, value, byte, next_pc):
+        regs = m.registers
+        store = m.store
+
+        def run():
+            store(address(), regs[r].to_bytes(3, "big"))
+            return next_pc
+        return run
+    return make
+
+
+def _arithmetic(operation):
+    def make(m, address, value, byte, next_pc):
+        regs = m.registers
+
+        def run():
+            regs[A] = operation(regs[A], value()) & MASK
+            return next_pc
+        return run
+    return make
+
+
+def _jump(condition):
+    def make(m, address, value, byte, next_pc):
+        def run():
+            return address() if condition(m.cc) else next_pc
+        return run
+    return make
+
+
+def _divide(a, b):
+    if not signed(b):
+        raise ValueError("Division by zero")
+    return int(signed(a) / signed(b))
+
+
+def _ldch(m, address, value, byte, next_pc):
+    regs = m.registers
+
+    def run():
+        regs[A] = (regs[A] & 0xFFFF00) | byte()
+        return next_pc
+    return run
+
+
+def _stch(m, address, value, byte, next_pc):
+    regs = m.registers
+    store = m.store
+
+    def run():
+        store(address(), bytes((regs[A] & 0xFF,)))
+        return next_pc
+    return run
+
+
+def _comp(m, address, value, byte, next_pc):
+    regs = m.registers
+
+    def run():
+        m.cc = compare(regs[A], value())
+        return next_pc
+    return run
+
+
+def _tix(m, address, value, byte, next_pc):
+    regs = m.registers
+
+    def run():
+        regs[X] = (regs[X] + 1) & MASK
+        m.cc = compare(regs[X], value())
+        return next_pc
+    return run
+
+
+def _jsub(m, address, value, byte, next_pc):
+    regs = m.registers
+
+    def run():
+        regs[L] = next_pc
+        return address()
+    return run
+
+
+def _rsub(m, address, value, byte, next_pc):
+    regs = m.registers
+    return lambda: regs[L]
+
+
+def _stsw(m, address, value, byte, next_pc):
+    store = m.store
+
+    def run():
+        store(address(), (m.cc & MASK).to_bytes(3, "big"))
+        return next_pc
+    return run
+
+
+def _td(m, address, value, byte, next_pc):
+    def run():
+        m.cc = -1   # every device is always ready
+        return next_pc
+    return run
+
+
+def _rd(m, address, value, byte, next_pc):
+    regs = m.registers
+
+    def run():
+        regs[A] = (regs[A] & 0xFFFF00) | m.read_device(byte())
+        return next_pc
+    return run
+
+
+def _wd(m, address, value, byte, next_pc):
+    regs = m.registers
+
+    def run():
+        m.write_device(byte(), regs[A] & 0xFF)
+        return next_pc
+    return run
+
+
+FORMAT34 = {
+    "LDA": _load(A), "LDX": _load(X), "LDL": _load(L), "LDB": _load(B), "LDS": _load(S), "LDT": _load(T),
+    "STA": _store(A), "STX": _store(X), "STL": _store(L), "STB": _store(B), "STS": _store(S), "STT": _store(T),
+    "ADD": _arithmetic(lambda a, b: a + b),
+    "SUB": _arithmetic(lambda a, b: a - b),
+    "MUL": _arithmetic(lambda a, b: signed(a) * signed(b)),
+    "DIV": _arithmetic(_divide),
+    "AND": _arithmetic(lambda a, b: a & b),
+    "OR": _arithmetic(lambda a, b: a | b),
+    "J": _jump(lambda cc: True),
+    "JEQ": _jump(lambda cc: cc == 0),
+    "JGT": _jump(lambda cc: cc > 0),
+    "JLT": _jump(lambda cc: cc < 0),
+    "LDCH": _ldch, "STCH": _stch, "COMP": _comp, "TIX": _tix, "JSUB": _jsub, "RSUB": _rsub,
+    "STSW": _stsw, "TD": _td, "RD": _rd, "WD": _wd,
+}
+
+# A block ends after any of these: they jump or may overwrite cached code
+BLOCK_ENDS = frozenset({"J", "JEQ", "JGT", "JLT", "JSUB", "RSUB",
+                        "STA", "STX", "STL", "STB", "STS", "STT", "STCH", "STSW"})
+
+
+def _register_op(operation):
+    def make(m, r1, r2, next_pc):
+        regs = m.registers
+
+        def run():
+            regs[r2] = operation(regs[r2], regs[r1]) & MASK
+            return next_pc
+        return run
+    return make
+
+
+def _compr(m, r1, r2, next_pc):
+    regs = m.registers
+
+    def run():
+        m.cc = compare(regs[r1], regs[r2])
+        return next_pc
+    return run
+
+
+def _tixr(m, r1, r2, next_pc):
+    regs = m.registers
+
+    def run():
+        regs[X] = (regs[X] + 1) & MASK
+        m.cc = compare(regs[X], regs[r1])
+        return next_pc
+    return run
+
+
+def _clear(m, r1, r2, next_pc):
+    regs = m.registers
+
+    def run():
+        regs[r1] = 0
+        return next_pc
+    return run
+
+
+def _rmo(m, r1, r2, next_pc):
+    regs = m.registers
+
+    def run():
+        regs[r2] = regs[r1]
+        return next_pc
+    return run
+
+
+def _shift(left):
+    def make(m, r1, r2, next_pc):
+        regs = m.registers
+        n = r2 + 1   # the instruction holds n-1
+
+        def run():
+            value = regs[r1]
+            if left:   # circular
+                regs[r1] = ((value << n) | (value >> (24 - n))) & MASK
+            else:      # arithmetic: the sign bit fills in
+                regs[r1] = (signed(value) >> n) & MASK
+            return next_pc
+        return run
+    return make
+
+
+FORMAT2 = {
+    "ADDR": _register_op(lambda a, b: a + b),
+    "SUBR": _register_op(lambda a, b: a - b),
+    "MULR": _register_op(lambda a, b: signed(a) * signed(b)),
+    "DIVR": _register_op(_divide),
+    "COMPR": _compr, "TIXR": _tixr, "CLEAR": _clear, "RMO": _rmo,
+    "SHIFTL": _shift(True), "SHIFTR": _shift(False),
+}
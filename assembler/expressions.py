@@ -0,0 +1,190 @@
+# assembler/expressions.py
+"""Operand expressions: terms joined by + - * / with parentheses.
+
+A term is a decimal number, a symbol or * (the current LOCCTR). Each
+distinct operand text is compiled once into an Expression holding a
+postfix program, which can then be evaluated against any symbol table.
+"""
+import re
+from collections import deque
+from functools import lru_cache
+from sys import intern
+
+TOKEN = re.compile(r"\s*(?:(\d+)|([A-Za-z_][A-Za-z0-9_]*)|([-+*/()]))")
+OPERATORS = frozenset("+-*/(")   # any of these makes an operand an expression
+
+# Postfix program opcodes
+CONST, SYMBOL, LOCCTR = 0, 1, 2
+BINARY = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: int(a / b),   # SIC/XE division truncates
+}
+
+
+class Expression:
+    """A compiled operand expression.
+
+    symbols lists the symbols it reads, in order of first use, and
+    uses_locctr tells whether * appears as a term.
+    """
+    __slots__ = ("text", "code", "symbols", "uses_locctr")
+
+    def __init__(self, text, code):
+        self.text = text
+        self.code = tuple(code)
+        self.symbols = tuple(dict.fromkeys(arg for op, arg in code if op == SYMBOL))
+        self.uses_locctr = any(op == LOCCTR for op, arg in code)
+
+    def evaluate(self, values, locctr=0):
+        """Value of the expression; values maps symbol -> address."""
+        stack = []
+        push = stack.append
+        for op, arg in self.code:
+            if op == CONST:
+                push(arg)
+            elif op == SYMBOL:
+                value = values.get(arg)
+                if value is None:
+                    raise ValueError(f"Undefined symbol '{arg}' in '{self.text}'")
+                push(value)
+            elif op == LOCCTR:
+                push(locctr)
+            else:
+                b = stack.pop()
+                push(op(stack.pop(), b))
+        return stack[0]
+
+    def coefficients(self, names):
+        """How often each of names is added (+1) or subtracted (-1) in the expression"""
+        values = dict.fromkeys(self.symbols, 0)
+        base = self.evaluate(values)
+        result = {}
+        for name in names:
+            values[name] = 1
+            result[name] = self.evaluate(values) - base
+            values[name] = 0
+        return result
+
+    def __repr__(self):
+        return f"Expression({self.text!r})"
+
+
+def is_expression(text):
+    """True if text needs the expression evaluator (not a plain symbol, number or constant)."""
+    if not text or "'" in text:
+        return False
+    return text == "*" or not OPERATORS.isdisjoint(text)
+
+
+@lru_cache(maxsize=8192)
+def compile_expression(text):
+    """Parse text into an Expression; raises ValueError on bad syntax."""
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if not match:
+            raise ValueError(f"Bad expression '{text}' at column {pos + 1}")
+        number, symbol, operator = match.groups()
+        if number is not None:
+            tokens.append((CONST, int(number)))
+        elif symbol is not None:
+            tokens.append((SYMBOL, intern(symbol)))
+        else:
+            tokens.append((None, operator))
+        pos = match.end()
+    if not tokens:
+        raise ValueError("Empty expression")
+
+    code = []
+    position = [0]
+
+    def peek():
+        return tokens[position[0]][1] if position[0] < len(tokens) and tokens[position[0]][0] is None else None
+
+    def factor():
+        if position[0] >= len(tokens):
+            raise ValueError(f"Bad expression '{text}': missing term")
+        kind, value = tokens[position[0]]
+        position[0] += 1
+        if kind is not None:
+            code.append((kind, value))
+        elif value == "*":
+            code.append((LOCCTR, None))      # * in term position is the LOCCTR
+        elif value == "(":
+            expression()
+            if peek() != ")":
+                raise ValueError(f"Bad expression '{text}': missing ')'")
+            position[0] += 1
+        elif value in "+-":
+            code.append((CONST, 0))          # unary sign: 0 +/- factor
+            factor()
+            code.append((BINARY[value], None))
+        else:
+            raise ValueError(f"Bad expression '{text}': unexpected '{value}'")
+
+    def term():
+        factor()
+        while peek() in ("*", "/"):
+            operator = tokens[position[0]][1]
+            position[0] += 1
+            factor()
+            code.append((BINARY[operator], None))
+
+    def expression():
+        term()
+        while peek() in ("+", "-"):
+            operator = tokens[position[0]][1]
+            position[0] += 1
+            term()
+            code.append((BINARY[operator], None))
+
+    expression()
+    if position[0] != len(tokens):
+        raise ValueError(f"Bad expression '{text}': unexpected '{tokens[position[0]][1]}'")
+    return Expression(text, code)
+
+
+def resolve_equates(equates, symbols):
+    """Define deferred EQU symbols in dependency order, in one pass.
+
+    equates maps label -> (Expression, locctr) for EQUs whose operand
+    named symbols not defined yet; symbols is the symbol table dict and is
+    updated in place. Each EQU waits on the other deferred EQUs it reads
+    and is evaluated as soon as the last of them is known (Kahn's
+    algorithm), so every definition is evaluated exactly once. Returns the
+    labels that could not be resolved (undefined symbols, a cycle or a
+    division by zero).
+    """
+    waiting = {}       # label -> number of deferred EQUs it still needs
+    dependents = {}    # label -> deferred EQUs that read it
+    ready = deque()
+    blocked = []
+    for label, (expr, locctr) in equates.items():
+        needs = [symbol for symbol in expr.symbols if symbol not in symbols]
+        if any(symbol not in equates for symbol in needs):
+            blocked.append(label)   # reads a symbol nothing defines
+            continue
+        waiting[label] = len(needs)
+        for symbol in needs:
+            dependents.setdefault(symbol, []).append(label)
+        if not needs:
+            ready.append(label)
+
+    while ready:
+        label = ready.popleft()
+        expr, locctr = equates[label]
+        try:
+            symbols[label] = expr.evaluate(symbols, locctr)
+        except ZeroDivisionError:
+            continue   # left undefined, and so is everything that reads it
+        for dependent in dependents.get(label, ()):
+            if dependent in waiting:
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    ready.append(dependent)
+
+    return [label for label in equates if label not in symbols]
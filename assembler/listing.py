@@ -1,17 +1,41 @@
 # assembler/listing.py
+LINE_FORMAT = "{:04X}\t{:<10}{:<10}{:<10}{}\n"
+BATCH_LINES = 4096          # lines formatted and written per batch
+BUFFER_SIZE = 1 << 20       # file buffer for the listing
+
 
 class ListingWriter:
-    def __init__(self, file_path):
+    def __init__(self, file_path, batch_lines=BATCH_LINES):
+        """Buffered listing writer.
+
+        add_line() only stores the raw fields; they are formatted a batch at
+        a time and handed to a large file buffer, so there is no per-line
+        f-string or write() call. The file is opened on the first batch.
+        file_path may also be an open text stream, which is written to but
+        left open.
+        """
         self.file_path = file_path
-        self.lines = []
+        self.batch_lines = batch_lines
+        self.pending = []
+        self.owned = not hasattr(file_path, "write")
+        self.file = None if self.owned else file_path
 
     def add_line(self, locctr, label, opcode, operand, obj_code=""):
-        """Append a formatted line to the listing."""
-        formatted = f"{locctr:04X}\t{label:<10}{opcode:<10}{operand:<10}{obj_code}"
-        self.lines.append(formatted)
+        """Queue one listing line; formatting happens when the batch is written."""
+        self.pending.append((locctr, label or "", opcode or "", operand or "", obj_code or ""))
+        if len(self.pending) >= self.batch_lines:
+            self._flush()
+
+    def _flush(self):
+        if self.file is None:
+            self.file = open(self.file_path, "w", buffering=BUFFER_SIZE)
+        fmt = LINE_FORMAT.format
+        self.file.write("".join([fmt(*fields) for fields in self.pending]))
+        self.pending = []
 
     def write(self):
         """Save the listing file."""
-        with open(self.file_path, "w") as f:
-            for line in self.lines:
-                f.write(line + "\n")
\ No newline at end of file
+        self._flush()
+        if self.owned:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,131 @@
+# assembler/loader.py
+"""Linking loader: object programs in, one memory image out.
+
+Each object program (a .obj file or any iterable of record lines) is
+read once, record by record. H records place the control section right
+after the previous one, D records enter the external symbol table
+(ESTAB), T records are decoded with bytes.fromhex straight into a
+bytearray image and M records are kept until every section is loaded,
+since they may name symbols defined further on. No record is looked at
+twice and nothing but the image grows with the program size.
+"""
+import mmap
+import os
+
+
+class LinkingLoader:
+    def __init__(self, progaddr=0):
+        self.progaddr = progaddr      # load address of the first control section
+        self.csaddr = progaddr        # load address of the section being read
+        self.estab = {}               # external symbol table: section or symbol name -> address
+        self.sections = []            # load map: (name, address, length)
+        self.memory = bytearray()     # image of memory from progaddr on
+        self.modifications = []       # (address, half-bytes, sign, symbol or None, offset) to apply
+        self.entry = None             # execution address from the first E record naming one
+
+    # ----------------------------------------------------
+    # LOADING
+    # ----------------------------------------------------
+    def load(self, sources):
+        """Load every object program in sources (paths or record iterables) and link them.
+
+        Returns the memory image.
+        """
+        for source in sources:
+            if isinstance(source, (str, os.PathLike)):
+                with open(source) as f:
+                    self.load_object(f)
+            else:
+                self.load_object(source)
+        self.apply_modifications()
+        return self.memory
+
+    def load_object(self, records):
+        """Read the H/D/R/T/M/E records of one object program (one or more sections)."""
+        memory = self.memory
+        modifications = self.modifications
+        offset = 0   # load address minus assembled address of the current section
+        for record in records:
+            record = record.rstrip("\r\n")
+            kind = record[:1]
+            if kind == "T":
+                start = int(record[1:7], 16) + offset - self.progaddr
+                length = int(record[7:9], 16)
+                memory[start:start + length] = bytes.fromhex(record[9:9 + 2 * length])
+            elif kind == "M":
+                symbol = record[10:].strip()
+                modifications.append((int(record[1:7], 16) + offset, int(record[7:9], 16),
+                                      record[9:10] or "+", symbol or None, offset))
+            elif kind == "H":
+                name = record[1:7].strip()
+                length = int(record[13:19], 16)
+                offset = self.csaddr - int(record[7:13], 16)
+                self.define(name, self.csaddr)
+                self.sections.append((name, self.csaddr, length))
+                memory.extend(bytes(max(0, self.csaddr + length - self.progaddr - len(memory))))
+                self.csaddr += length   # the next section follows this one
+            elif kind == "D":
+                for i in range(1, len(record) - 11, 12):
+                    self.define(record[i:i + 6].strip(), int(record[i + 6:i + 12], 16) + offset)
+            elif kind == "E":
+                if self.entry is None and len(record) > 1:
+                    self.entry = int(record[1:7], 16) + offset
+            # R records only list names ESTAB must define; they are checked when applied
+
+    def define(self, name, address):
+        if name in self.estab:
+            print(f"Warning: Duplicate external symbol '{name}' - using first definition")
+        else:
+            self.estab[name] = address
+
+    # ----------------------------------------------------
+    # RELOCATION AND LINKING
+    # ----------------------------------------------------
+    def apply_modifications(self):
+        """Add (or subtract) the value of each M record's symbol into its field.
+
+        An M record without a symbol relocates by how far its own section
+        was moved from its assembled address. A field of 5 half-bytes is
+        the address part of a format 4 instruction: the low 20 bits of 3
+        bytes.
+        """
+        memory = self.memory
+        estab = self.estab
+        for address, half_bytes, sign, symbol, offset in self.modifications:
+            if symbol is None:
+                value = offset
+            else:
+                value = estab.get(symbol)
+                if value is None:
+                    print(f"Warning: Undefined external symbol '{symbol}' at {address:06X}")
+                    continue
+            start = address - self.progaddr
+            size = (half_bytes + 1) // 2
+            mask = (1 << 4 * half_bytes) - 1
+            word = int.from_bytes(memory[start:start + size], "big")
+            field = (word + value if sign == "+" else word - value) & mask
+            memory[start:start + size] = ((word & ~mask) | field).to_bytes(size, "big")
+        self.modifications = []
+
+    # ----------------------------------------------------
+    # OUTPUT
+    # ----------------------------------------------------
+    def dump(self, path):
+        """Write the memory image to path through a shared memory map"""
+        with open(path, "w+b") as f:
+            if not self.memory:
+                return
+            f.truncate(len(self.memory))
+            with mmap.mmap(f.fileno(), len(self.memory)) as image:
+                image[:] = self.memory
+
+    def load_map(self):
+        """Lines of the load map: sections and the symbols they define, by address"""
+        lengths = {name: length for name, _, length in self.sections}
+        lines = []
+        for name, address in sorted(self.estab.items(), key=lambda item: (item[1], item[0] not in lengths)):
+            if name in lengths:
+                lines.append(f"{name:<6}          {address:06X}  {lengths[name]:06X}")
+            else:
+                lines.append(f"        {name:<6}  {address:06X}")
+        return lines
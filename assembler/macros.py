@@ -0,0 +1,122 @@
+# assembler/macros.py
+"""Macro pre-pass: MACRO/MEND definitions with &parameters.
+
+MacroProcessor.expand() sits in front of Pass 1 as a generator. Source
+lines pass straight through until a macro is defined; definitions are
+stored and every invocation is replaced by its expansion, one line at a
+time, so the expanded program is never held in memory.
+"""
+import re
+from functools import lru_cache
+from assembler.parser import split_fields, split_statement
+
+MACRO_WORD = re.compile(r"\bMACRO\b", re.IGNORECASE)   # cheap test before a line is split
+PARAMETER = re.compile(r"&[A-Za-z_][A-Za-z0-9_]*")
+LOCAL_LABEL = re.compile(r"'[^']*'|\$(?=[A-Za-z])")   # quoted constants match whole, so they are skipped
+EXPANSION_CACHE = 1024   # (macro, arguments) expansions kept for reuse
+MAX_DEPTH = 50           # nested invocations before a macro is considered recursive
+
+
+class Macro:
+    """One definition; the body is compiled once into str.format templates."""
+
+    def __init__(self, name, prototype, body):
+        self.name = name
+        self.parameters = []
+        self.defaults = []
+        for parameter in filter(None, (p.strip() for p in prototype.split(","))):
+            name_part, _, default = parameter.partition("=")
+            self.parameters.append(name_part)
+            self.defaults.append(default)
+        index = {name_part: i for i, name_part in enumerate(self.parameters)}
+
+        def field(match):
+            i = index.get(match.group(0))
+            return match.group(0) if i is None else f"{{{i}}}"
+
+        # Escape braces in the source text, then turn &PARAM into {n}
+        self.templates = tuple(PARAMETER.sub(field, line.replace("{", "{{").replace("}", "}}")) for line in body)
+        self.has_locals = any("$" in line for line in body)   # $labels are renamed per expansion
+
+    def arguments(self, operand):
+        """Positional arguments of an invocation, defaults filling the gaps"""
+        given = operand.split(",") if operand else []
+        return tuple(given[i] if i < len(given) and given[i] else self.defaults[i]
+                     for i in range(len(self.parameters)))
+
+    def __repr__(self):
+        return f"Macro({self.name!r}, {', '.join(self.parameters)})"
+
+
+def rename_locals(line, prefix):
+    """$NAME -> prefix + NAME in the label and operand fields; constants and comments keep their $"""
+    comment = split_statement(line)[3]
+    end = line.rfind(comment) if comment else len(line)
+
+    def rename(match):
+        return prefix if match.group(0) == "$" else match.group(0)
+
+    return LOCAL_LABEL.sub(rename, line[:end]) + line[end:]
+
+
+class MacroProcessor:
+    def __init__(self, cache_size=EXPANSION_CACHE):
+        self.macros = {}
+        self.expansions = 0       # invocations expanded
+        self.expand_call = lru_cache(maxsize=cache_size)(self._substitute)
+
+    @staticmethod
+    def _substitute(macro, args):
+        return tuple(template.format(*args) for template in macro.templates)
+
+    def expand(self, lines, depth=0):
+        """Yield lines with definitions removed and invocations expanded."""
+        definition = None    # [name, prototype, body, nesting] while inside MACRO..MEND
+        for line in lines:
+            if definition is None and not self.macros and not MACRO_WORD.search(line):
+                yield line   # fast path: nothing to look at yet
+                continue
+
+            stripped = line.strip()
+            if not stripped or stripped.startswith("."):
+                if definition is None:
+                    yield line
+                continue
+            label, opcode, operand = split_fields(line)
+
+            if definition is not None:
+                # Nested definitions stay in the body and are defined when it is expanded
+                if opcode == "MACRO":
+                    definition[3] += 1
+                elif opcode == "MEND":
+                    if not definition[3]:
+                        name, prototype, body, _ = definition
+                        self.macros[name] = Macro(name, prototype, body)
+                        definition = None
+                        continue
+                    definition[3] -= 1
+                definition[2].append(stripped)
+            elif opcode == "MACRO":
+                definition = [label, operand, [], 0]
+            elif opcode in self.macros:
+                yield from self.invoke(self.macros[opcode], label, operand, depth)
+            else:
+                yield line
+
+        if definition is not None:
+            print(f"Warning: Macro '{definition[0]}' has no MEND - definition ignored")
+
+    def invoke(self, macro, label, operand, depth):
+        """Lines of one invocation; expansions of the same arguments are reused"""
+        if depth >= MAX_DEPTH:
+            print(f"Warning: Macro '{macro.name}' nested more than {MAX_DEPTH} deep - not expanded")
+            return
+        self.expansions += 1
+        lines = self.expand_call(macro, macro.arguments(operand))
+        if macro.has_locals:
+            # $LOOP becomes $1_LOOP, $2_LOOP, ... - the expansion count never repeats
+            prefix = f"${self.expansions}_"
+            lines = [rename_locals(line, prefix) if "$" in line else line for line in lines]
+        if label:
+            yield f"{label} EQU *"   # the invocation label names the first expanded line
+        yield from self.expand(lines, depth + 1)
@@ -1,41 +1,136 @@
-# assembler/objectwriter.py 
+# assembler/objectwriter.py
+MAX_TEXT_BYTES = 30   # bytes per T record (0x1E - columns 10-69 of the record)
+DEFINES_PER_RECORD = 6    # name/address pairs per D record
+REFERS_PER_RECORD = 12    # names per R record
+
+
 class ObjectWriter:
-    def __init__(self):
+    def __init__(self, stream=None):
+        """Build H/T/M/E records.
+
+        Object code is collected as raw bytes in a bytearray and turned into
+        hex once per finished T record. With a stream (any text file handle)
+        each record is written as soon as it is complete - T records only
+        wait for the header - so memory use does not grow with program size.
+        Without one, generate() returns the whole program as before.
+        """
+        self.stream = stream
         self.header = ""
-        self.text_records = []
+        self.link_records = []           # D and R records, written right after the header
+        self.text_records = []           # finished T records not streamed yet
         self.end_record = ""
         self.modification_records = []
+        self._text = bytearray()         # body of the T record being filled
+        self._text_start = 0
+        self._text_next = None           # address right after self._text
+        self._block = 0                  # program block self._text belongs to
+        self._parked = {}                # block -> open (text, start, next) of the other blocks
+        self._written = 0                # records already sent to the stream
+
+    def _put(self, record):
+        """Stream a finished record, or hold it until the header is known."""
+        if self.stream is not None and self.header:
+            self.stream.write(f"\n{record}" if self._written else record)
+            self._written += 1
+        else:
+            self.text_records.append(record)
+
+    def add_define_records(self, definitions):
+        """D records for (name, address) pairs exported with EXTDEF; call before write_header()."""
+        definitions = list(definitions)
+        for i in range(0, len(definitions), DEFINES_PER_RECORD):
+            chunk = definitions[i:i + DEFINES_PER_RECORD]
+            self.link_records.append("D" + "".join(f"{name[:6].ljust(6)}{address:06X}" for name, address in chunk))
+
+    def add_refer_records(self, names):
+        """R records for the names imported with EXTREF; call before write_header()."""
+        names = list(names)
+        for i in range(0, len(names), REFERS_PER_RECORD):
+            self.link_records.append("R" + "".join(name[:6].ljust(6) for name in names[i:i + REFERS_PER_RECORD]))
 
     def write_header(self, program_name, start_addr, length):
         """Create header record."""
         self.header = f"H{program_name[:6].ljust(6)}{start_addr:06X}{length:06X}"
+        if self.stream is not None:
+            held, self.text_records = self.link_records + self.text_records, []
+            self.link_records = []
+            self._put(self.header)
+            for record in held:
+                self._put(record)
+
+    def add_code(self, address, obj_code, block=0):
+        """Append one instruction's object code (hex string or bytes) at address.
+
+        A gap in addresses, or code that would not fit in the record being
+        filled, starts a new T record, so an instruction is never split
+        across two records (only a single item longer than a whole record
+        is). Every program block (USE) fills its own T record, so switching
+        blocks does not cut the records short.
+        """
+        data = bytes.fromhex(obj_code) if isinstance(obj_code, str) else obj_code
+        if block != self._block:
+            self.switch_block(block)
+        if self._text and (address != self._text_next or len(self._text) + len(data) > MAX_TEXT_BYTES):
+            self.flush_text()
+        if not self._text:
+            self._text_start = address
+        self._text += data
+        self._text_next = address + len(data)
+        if len(self._text) >= MAX_TEXT_BYTES:
+            self.flush_text()
+
+    def switch_block(self, block):
+        """Park the T record being filled and carry on with block's."""
+        self._parked[self._block] = (self._text, self._text_start, self._text_next)
+        self._text, self._text_start, self._text_next = self._parked.pop(block, (bytearray(), 0, None))
+        self._block = block
+
+    def flush_text(self):
+        """Close the T record being filled, splitting it at MAX_TEXT_BYTES."""
+        text = self._text
+        start = self._text_start
+        for offset in range(0, len(text), MAX_TEXT_BYTES):
+            chunk = text[offset:offset + MAX_TEXT_BYTES]
+            self._put(f"T{start + offset:06X}{len(chunk):02X}{chunk.hex().upper()}")
+        self._text = bytearray()
+        self._text_start = self._text_next if self._text_next is not None else start
 
     def add_text_record(self, start_addr, obj_codes):
-        """Create text record from list of object codes."""
+        """Create text record(s) from list of object codes."""
         if not obj_codes:
             return
-            
-        # Convert list to single hex string
-        record_str = "".join(obj_codes)
-        length = len(record_str) // 2  # Each byte = 2 hex chars
-        
-        # Ensure length fits in 1 byte (max 255)
-        if length > 255:
-            # Split into multiple records 
-            length = 255
-            record_str = record_str[:510]  # 255 * 2 hex chars
-            
-        self.text_records.append(f"T{start_addr:06X}{length:02X}{record_str}")
-
-    def add_modification_record(self, address, length):
-        """Add modification record for format 4 instructions."""
-        self.modification_records.append(f"M{address:06X}{length:02X}")
+        self.flush_text()
+        # Convert list to bytes in one go; long runs are split, not truncated
+        self._text = bytearray.fromhex("".join(obj_codes))
+        self._text_start = start_addr
+        self._text_next = start_addr + len(self._text)
+        self.flush_text()
+
+    def add_modification_record(self, address, length, symbol=""):
+        """Add modification record for format 4 instructions.
+
+        length counts half-bytes; symbol is an optional signed external
+        name such as "+RDREC".
+        """
+        self.modification_records.append(f"M{address:06X}{length:02X}{symbol}")
 
     def write_end(self, first_exec_addr):
-        """Add end record."""
-        self.end_record = f"E{first_exec_addr:06X}"
+        """Add end record (a bare "E" when first_exec_addr is None)."""
+        for block in sorted({self._block, *self._parked}):
+            self.switch_block(block)
+            self.flush_text()
+        self.end_record = "E" if first_exec_addr is None else f"E{first_exec_addr:06X}"
+        # M records go out in address order (the sort is stable, so same-field records keep theirs)
+        self.modification_records.sort(key=lambda record: record[1:7])
+        if self.stream is not None:
+            for record in self.modification_records:
+                self._put(record)
+            self.modification_records = []
+            self._put(self.end_record)
 
     def generate(self):
-        """Return complete object program as text."""
-        records = [self.header] + self.text_records + self.modification_records + [self.end_record]
-        return "\n".join(records)
\ No newline at end of file
+        """Return complete object program as text ("" once streamed)."""
+        if self.stream is not None:
+            return ""
+        records = [self.header] + self.link_records + self.text_records + self.modification_records + [self.end_record]
+        return "\n".join(records)
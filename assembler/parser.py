@@ -0,0 +1,222 @@
+# assembler/parser.py
+import re
+from functools import lru_cache
+from sys import intern
+from assembler.tables import INSTRUCTION_TABLE, DIRECTIVES
+
+# Addressing flag bits, laid out like the n i x b p e bits of a format 3/4 instruction
+FLAG_N = 0x20
+FLAG_I = 0x10
+FLAG_X = 0x08
+FLAG_E = 0x01
+
+# Directives that never reserve storage
+NO_STORAGE = DIRECTIVES - {"BYTE", "WORD", "RESB", "RESW"}
+
+# Directives that assemble to data bytes
+DATA = frozenset({"BYTE", "WORD"})
+
+# Directives that name symbols shared between control sections
+EXTERNAL = frozenset({"EXTDEF", "EXTREF"})
+
+# Everything that can stand in the opcode field (macro names aside)
+OPERATIONS = frozenset(INSTRUCTION_TABLE) | DIRECTIVES | {"MACRO", "MEND"}
+
+# Operations whose next field is already the comment
+NO_OPERAND = frozenset(name for name, instr in INSTRUCTION_TABLE.items() if instr.format == 1) | {
+    "RSUB", "LTORG", "NOBASE", "CSECT", "MEND"}
+
+# A statement: the indent, then its first three fields. A field never starts
+# with "." (that opens a comment) and quoted parts such as C'EOF FILE' may hold
+# spaces. The same pattern, as bytes, drives assembler.scanner.
+FIELD = r"[^\s.](?:[^\s']|'[^'\r\n]*')*"
+STATEMENT_FIELDS = rf"([ \t]*)({FIELD})(?:[ \t]+({FIELD}))?(?:[ \t]+({FIELD}))?"
+STATEMENT = re.compile(STATEMENT_FIELDS)
+OPCODE_CACHE = 4096   # distinct opcode-field spellings remembered by opcode_field()
+
+
+class IntermediateLine:
+    """One pre-parsed Pass 1 line.
+
+    Besides the raw (locctr, label, opcode, operand) fields it carries
+    everything Pass 2 needs to encode the line, decoded once: the bare
+    mnemonic, instruction format (0 for directives), size in bytes, the
+    n/i/x/e addressing flags and the interned symbol/value operand.
+    Iterating yields the legacy 4-tuple so old unpacking code keeps working.
+    block is the USE program block number (0 = default block).
+    """
+    __slots__ = ("locctr", "label", "opcode", "operand", "mnemonic", "format", "size", "flags", "symbol", "block")
+
+    def __init__(self, locctr, label, opcode, operand, mnemonic, fmt, size, flags, symbol):
+        self.locctr = locctr
+        self.label = label
+        self.opcode = opcode
+        self.operand = operand
+        self.mnemonic = mnemonic
+        self.format = fmt
+        self.size = size
+        self.flags = flags
+        self.symbol = symbol
+        self.block = 0
+
+    def __iter__(self):
+        return iter((self.locctr, self.label, self.opcode, self.operand))
+
+    def __repr__(self):
+        return (f"IntermediateLine({self.locctr:04X}, {self.label!r}, {self.opcode!r}, "
+                f"{self.operand!r}, format={self.format}, size={self.size}, flags={self.flags:02X})")
+
+
+@lru_cache(maxsize=OPCODE_CACHE)
+def opcode_field(field):
+    """(interned upper-case opcode, is an operation, takes an operand) for a field"""
+    opcode = intern(field.upper())
+    mnemonic = opcode[1:] if opcode[:1] == "+" else opcode
+    return opcode, mnemonic in OPERATIONS, mnemonic not in NO_OPERAND
+
+
+def is_operation(field):
+    """True if a field names an operation, in any case, with or without +.
+
+    Used on fields that may be labels or operands, so it keeps them out of
+    opcode_field()'s cache.
+    """
+    if field in OPERATIONS:
+        return True
+    name = field.upper()
+    return (name[1:] if name[:1] == "+" else name) in OPERATIONS
+
+
+def statement_fields(indented, first, second, third):
+    """(label, opcode, operand, fields used) from the first three fields of a statement.
+
+    Only a line starting in column 1 can have a label, and even then the
+    first field is the operation if it is one (LDA ALPHA) or if the line
+    is two plain fields (RDBUFF F1,BUFFER - a macro call). Stripped lines,
+    as macro bodies and tests write them, therefore parse the same. The
+    operand is the field after the operation unless it takes none (RSUB,
+    FIX, LTORG, ...); whatever follows is the comment field.
+    """
+    if indented or second is None or is_operation(first) or (third is None and not is_operation(second)):
+        label, operation, rest, used = "", first, second, 1
+    else:
+        label, operation, rest, used = first, second, third, 2
+    opcode, _, takes_operand = opcode_field(operation)
+    if rest is not None and takes_operand:
+        return label, opcode, rest, used + 1
+    return label, opcode, "", used
+
+
+def split_statement(line):
+    """Split a source line into (label, opcode, operand, comment) in one regex match.
+
+    Blank and comment lines give ("", "", "", comment).
+    """
+    match = STATEMENT.match(line)
+    if match is None:
+        return "", "", "", line.strip()
+    indent, first, second, third = match.groups()
+    label, opcode, operand, used = statement_fields(indent, first, second, third)
+    return label, opcode, operand, line[match.end(used + 1):].strip()
+
+
+def split_fields(line):
+    """(label, opcode, operand) of a source line; see split_statement().
+
+    Most lines hold no quote and no "." - their fields are then just the
+    runs of non-blanks, which str.split() finds far faster than the
+    pattern. The first three are all statement_fields() needs.
+    """
+    if "'" in line or "." in line or line[:1] in "\r\n\f\v":
+        return split_statement(line)[:3]
+    fields = line.split(None, 3)
+    if not fields:
+        return "", "", ""
+    fields += [None] * (3 - len(fields))
+    return statement_fields(line[0] in " \t", fields[0], fields[1], fields[2])[:3]
+
+
+def decode_operand(operand):
+    """Split a format 3/4 operand into (flags, symbol) - the @, # and ,X checks run here only."""
+    if not operand:
+        return FLAG_N | FLAG_I, None
+    if operand[0] == '@':
+        return FLAG_N, intern(operand[1:])
+    if operand[0] == '#':
+        return FLAG_I, intern(operand[1:])
+    if operand.endswith(',X'):
+        return FLAG_N | FLAG_I | FLAG_X, intern(operand[:-2])
+    return FLAG_N | FLAG_I, intern(operand)
+
+
+def is_constant(flags, symbol):
+    """True if a format 3/4 operand is a value rather than an address: none at all (RSUB) or #number."""
+    return symbol is None or (flags & (FLAG_N | FLAG_I) == FLAG_I and symbol.isdigit())
+
+
+def storage_size(opcode, operand):
+    """Bytes reserved by a storage directive, or None if opcode is not one."""
+    if opcode == "WORD":
+        return 3
+    if opcode == "RESW":
+        return 3 * int(operand)
+    if opcode == "RESB":
+        return int(operand)
+    if opcode == "BYTE":
+        val = operand.split("'")[1]
+        if operand.upper().startswith("C'"):
+            return len(val)          # chars = bytes
+        if operand.upper().startswith("X'"):
+            return len(val) // 2     # 2 hex digits = 1 byte
+        return 0
+    return None
+
+
+def make_record(locctr, label, opcode, operand):
+    """Decode one source statement into an IntermediateLine."""
+    opcode = intern(opcode) if opcode else ""
+    is_format4 = opcode.startswith('+')
+    mnemonic = intern(opcode[1:]) if is_format4 else opcode
+
+    instr = INSTRUCTION_TABLE.get(mnemonic)
+    fmt = instr.format if instr else 0
+    flags = 0
+    symbol = None
+
+    if fmt == 3:
+        flags, symbol = decode_operand(operand)
+        if is_format4:
+            flags |= FLAG_E
+            size = 4
+        else:
+            size = 3
+    elif fmt:
+        size = fmt
+    elif mnemonic in NO_STORAGE:
+        size = 0
+    else:
+        size = storage_size(mnemonic, operand)
+        if size is None:
+            size = 3   # unknown statement: assume a format 3 slot
+        elif mnemonic in DATA:
+            symbol = intern(operand)   # the constant, or the WORD value/expression
+
+    return IntermediateLine(locctr, label, opcode, operand, mnemonic, fmt, size, flags, symbol)
+
+
+def make_literal_record(locctr, literal, value, name=None):
+    """A literal pool entry: '*' =C'EOF' assembles like BYTE C'EOF'.
+
+    Its symbol is the literal table entry it places (name, when that is
+    an alias of literal).
+    """
+    literal = intern(literal)
+    return IntermediateLine(locctr, "*", literal, "", "BYTE", 0, len(value), 0, intern(name or literal))
+
+
+def as_record(line):
+    """Accept an IntermediateLine or a legacy (locctr, label, opcode, operand) tuple."""
+    if isinstance(line, IntermediateLine):
+        return line
+    locctr, label, opcode, operand = line[:4]
+    return make_record(locctr, label or "", opcode or "", operand or "")
@@ -1,90 +1,258 @@
-from assembler.tables import SymbolTable, LiteralTable, BlockTable
+from assembler.tables import SymbolTable, LiteralTable, BlockTable, DIRECTIVES
+from assembler.parser import EXTERNAL, make_record, make_literal_record, split_fields
+from assembler.expressions import compile_expression, resolve_equates
+from assembler.macros import MacroProcessor
+from assembler.scanner import SourceScanner
+from assembler.vectorized import HAVE_NUMPY, Columns
+from assembler.relax import relax_formats
 
 class Pass1:
     def __init__(self):
         self.symtab = SymbolTable()
         self.littab = LiteralTable()
-        self.blocktab = BlockTable()   # unused but must exist
+        self.blocktab = BlockTable()   # USE program blocks
         self.locctr = 0
         self.start_addr = 0
         self.program_name = ""
-        self.intermediate = []   # (LOCCTR, LABEL, OPCODE, OPERAND)
+        self.start_seen = False   # START is only honoured as the first statement
+        self.intermediate = []   # IntermediateLine records (LOCCTR, LABEL, OPCODE, OPERAND, ...)
+        self.equates = {}        # EQU label -> (Expression, LOCCTR) waiting on later symbols
+        self.block_records = []  # records outside the default block, relocated after Pass 1
+        self.block_symbols = []  # (label, block) defined outside the default block
+        self.equate_blocks = {}  # deferred EQU label -> block its * belongs to
+        self.macros = MacroProcessor()   # expands MACRO/MEND definitions ahead of Pass 1
+        self.promoted = 0        # format 3 lines relax_formats() turned into format 4
+        self.columns = None      # format 3/4 lines as Columns, for the batch encoder
 
-    def assemble(self, lines):
-        """Perform Pass 1 of the SIC/XE assembler."""
+    def assemble(self, lines, vectorized=False, relax=False):
+        """Perform Pass 1 of the SIC/XE assembler.
 
-        # ----------------------------------------------------
-        # HANDLE START
-        # ----------------------------------------------------
-        first = lines[0].strip().split()
-        if len(first) >= 3 and first[1].upper() == "START":
-            label, opcode, operand = first[0], first[1].upper(), first[2]
-            self.program_name = label
-            self.start_addr = int(operand, 16)
-            self.locctr = self.start_addr
+        lines may be any iterable of source lines (a list, an open file or a
+        generator) or a SourceScanner; it is consumed once and never copied.
+        vectorized also keeps the format 3/4 lines as columns for the NumPy
+        encoder (see assembler.vectorized.Columns) when it is installed.
+        relax promotes format 3 lines that cannot reach their operand to
+        format 4 (see assembler.relax). Returns
+        (intermediate, symtab, program_length, program_name, start_addr).
+        """
+        if vectorized and HAVE_NUMPY:
+            self.columns = Columns()
+        self.intermediate.extend(self.records(lines))
+        if relax:
+            self.promoted = relax_formats(self)
+        if self.columns is not None:
+            self.columns.build()
 
-            # INTERMEDIATE FORMAT
-            self.intermediate.append((self.locctr, label, opcode, operand))
+        program_length = self.locctr - self.start_addr
+        return self.intermediate, self.symtab, program_length, self.program_name, self.start_addr
+
+    def records(self, lines):
+        """Yield one IntermediateLine per statement, in source order.
 
-            lines = lines[1:]  # skip START line
+        Labels are entered in the symbol table before their line is yielded
+        and LOCCTR advances after it, so a consumer can run alongside Pass 1
+        (see assembler.onepass) without a stored intermediate list. Macro
+        invocations are expanded on the way in (see assembler.macros).
+
+        Outside the default program block (USE) LOCCTR counts from the start
+        of the block; those records and labels get their absolute addresses
+        in one step at the end (see relocate_blocks), when every block's
+        length is known.
+        """
+        block = 0   # current program block
+        columns = self.columns
 
         # ----------------------------------------------------
         # MAIN LOOP
         # ----------------------------------------------------
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("."):
-                continue   # skip comments
-
-            parts = line.split()
-            label = opcode = operand = ""
-
-            # Parse label/opcode/operand
-            if len(parts) == 3:
-                label, opcode, operand = parts
-                opcode = opcode.upper()
-            elif len(parts) == 2:
-                opcode, operand = parts
-                opcode = opcode.upper()
-            elif len(parts) == 1:
-                opcode = parts[0].upper()
+        for line, label, opcode, operand in self.statements(lines):
+            # ------------------------------------------------
+            # HANDLE START (first statement only)
+            # ------------------------------------------------
+            if not self.start_seen:
+                record = self.start_statement(label, opcode, operand)
+                if record is not None:
+                    yield record
+                    continue
+
+            # USE: carry on from where the named block left off
+            if opcode == "USE":
+                self.locctr = self.blocktab.use(operand, self.locctr)
+                block = self.blocktab.number
 
             # Add label to symbol table - ONLY IF NOT EMPTY
             if label and label.strip():  # Only add NON-EMPTY labels
-                if label in self.symtab:
+                if label in self.symtab or label in self.equates:
                     # For now, just warn but don't crash
                     print(f"Warning: Duplicate symbol '{label}' - using first definition")
+                elif opcode == "EQU":
+                    self.define_equate(label, operand, self.locctr, block)
                 else:
                     self.symtab.add(label, self.locctr)
+                    if block:
+                        self.block_symbols.append((label, block))
+
+            # Literals still waiting are pooled in front of END
+            if opcode == "END":
+                yield from self.literal_pool()
 
             # PUSH CURRENT LINE BEFORE CHANGING LOCCTR
-            self.intermediate.append((self.locctr, label, opcode, operand))
+            # (operand flags, format and size are decoded once, here)
+            record = make_record(self.locctr, label, opcode, operand)
+            if not record.format and record.mnemonic not in DIRECTIVES:
+                # Not in the instruction table - reserve a format 3 slot, but say so
+                print(f"Warning: Unknown operation in '{line}' at {self.locctr:04X} - assuming 3 bytes")
+            elif record.format == 3 and record.symbol and record.symbol[0] == "=":
+                record.symbol = self.add_literal(record.symbol)
+            elif record.mnemonic in EXTERNAL:
+                self.add_externals(record)
+            if block:
+                record.block = block
+                self.block_records.append(record)
+            if columns is not None:
+                columns.add(record)
+            yield record
 
             # ----------------------------------------------------
             # UPDATE LOCCTR
             # ----------------------------------------------------
-            if opcode == "WORD":
-                self.locctr += 3
+            if opcode == "END":
+                break
+            self.locctr += record.size
+            if record.mnemonic == "LTORG":
+                yield from self.literal_pool()
 
-            elif opcode == "RESW":
-                self.locctr += 3 * int(operand)
+        # No END: the last pool goes at the end of the program
+        yield from self.literal_pool()
 
-            elif opcode == "RESB":
-                self.locctr += int(operand)
+        if self.blocktab.in_use:
+            self.relocate_blocks()
 
-            elif opcode == "BYTE":
-                val = operand.split("'")[1]
-                if operand.upper().startswith("C'"):
-                    self.locctr += len(val)          # chars = bytes
-                elif operand.upper().startswith("X'"):
-                    self.locctr += len(val) // 2     # 2 hex digits = 1 byte
+        # EQUs that named later symbols can be evaluated now
+        self.resolve_equates()
 
-            elif opcode == "END":
-                break
+    def statements(self, lines):
+        """(line, label, opcode, operand) for every statement, comments skipped.
 
-            else:
-                # default: format 3 instruction (3 bytes)
-                self.locctr += 3
+        A SourceScanner over a source without macros hands its statements
+        over already split; anything else goes through macro expansion
+        and is split here (see parser.split_fields).
+        """
+        if isinstance(lines, SourceScanner) and not lines.has_macros:
+            return lines.statements()
+        return self.split_lines(lines)
 
-        program_length = self.locctr - self.start_addr
-        return self.intermediate, self.symtab, program_length
\ No newline at end of file
+    def split_lines(self, lines):
+        for line in self.macros.expand(lines):
+            label, opcode, operand = split_fields(line)
+            if opcode:   # comment and blank lines have none
+                yield line.strip(), label, opcode, operand
+
+    def start_statement(self, label, opcode, operand):
+        """Take START (or the CSECT opening a control section) as the first statement.
+
+        Returns its record, or None if the program starts with anything else.
+        """
+        self.start_seen = True
+        if opcode == "START":
+            self.program_name = label
+            self.start_addr = int(operand or "0", 16)
+            self.locctr = self.start_addr
+
+            # INTERMEDIATE FORMAT
+            return make_record(self.locctr, label, opcode, operand)
+        if opcode == "CSECT" and label:
+            # Every control section is assembled from address 0
+            self.program_name = label
+            self.start_addr = self.locctr = 0
+            return make_record(0, label, "CSECT", "")
+        return None
+
+    def add_externals(self, record):
+        """Note the names listed by EXTDEF/EXTREF in the symbol table"""
+        names = [name.strip() for name in record.operand.split(",") if name.strip()]
+        if record.mnemonic == "EXTDEF":
+            self.symtab.extdefs.extend(names)
+        else:
+            self.symtab.extrefs.update(dict.fromkeys(names, 0))
+
+    # ----------------------------------------------------
+    # LITERALS
+    # ----------------------------------------------------
+    def add_literal(self, literal):
+        """Pool a literal reference; returns the name it resolves by"""
+        try:
+            return self.littab.add(literal)
+        except ValueError:
+            print(f"Warning: Bad literal '{literal}' - not pooled")
+            return literal
+
+    def literal_pool(self):
+        """Place the literals collected since the last pool at LOCCTR (LTORG/END)"""
+        block = self.blocktab.number
+        for name, value in self.littab.pool():
+            self.littab.place(name, self.locctr)
+            record = make_literal_record(self.locctr, self.littab.spelling(name), value, name)
+            if block:
+                record.block = block
+                self.block_records.append(record)
+            yield record
+            self.locctr += len(value)
+
+    # ----------------------------------------------------
+    # PROGRAM BLOCKS
+    # ----------------------------------------------------
+    def relocate_blocks(self):
+        """Give records and labels outside the default block their absolute addresses.
+
+        The blocks are laid out in order of first USE, each starting where
+        the previous one ends (a prefix sum of their lengths).
+        """
+        length = self.blocktab.assign_starts(self.start_addr, self.locctr)
+        starts = self.blocktab.starts
+        for record in self.block_records:
+            record.locctr += starts[record.block]
+            if record.opcode[:1] == "=":
+                self.littab.place(record.symbol, record.locctr)
+        symbols = self.symtab.symbols
+        for label, block in self.block_symbols:
+            symbols[label] += starts[block]
+        for label, block in self.equate_blocks.items():
+            expr, locctr = self.equates[label]
+            self.equates[label] = (expr, locctr + starts[block])
+        self.locctr = self.start_addr + length
+
+    # ----------------------------------------------------
+    # EQU
+    # ----------------------------------------------------
+    def define_equate(self, label, operand, locctr, block=0):
+        """Define an EQU label now if its operand can be evaluated, else defer it.
+
+        Once program blocks are in use addresses are block-relative until
+        the end of Pass 1, so every EQU is deferred until then.
+        """
+        try:
+            expr = compile_expression(operand)
+        except ValueError as e:
+            print(f"Warning: {e} - '{label}' not defined")
+            return
+        symbols = self.symtab.symbols
+        if not self.blocktab.in_use and all(symbol in symbols for symbol in expr.symbols):
+            try:
+                symbols[label] = expr.evaluate(symbols, locctr)
+            except ZeroDivisionError:
+                print(f"Warning: Division by zero in '{operand}' - '{label}' not defined")
+        else:
+            self.equates[label] = (expr, locctr)
+            if block:
+                self.equate_blocks[label] = block
+
+    def resolve_equates(self):
+        """Resolve every deferred EQU in one topological pass"""
+        if not self.equates:
+            return
+        for label in resolve_equates(self.equates, self.symtab.symbols):
+            expr, locctr = self.equates[label]
+            print(f"Warning: Cannot resolve EQU '{label}' = '{expr.text}' (undefined or circular symbols, or division by zero)")
+        self.equates = {}
+        self.equate_blocks = {}
@@ -1,17 +1,26 @@
 # assembler/pass2.py 
+from collections import ChainMap
 from assembler.objectwriter import ObjectWriter
 from assembler.listing import ListingWriter
+from assembler.parser import FLAG_X, FLAG_E, DATA, make_record, as_record, is_constant
+from assembler.expressions import compile_expression, is_expression
+from assembler.tables import INSTRUCTION_TABLE, OpcodeTable, RegisterTable, constant_bytes
+from assembler.vectorized import HAVE_NUMPY, encode_format3_4
 
 class Pass2:
-    def __init__(self, symtab, optab, littab=None, regtab=None):
+    def __init__(self, symtab, optab=None, littab=None, regtab=None):
         self.symtab = symtab
-        self.optab = optab
+        self.optab = optab if optab is not None else OpcodeTable()
         self.littab = littab
-        self.regtab = regtab
+        self.regtab = regtab if regtab is not None else RegisterTable()
         self.obj_writer = ObjectWriter()
+        # Symbols plus EXTREF names (value 0, fixed up by M records), both live views
+        self.values = ChainMap(symtab.symbols, symtab.extrefs)
         self.base_value = None
+        self.direct_fields = []   # reset by begin()
         self.location_counter = 0
         self.program_start = 0
+        self.stats = None   # opt-in assembler.stats.Stats, attached by begin()
 
     def parse_operand(self, operand):
         """Parse operand to extract addressing mode information"""
@@ -69,179 +78,334 @@ class Pass2:
         # If neither works, use format 4
         return target_address, 'direct'
 
-    def generate_format1(self, opcode_hex):
+    def generate_format1(self, instr):
         """Generate object code for format 1 instructions"""
-        return f"{int(opcode_hex, 16):02X}"
+        return f"{instr.opcode:02X}"
 
-    def generate_format2(self, opcode_hex, operand):
+    def generate_format2(self, instr, operand):
         """Generate object code for format 2 instructions"""
-        opcode = int(opcode_hex, 16)
-        
         if ',' in operand:
             reg1, reg2 = operand.split(',')
-            r1 = self.regtab.get(reg1.strip()) if self.regtab else 0
-            r2 = self.regtab.get(reg2.strip()) if self.regtab else 0
+            r1 = self.regtab.get(reg1.strip())
+            r2 = self.regtab.get(reg2.strip())
         else:
-            r1 = self.regtab.get(operand.strip()) if self.regtab else 0
+            r1 = self.regtab.get(operand.strip())
             r2 = 0
-            
-        return f"{opcode:02X}{r1:01X}{r2:01X}"
 
-    def generate_format3_4(self, opcode_hex, operand, locctr, is_format4=False):
-        """Generate object code for format 3/4 instructions"""
-        opcode_val = int(opcode_hex, 16)
-        
-        # Parse operand for addressing modes
-        clean_operand, _, is_indirect, is_immediate, is_indexed, _ = self.parse_operand(operand)
-        
-        # Set n,i bits based on addressing mode
-        if is_immediate:
-            n, i = 0, 1
-        elif is_indirect:
-            n, i = 1, 0
-        else:
-            n, i = 1, 1  # Simple addressing
-            
-        # Set x bit for indexed addressing
-        x = 1 if is_indexed else 0
-        
-        # Set e bit for format 4
-        e = 1 if is_format4 else 0
-        
-        # Calculate target address using SymbolTable
-        target_addr = 0
-        if clean_operand:
-            # Try symbol table first
-            sym_addr = self.symtab.lookup(clean_operand)
-            if sym_addr is not None:
-                target_addr = sym_addr
+        return f"{instr.opcode:02X}{r1:01X}{r2:01X}"
+
+    def resolve_target(self, symbol, locctr=0):
+        """Resolve a decoded operand symbol to a target address (locctr is the value of *)"""
+        if not symbol:
+            return 0
+        # Try symbol table first
+        sym_addr = self.symtab.lookup(symbol)
+        if sym_addr is not None:
+            return sym_addr
+        # Try to parse as numeric value
+        if symbol[0] == '=' and self.littab is not None:   # Literal - its pool address
+            lit_addr = self.littab.get(symbol)
+            if lit_addr is not None:
+                return lit_addr
+        if symbol[0] == '=' or symbol in self.symtab.extrefs:
+            return 0    # Bad literals were reported by Pass 1; EXTREFs are filled in by M records
+        try:
+            if is_expression(symbol):   # *-3, BUFEND-BUFFER, ...
+                return compile_expression(symbol).evaluate(self.values, locctr)
+            if symbol.startswith('X'):  # Hexadecimal literal
+                return int(symbol[2:-1], 16)
+            elif symbol.startswith('C'):  # Character literal
+                return ord(symbol[2:-1])
+            return int(symbol)
+        except ZeroDivisionError:
+            print(f"Warning: Division by zero in '{symbol}' at {locctr:04X} - assembled as 0")
+        except (ValueError, TypeError) as e:
+            if is_expression(symbol):   # Undefined symbol '...' in '...' / Bad expression '...'
+                print(f"Warning: {e} at {locctr:04X} - assembled as 0")
             else:
-                # Try to parse as numeric value
-                try:
-                    if clean_operand.startswith('X'):  # Hexadecimal literal
-                        target_addr = int(clean_operand[2:-1], 16)
-                    elif clean_operand.startswith('C'):  # Character literal  
-                        target_addr = ord(clean_operand[2:-1])
-                    else:
-                        target_addr = int(clean_operand)
-                except:
-                    target_addr = 0  # Default if cannot resolve
-                
-        # Calculate displacement and set b,p bits
-        if is_format4:
-            disp = target_addr
-            b, p = 0, 0
+                print(f"Warning: Undefined symbol '{symbol}' at {locctr:04X} - assembled as 0")
+        return 0
+
+    def generate_format3_4(self, instr, record):
+        """Generate object code for a pre-decoded format 3/4 line"""
+        flags = record.flags
+        target_addr = self.resolve_target(record.symbol, record.locctr)
+
+        # n,i come from Pass 1's flags and are pre-ORed into the table's first byte
+        first_byte = instr.first_bytes[flags >> 4]
+        x = 8 if flags & FLAG_X else 0
+
+        if flags & FLAG_E:
+            # Format 4: x b p e = x 0 0 1, 20-bit address
+            return f"{first_byte:02X}{x | 1:01X}{target_addr & 0xFFFFF:05X}"
+
+        # Format 3 - a constant that fits is its own displacement (so the code
+        # can load anywhere), an address is PC- or base-relative (b,p)
+        if is_constant(flags, record.symbol) and 0 <= target_addr <= 0xFFF:
+            disp, addr_mode = target_addr, 'direct'
         else:
-            pc_value = locctr + 3  # PC points to next instruction
+            pc_value = record.locctr + 3  # PC points to next instruction
             disp, addr_mode = self.calculate_displacement(target_addr, pc_value, self.base_value)
-            if addr_mode == 'p':
-                b, p = 0, 1
-            elif addr_mode == 'b':
-                b, p = 1, 0
-            else:  # direct
-                b, p = 0, 0
-                
-        # Combine everything into object code
-        first_byte = (opcode_val << 2) | (n << 1) | i
-        second_byte = (x << 7) | (b << 6) | (p << 5) | (e << 4)
-        
-        if is_format4:
-            # Format 4: 20-bit address
-            obj_code = f"{first_byte:02X}{second_byte:01X}{target_addr:05X}"
+            if addr_mode == 'direct':
+                self.direct_address(record, target_addr)
+        if addr_mode == 'p':
+            xbpe = x | 2
+        elif addr_mode == 'b':
+            xbpe = x | 4
+        else:  # direct
+            xbpe = x
+        return f"{first_byte:02X}{xbpe:01X}{disp & 0xFFF:03X}"
+
+    def out_of_reach(self, record, target_addr):
+        """Warn about a format 3 line that reaches its operand by no addressing mode"""
+        print(f"Warning: '{record.opcode} {record.operand}' at {record.locctr:04X} cannot reach "
+              f"{target_addr:04X} - use format 4 (+) or relax formats")
+
+    def direct_address(self, record, target_addr):
+        """A format 3 line reaching its operand neither PC- nor base-relative.
+
+        Past 0xFFF that is out of reach. Below, the 12-bit direct address
+        is fine for an absolute value, but has no room for an M record -
+        finish() warns about the ones naming a relocatable symbol, once
+        every EQU is known.
+        """
+        if 0 <= target_addr <= 0xFFF:
+            self.direct_fields.append((record, target_addr))
         else:
-            # Format 3: 12-bit displacement
-            disp_12bit = disp & 0xFFF  # Ensure 12 bits
-            obj_code = f"{first_byte:02X}{second_byte:01X}{disp_12bit:03X}"
-            
-        return obj_code
+            self.out_of_reach(record, target_addr)
+
+    def warn_direct_relocatable(self):
+        for record, target_addr in self.direct_fields:
+            if self.relocation(record.symbol):
+                print(f"Warning: '{record.opcode} {record.operand}' at {record.locctr:04X} addresses "
+                      f"{target_addr:04X} directly, which does not relocate - use format 4 (+) or relax formats")
+
+    def set_base(self, record):
+        """Follow BASE/NOBASE: the base register value assumed for the lines after it"""
+        if record.mnemonic == "BASE":
+            self.base_value = self.resolve_target(record.operand, record.locctr) if record.operand else None
+        elif record.mnemonic == "NOBASE":
+            self.base_value = None
+
+    def generate_data(self, record):
+        """Object code of a BYTE/WORD line or literal pool entry"""
+        if record.mnemonic == "WORD":
+            return f"{self.resolve_target(record.symbol, record.locctr) & 0xFFFFFF:06X}"
+        if record.opcode[:1] == "=":   # pool entry - its symbol names the literal
+            return self.littab.value(record.symbol).hex().upper()
+        return constant_bytes(record.symbol).hex().upper()
+
+    def encode(self, record):
+        """Generate object code for one IntermediateLine (None for directives)"""
+        if not record.format:
+            if record.mnemonic in DATA:
+                return self.generate_data(record)
+            return None  # Assembler directive or unknown statement
+
+        instr = INSTRUCTION_TABLE[record.mnemonic]
+
+        # Generate based on format
+        try:
+            if instr.format == 3:
+                return self.generate_format3_4(instr, record)
+            elif instr.format == 2:
+                return self.generate_format2(instr, record.operand)
+            return self.generate_format1(instr)
+        except Exception as e:
+            print(f"ERROR generating object code for '{record.opcode} {record.operand}' at {record.locctr:04X}: {e}")
+        return None
 
     def generate_object_code(self, operation, operand, locctr):
         """Main method to generate object code for any instruction"""
-    
-    # Handle assembler directives (no object code)
-        if operation in ['BASE', 'RESW', 'RESB', 'WORD', 'BYTE', 'START', 'END', 'LTORG', 'USE']:
-            return None
-    
-    # Handle format 4 instructions (preceded by '+')
-        is_format4 = operation.startswith('+') if operation else False
-        clean_operation = operation[1:] if is_format4 else operation
-    
-    # Check if it's an instruction using OpcodeTable
-        opcode_info = self.optab.get(clean_operation)
-        if not opcode_info:
-            return None  # Not an instruction
-        
-        opcode_hex, format_type = opcode_info
-    
-    # Generate based on format
+        return self.encode(make_record(locctr, "", operation or "", operand or ""))
+
+    def encode_line(self, record):
+        """encode() with error handling - a bad line is reported and emits no code"""
         try:
-            if format_type == 1:
-                return self.generate_format1(opcode_hex)
-            elif format_type == 2:
-                return self.generate_format2(opcode_hex, operand)
-            elif format_type == 3:
-            # Use format 4 if instruction has '+' prefix
-                return self.generate_format3_4(opcode_hex, operand, locctr, is_format4)
+            return self.encode(record)
         except Exception as e:
-            print(f"ERROR generating object code for '{operation} {operand}' at {locctr:04X}: {e}")
-        return None
+            print(f"Warning: Could not generate object code for '{record.opcode} {record.operand}' at {record.locctr:04X}: {e}")
+            return None
 
-        return None
+    def begin(self, start_addr=0, listing_path="output_listing.txt", stream=None,
+              program_name=None, program_length=None):
+        """Reset per-program output state before lines are emitted.
 
-    def assemble(self, intermediate_data, program_name="PROG", start_addr=0):
-        """Main assembly method - works with Pass 1 intermediate format"""
-        listing = ListingWriter("output_listing.txt")
-        current_address = start_addr
+        With a stream the object program is written to it as records
+        complete; if the program length is already known (from Pass 1) the
+        header goes out first so no text record is ever held back.
+        """
+        self.obj_writer = ObjectWriter(stream)
+        # No listing path means no listing work at all
+        self.listing = ListingWriter(listing_path) if listing_path else None
+        if self.stats is not None:
+            self.stats.instrument(self)
+        self.current_address = start_addr
         self.program_start = start_addr
-    
-        text_record_start = start_addr
-        text_record_data = []
-    
-        for line in intermediate_data:
-        # Handle both tuple and list formats from Pass 1
-            if isinstance(line, (tuple, list)) and len(line) >= 4:
-                locctr, label, operation, operand = line[:4]
-            current_address = locctr
-            
-            # Generate object code with error handling
-            try:
-                obj_code = self.generate_object_code(operation, operand, locctr)
-            except Exception as e:
-                print(f"Warning: Could not generate object code for '{operation} {operand}' at {locctr:04X}: {e}")
-                obj_code = None
-            
-            # Add to listing - handle None obj_code safely
-            obj_code_str = str(obj_code) if obj_code is not None else ""
-            listing.add_line(locctr, label or "", operation or "", operand or "", obj_code_str)
-            
-            # Handle text records - only add non-None obj_code
-            if obj_code:
-                text_record_data.append(obj_code)
-                
-                # If text record would exceed 30 bytes, write it and start new one
-                if len(text_record_data) >= 10:
-                    self.obj_writer.add_text_record(text_record_start, text_record_data)
-                    text_record_start = locctr + len(obj_code) // 2
-                    text_record_data = []
+        self.entry = start_addr   # E record address; END's operand overrides it
+        self.base_value = None    # until a BASE statement
+        self.address_fields = []  # (address, half-bytes, operand) of format 4 and WORD fields
+        self.direct_fields = []   # (record, address) of format 3 lines using a direct address
+        self.equates = {}         # EQU label -> operand, to tell absolute values from addresses
+        self.relocations = {}     # symbol -> times the load address is added into its value
+        if program_length is not None:
+            self.write_header(program_name or "PROG", start_addr, program_length)
+
+    def write_header(self, program_name, start_addr, program_length):
+        """H record, followed by D/R records for EXTDEF/EXTREF names"""
+        symbols = self.symtab.symbols
+        definitions = []
+        for name in self.symtab.extdefs:
+            if name in symbols:
+                definitions.append((name, symbols[name]))
             else:
-                # Write current text record if there's data and we hit a non-code line
-                if text_record_data:
-                    self.obj_writer.add_text_record(text_record_start, text_record_data)
-                    text_record_start = locctr + 3  # Move to next instruction
-                    text_record_data = []
-    
-    # Write any remaining text record data
-        if text_record_data:
-            self.obj_writer.add_text_record(text_record_start, text_record_data)
-    
-    # Calculate program length
-        program_length = current_address - start_addr
-    
-    # Write header and end records
+                print(f"Warning: EXTDEF '{name}' is not defined in {program_name}")
+        self.obj_writer.add_define_records(definitions)
+        self.obj_writer.add_refer_records(self.symtab.extrefs)
         self.obj_writer.write_header(program_name, start_addr, program_length)
-        self.obj_writer.write_end(start_addr)
-    
-    # Write listing file
-        listing.write()
-    
-        return self.obj_writer.generate()
\ No newline at end of file
+
+    def add_external_modifications(self, record):
+        """M records asking the loader to add (or subtract) EXTREF addresses in this line's field"""
+        extrefs = self.symtab.extrefs
+        symbol = record.symbol
+        if symbol in extrefs:
+            terms = {symbol: 1}
+        elif is_expression(symbol):
+            try:
+                expr = compile_expression(symbol)
+                terms = expr.coefficients([name for name in expr.symbols if name in extrefs])
+            except (ValueError, ZeroDivisionError):
+                return
+        else:
+            return
+        if not terms:
+            return
+
+        if record.mnemonic == "WORD":
+            address, length = record.locctr, 6        # the whole 3-byte word
+        elif record.flags & FLAG_E:
+            address, length = record.locctr + 1, 5    # 20-bit address field of format 4
+        else:
+            print(f"Warning: External reference '{symbol}' at {record.locctr:04X} needs format 4")
+            return
+        for name, count in terms.items():
+            sign = "+" if count > 0 else "-"
+            for _ in range(abs(count)):
+                self.obj_writer.add_modification_record(address, length, sign + name)
+
+    def relocation(self, symbol):
+        """How many times the program's load address is added into symbol's value.
+
+        Labels and literals count 1, numbers and EXTREF names 0 (the loader
+        adds those by name); EQU symbols and expressions add up their
+        terms, so BUFEND-BUFFER or MAXLEN EQU 4096 are absolute.
+        """
+        count = self.relocations.get(symbol)
+        if count is not None:
+            return count
+        self.relocations[symbol] = 0   # a circular EQU is left absolute
+        if symbol[0] == "=":
+            count = 1 if self.littab is not None and self.littab.get(symbol) is not None else 0
+        elif symbol in self.equates:
+            count = self.relocation(self.equates[symbol])
+        elif is_expression(symbol):
+            try:
+                expr = compile_expression(symbol)
+                counts = {name: self.relocation(name) for name in expr.symbols}
+                # Expressions are sums of terms: * and each name contribute their count
+                count = expr.evaluate(counts, 1) - expr.evaluate(dict.fromkeys(expr.symbols, 0), 0)
+            except (ValueError, ZeroDivisionError):
+                count = 0
+        else:
+            count = 1 if symbol in self.symtab.symbols else 0
+        self.relocations[symbol] = count
+        return count
+
+    def add_relocations(self):
+        """Unnamed M records for every address field holding a relocatable value.
+
+        Fields are collected while lines are emitted and counted here, once
+        every EQU is known. Each record covers exactly one field; M records
+        only add their value in, so fields are never merged into one.
+        """
+        for address, length, symbol in self.address_fields:
+            count = self.relocation(symbol)
+            for _ in range(abs(count)):
+                self.obj_writer.add_modification_record(address, length, "" if count > 0 else "-")
+
+    def emit(self, record, obj_code):
+        """Add one encoded line to the listing and the text records, in program order"""
+        locctr = record.locctr
+        self.current_address = locctr
+
+        if self.listing is not None:
+            self.listing.add_line(locctr, record.label, record.opcode, record.operand, obj_code)
+
+        if record.mnemonic == "END" and record.operand:
+            entry = self.symtab.lookup(record.operand)
+            self.entry = entry if entry is not None else self.program_start
+        elif record.mnemonic == "CSECT":
+            self.entry = None   # a control section has no entry point unless its END names one
+        elif record.mnemonic == "EQU" and record.label:
+            self.equates.setdefault(record.label, record.operand)
+
+        # Text records: the writer starts a new record on any address gap
+        # (RESW/RESB, BYTE/WORD) and whenever one fills up; each USE block
+        # keeps its own open record
+        if obj_code:
+            self.obj_writer.add_code(locctr, obj_code, record.block)
+            if self.symtab.extrefs and record.symbol:
+                self.add_external_modifications(record)
+            # Absolute addresses the loader must move: format 4 and WORD fields
+            if record.symbol and record.mnemonic == "WORD":
+                self.address_fields.append((locctr, 6, record.symbol))
+            elif record.symbol and record.flags & FLAG_E:
+                self.address_fields.append((locctr + 1, 5, record.symbol))
+
+    def finish(self, program_name, program_length=None):
+        """Flush the last text record, write H/E records and the listing"""
+        # Write header unless begin() already did
+        if not self.obj_writer.header:
+            if program_length is None:
+                program_length = self.current_address - self.program_start
+            self.write_header(program_name, self.program_start, program_length)
+
+        # Flush remaining text, write M records and the end record
+        self.warn_direct_relocatable()
+        self.add_relocations()
+        self.obj_writer.write_end(self.entry)
+
+        # Write listing file
+        if self.listing is not None:
+            self.listing.write()
+
+        return self.obj_writer.generate()
+
+    def assemble(self, intermediate_data, program_name="PROG", start_addr=0, listing_path="output_listing.txt",
+                 stream=None, program_length=None, columns=None):
+        """Main assembly method - works with Pass 1 intermediate format.
+
+        Pass a text file handle as stream to write the object program while
+        assembling (the return value is then ""), and Pass 1's program
+        length so the header can be written first. listing_path=None skips
+        the listing entirely. columns (a Pass 1's Columns, see
+        Pass1.assemble(vectorized=True)) encodes all format 3/4 lines in one
+        NumPy batch first (ignored when NumPy is not installed).
+        """
+        self.begin(start_addr, listing_path, stream, program_name, program_length)
+
+        if columns is not None and HAVE_NUMPY:
+            codes = iter(encode_format3_4(self, columns))
+            for line in intermediate_data:
+                record = as_record(line)
+                self.set_base(record)
+                self.emit(record, next(codes) if record.format == 3 else self.encode_line(record))
+            return self.finish(program_name)
+
+        for line in intermediate_data:
+            # Pass 1 records are used as-is; legacy tuples are decoded once here
+            record = as_record(line)
+            self.set_base(record)
+            self.emit(record, self.encode_line(record))
+
+        return self.finish(program_name)
@@ -0,0 +1,30 @@
+# assembler/protocol.py
+"""Client side of the assembler daemon protocol (see assembler.server).
+
+Standard library only, so client.py starts without importing the
+assembler itself.
+"""
+import json
+import os
+import socket
+import tempfile
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"sicxe-assembler-{os.getuid()}.sock")
+OPTIONS = ("listing", "one_pass", "vectorized", "relax", "auto_base")   # assemble request flags
+
+
+def request_all(requests, path=DEFAULT_SOCKET):
+    """Send requests over one connection and return the responses in request order"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(path)
+        conn.sendall(b"".join(json.dumps({**request, "id": i}).encode() + b"\n"
+                              for i, request in enumerate(requests)))
+        conn.shutdown(socket.SHUT_WR)
+        responses = [None] * len(requests)
+        with conn.makefile("rb") as replies:
+            for line in replies:
+                response = json.loads(line)
+                if response.get("id") is None:
+                    raise ValueError(response.get("error", "bad response"))
+                responses[response["id"]] = response
+    return responses
@@ -0,0 +1,176 @@
+# assembler/relax.py
+"""Format relaxation: format 4 only where format 3 cannot reach.
+
+Pass 1 sizes every instruction optimistically, as written (format 3
+unless marked +). relax_formats() then checks each format 3 line whose
+operand is an address: one its target reaches neither PC-relative nor
+through the BASE in effect is promoted to format 4. A promotion makes
+its line one byte longer and moves everything after it, which may put
+other lines out of reach, so the check repeats until a round promotes
+nothing. Lines only ever grow, so this ends after at most one round per
+promotion.
+
+Records are not rewritten between rounds. Every address is derived from
+its Pass 1 address plus the number of promoted lines before it - one
+bisect in the sorted list of promoted addresses - so a round costs one
+cheap check per line still in format 3, and the final addresses are
+written back once.
+"""
+from bisect import bisect_left, insort
+from assembler.parser import FLAG_E, is_constant
+from assembler.expressions import compile_expression, is_expression
+
+
+class Layout:
+    """Symbol values with the promotions so far applied to Pass 1's addresses.
+
+    Behaves like the symbol table dict for Expression.evaluate().
+    """
+
+    def __init__(self, labels, equates, littab):
+        self.labels = labels        # label -> Pass 1 address
+        self.equates = equates      # EQU label -> (Expression, Pass 1 LOCCTR)
+        self.littab = littab
+        self.promoted = []          # Pass 1 addresses of promoted lines, sorted
+        self.values = {}            # values worked out since the last promotion
+
+    def address(self, address):
+        """Where a Pass 1 address has moved to"""
+        return address + bisect_left(self.promoted, address)
+
+    def promote(self, address):
+        insort(self.promoted, address)
+        self.values = {}
+
+    def get(self, name, default=None):
+        value = self.values.get(name)
+        if value is not None:
+            return value
+        if name in self.labels:
+            value = self.address(self.labels[name])
+        elif name in self.equates:
+            self.values[name] = 0   # a circular EQU evaluates to 0 instead of recursing
+            expr, locctr = self.equates[name]
+            try:
+                value = expr.evaluate(self, self.address(locctr))
+            except (ValueError, ZeroDivisionError):
+                value = None
+        elif name[:1] == "=" and self.littab is not None and self.littab.get(name) is not None:
+            value = self.address(self.littab.get(name))
+        if value is None:
+            self.values.pop(name, None)
+            return default
+        self.values[name] = value
+        return value
+
+    def target(self, symbol, locctr):
+        """Value of an operand at its line's current address, or None if it is not known"""
+        if is_expression(symbol):
+            try:
+                return compile_expression(symbol).evaluate(self, self.address(locctr))
+            except (ValueError, ZeroDivisionError):
+                return None
+        if symbol.isdigit():
+            return int(symbol)
+        return self.get(symbol)
+
+
+def layout_of(pass1):
+    """A Layout of a finished Pass 1, no promotions yet"""
+    symbols = pass1.symtab.symbols
+    labels = {}
+    equates = {}
+    for record in pass1.intermediate:
+        label = record.label
+        if record.mnemonic == "EQU":
+            if label in symbols and label not in equates:
+                equates[label] = (compile_expression(record.operand), record.locctr)
+        elif label and label != "*" and symbols.get(label) == record.locctr:
+            labels.setdefault(label, record.locctr)
+    return Layout(labels, equates, pass1.littab)
+
+
+def address_lines(records):
+    """(record, BASE operand and LOCCTR or None) of every format 3 line with an address operand"""
+    lines = []
+    base = None
+    for record in records:
+        if record.mnemonic == "BASE":
+            base = (record.operand, record.locctr) if record.operand else None
+        elif record.mnemonic == "NOBASE":
+            base = None
+        elif record.format == 3 and not record.flags & FLAG_E and not is_constant(record.flags, record.symbol):
+            lines.append((record, base))
+    return lines
+
+
+def is_external(symbol, extrefs):
+    """True if an operand names an EXTREF symbol (its value is only known to the loader)"""
+    names = compile_expression(symbol).symbols if is_expression(symbol) else (symbol,)
+    return any(name in extrefs for name in names)
+
+
+def relax_formats(pass1):
+    """Promote out-of-reach format 3 lines of a finished Pass 1 to format 4.
+
+    Updates the records, symbol table, literal table and LOCCTR in place
+    and returns the number of promoted lines.
+    """
+    records = pass1.intermediate
+    symtab = pass1.symtab
+    layout = layout_of(pass1)
+    labels = layout.labels
+    equates = layout.equates
+    candidates = address_lines(records)
+
+    # EXTREF operands are only known to the loader: always format 4
+    extrefs = symtab.extrefs
+    promoted = [entry for entry in candidates if is_external(entry[0].symbol, extrefs)] if extrefs else []
+
+    # Each round checks the lines still in format 3 against the layout so far
+    chosen = []
+    while True:
+        for record, _ in promoted:
+            layout.promote(record.locctr)
+            chosen.append(record)
+        if promoted:
+            done = {id(record) for record, _ in promoted}
+            candidates = [entry for entry in candidates if id(entry[0]) not in done]
+        promoted = [entry for entry in candidates if not reaches(layout, *entry)]
+        if not promoted:
+            break
+
+    # Write the final addresses back
+    if chosen:
+        for record in chosen:
+            record.opcode = "+" + record.opcode
+            record.flags |= FLAG_E
+            record.size = 4
+        for record in records:
+            record.locctr = layout.address(record.locctr)
+            if record.opcode[:1] == "=":
+                pass1.littab.place(record.symbol, record.locctr)
+        symbols = symtab.symbols
+        for label, address in labels.items():
+            symbols[label] = layout.address(address)
+        for label in equates:
+            value = layout.get(label)
+            if value is not None:
+                symbols[label] = value
+        pass1.locctr = layout.address(pass1.locctr)
+    return len(chosen)
+
+
+def reaches(layout, record, base):
+    """True if a format 3 line reaches its operand PC- or base-relative (or its operand is unknown)"""
+    target = layout.target(record.symbol, record.locctr)
+    if target is None:
+        return True   # undefined - Pass 2 reports it
+    pc = layout.address(record.locctr) + 3
+    if -2048 <= target - pc <= 2047:
+        return True
+    if base is not None:
+        base_value = layout.target(*base)
+        if base_value is not None and 0 <= target - base_value <= 4095:
+            return True
+    return False
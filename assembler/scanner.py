@@ -0,0 +1,91 @@
+# assembler/scanner.py
+"""Memory-mapped source scanner.
+
+SourceScanner maps a source file and finds its statements with one
+compiled bytes pattern run over the whole map: blank and comment lines
+are skipped inside the regex engine without becoming Python objects,
+and of each statement only the label, opcode and operand fields are
+copied out and decoded; the comment field is skipped by the pattern.
+
+Iterating a scanner gives plain decoded lines, so it can stand in for
+an open file anywhere (macro expansion, control sections); Pass 1
+asks it for pre-split statements instead (see Pass1.statements).
+"""
+import mmap
+import re
+from assembler.parser import STATEMENT_FIELDS, statement_fields
+
+# parser.STATEMENT as bytes, the rest of the line (the comment field) skipped.
+# Lines end in \n, \r\n or a bare \r (universal newlines, as text-mode files read them);
+# ^ only knows \n, so sources with bare \r line ends get a slower look-behind variant.
+FIELDS = STATEMENT_FIELDS.encode() + rb"[^\r\n]*"
+STATEMENT = re.compile(rb"^" + FIELDS, re.M)
+STATEMENT_CR = re.compile(rb"(?:\A|(?<=[\r\n]))" + FIELDS)
+BARE_CR = re.compile(rb"\r(?!\n)")
+LINE_END = re.compile(rb"\r\n?|\n")
+
+
+class ScannedLine:
+    """A statement's source text, decoded only if a warning prints it."""
+    __slots__ = ("match",)
+
+    def __init__(self, match):
+        self.match = match
+
+    def __str__(self):
+        return self.match.group().decode().strip()
+
+    def __repr__(self):
+        return f"ScannedLine({str(self)!r})"
+
+
+class SourceScanner:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:   # an empty file cannot be mapped
+            self.data = b""
+        self.has_macros = self.mentions("MACRO")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def mentions(self, word):
+        """True if word appears anywhere in the source as a whole word (any case)"""
+        return re.search(rb"\b" + word.encode() + rb"\b", self.data, re.IGNORECASE) is not None
+
+    def __iter__(self):
+        """Decoded source lines without line endings, like str.splitlines()"""
+        data = self.data
+        start = 0
+        end = len(data)
+        search = LINE_END.search
+        while start < end:
+            match = search(data, start)
+            if match is None:
+                yield data[start:].decode()
+                return
+            yield data[start:match.start()].decode()
+            start = match.end()
+
+    def statements(self):
+        """(line, label, opcode, operand) per statement, fields as parser.split_statement gives them.
+
+        line is a ScannedLine; comment and blank lines are not reported.
+        """
+        pattern = STATEMENT_CR if BARE_CR.search(self.data) else STATEMENT
+        for match in pattern.finditer(self.data):
+            indent, first, second, third = match.groups()
+            label, opcode, operand, _ = statement_fields(indent, first.decode(), second and second.decode(),
+                                                         third and third.decode())
+            yield ScannedLine(match), label, opcode, operand
@@ -0,0 +1,92 @@
+# assembler/sections.py
+"""Control sections (CSECT) assembled independently.
+
+A source is cut into sections at every CSECT; each one gets its own
+Pass 1 (LOCCTR from 0, symbol table, literal pools) and Pass 2, and
+produces a complete H/D/R/T/M/E record set. Sections only meet through
+EXTDEF/EXTREF, so they can be assembled on a process pool and joined in
+source order afterwards.
+"""
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from assembler.macros import MacroProcessor
+from assembler.parser import split_statement
+from assembler.twopass import two_pass
+
+CSECT_WORD = re.compile(r"\bCSECT\b", re.IGNORECASE)
+END_WORD = re.compile(r"\bEND\b", re.IGNORECASE)
+PARALLEL_MIN_LINES = 20000   # below this a process pool costs more than it saves
+
+
+def has_sections(lines):
+    """True if any statement is a CSECT (not just a comment or label naming one)"""
+    return any(CSECT_WORD.search(line) and split_statement(line)[1] == "CSECT" for line in lines)
+
+
+def split_sections(lines):
+    """Cut source lines into one list of lines per control section.
+
+    The END statement is taken off the last section; the first section
+    gets it back (it names the entry point) and every other section ends
+    with a bare END, so each one closes its own literal pool.
+    """
+    sections = [[]]
+    end_operand = ""
+    for line in lines:
+        if CSECT_WORD.search(line) or END_WORD.search(line):
+            _, opcode, operand, _ = split_statement(line)
+            if opcode == "CSECT":
+                sections.append([line])
+                continue
+            if opcode == "END":
+                end_operand = operand
+                break
+        sections[-1].append(line)
+
+    if not sections[0] and len(sections) > 1:
+        del sections[0]   # source opened with CSECT
+    sections[0].append(f"        END     {end_operand}".rstrip())
+    for section in sections[1:]:
+        section.append("        END")
+    return sections
+
+
+def assemble_section(lines, listing=True, vectorized=False, relax=False):
+    """Two-pass assembly of one section; returns (object program, listing text)"""
+    listing_file = io.StringIO() if listing else None
+    object_program = two_pass(lines, listing_file, vectorized=vectorized, relax=relax)[0]
+    return object_program, listing_file.getvalue() if listing else ""
+
+
+def assemble_sections(lines, listing_path=None, jobs=None, vectorized=False, relax=False):
+    """Assemble every control section of lines and return the joined object program.
+
+    Macros are expanded once over the whole source first, since a
+    definition may be used in any section. jobs=1 assembles in this
+    process; otherwise large sources use a process pool (jobs workers,
+    default one per CPU) and small ones stay serial. listing_path may
+    also be an open text stream.
+    """
+    sections = split_sections(MacroProcessor().expand(lines))
+    worker = partial(assemble_section, listing=bool(listing_path), vectorized=vectorized, relax=relax)
+
+    parallel = len(sections) > 1 and jobs != 1
+    if jobs is None:
+        parallel = parallel and sum(map(len, sections)) >= PARALLEL_MIN_LINES
+    if parallel:
+        with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count(), len(sections))) as pool:
+            results = list(pool.map(worker, sections))
+    else:
+        results = [worker(section) for section in sections]
+
+    if listing_path:
+        listing = "\n".join(listing for _, listing in results)
+        if hasattr(listing_path, "write"):
+            listing_path.write(listing)
+        else:
+            with open(listing_path, "w") as f:
+                f.write(listing)
+    return "\n".join(object_program for object_program, _ in results)
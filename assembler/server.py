@@ -0,0 +1,207 @@
+# assembler/server.py
+"""Resident assembler daemon on a Unix domain socket.
+
+    python -m assembler.server --jobs 4 &      # start it once
+    python client.py examples/literals.txt     # then assemble through it
+
+The server keeps a process pool of warm workers (assembler modules
+imported, tables and expression/macro caches filled), so a request pays
+neither interpreter startup nor imports. Requests and responses are one
+JSON object per line; a connection may send many requests without
+waiting, each is answered as soon as its assembly finishes, matched by
+"id":
+
+    {"id": 1, "op": "assemble", "path": "/abs/prog.txt", "listing": true}
+    {"id": 2, "op": "assemble", "source": "COPY START 0\\n...", "one_pass": true}
+    {"id": 1, "ok": true, "object": "HCOPY ...", "listing": "...", "diagnostics": "", "cached": false}
+
+The assemble flags are assembler.protocol.OPTIONS (main.py's listing,
+one_pass, vectorized, relax and auto_base). Other ops are "ping"
+(request counters) and "shutdown". Results are kept
+in a small LRU cache keyed by source text and options, so an unchanged
+file is answered without touching the pool.
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from assembler.autobase import plan_base
+from assembler.onepass import OnePass
+from assembler.protocol import DEFAULT_SOCKET, OPTIONS
+from assembler.sections import has_sections, assemble_sections
+from assembler.tables import OpcodeTable, RegisterTable
+from assembler.twopass import two_pass
+
+RESULT_CACHE = 256       # assembled results kept for unchanged sources
+SHUTDOWN_GRACE = 2.0     # seconds open connections get to finish on shutdown
+WARM_UP = ["WARM    START   0", "FIRST   LDA     =C'EOF'", "        +JSUB   FIRST", "        END     FIRST"]
+
+
+# ----------------------------------------------------
+# WORKERS
+# ----------------------------------------------------
+def assemble_source(source, listing=True, one_pass=False, vectorized=False, relax=False, auto_base=False):
+    """Worker entry point: assemble source text.
+
+    The options are main.assemble_file()'s. Returns {"ok", "object", "listing", "diagnostics"}; diagnostics is
+    everything the assembler printed (warnings, or the error that stopped
+    it).
+    """
+    lines = source.splitlines()
+    listing_file = io.StringIO() if listing else None
+    diagnostics = io.StringIO()
+    object_program = ""
+    ok = True
+    with contextlib.redirect_stdout(diagnostics):
+        try:
+            if (relax or auto_base) and one_pass:
+                raise ValueError("relax and auto_base need the whole program laid out first - not with one_pass")
+            if has_sections(lines):
+                if one_pass:
+                    raise ValueError("one_pass does not support control sections (CSECT)")
+                # Already on a pool worker - sections stay serial
+                object_program = assemble_sections(lines, listing_file, jobs=1, vectorized=vectorized, relax=relax)
+            elif one_pass:
+                object_program = OnePass(OpcodeTable(), RegisterTable()).assemble(lines, listing_path=listing_file)
+            else:
+                if auto_base:
+                    lines, relax = plan_base(lines).lines, True
+                object_program = two_pass(lines, listing_file, vectorized=vectorized, relax=relax)[0]
+        except Exception as e:
+            print(f"Failed: {e}")
+            ok = False
+    return {"ok": ok, "object": object_program, "listing": listing_file.getvalue() if listing else "",
+            "diagnostics": diagnostics.getvalue()}
+
+
+def warm_up():
+    """Pool initializer: run one tiny assembly so the first request finds everything loaded"""
+    assemble_source("\n".join(WARM_UP))
+
+
+# ----------------------------------------------------
+# SERVER
+# ----------------------------------------------------
+class AssemblerServer:
+    def __init__(self, path=DEFAULT_SOCKET, jobs=None, cache_size=RESULT_CACHE):
+        self.path = path
+        self.jobs = jobs                 # pool workers (None: one per CPU)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()       # (source, options) digest -> future of the result
+        self.pool = None
+        self.stopping = None             # asyncio.Event set by a "shutdown" request
+        self.connections = set()         # handler tasks of open connections
+        self.requests = 0
+        self.cache_hits = 0
+
+    async def serve(self, ready=None):
+        """Listen on self.path until a "shutdown" request; ready() is called once listening"""
+        self.stopping = asyncio.Event()
+        if os.path.exists(self.path):
+            os.unlink(self.path)   # left over from a server that did not shut down
+        # Forked workers would inherit open client connections (and hold them open);
+        # forkserver workers start from a clean process
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("forkserver"),
+                                        initializer=warm_up)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        try:
+            if ready is not None:
+                ready()
+            await self.stopping.wait()
+        finally:
+            server.close()
+            if self.connections:   # let replies in flight (the shutdown's own) go out
+                await asyncio.wait(self.connections, timeout=SHUTDOWN_GRACE)
+            await server.wait_closed()
+            self.pool.shutdown(cancel_futures=True)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def handle(self, reader, writer):
+        """One connection: every request line becomes its own task"""
+        tasks = set()
+        self.connections.add(asyncio.current_task())
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self.respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            self.connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def respond(self, line, writer):
+        request = {}
+        try:
+            request = json.loads(line)
+            response = await self.dispatch(request)
+        except Exception as e:   # bad JSON, unknown op, unreadable path - the daemon keeps running
+            response = {"ok": False, "error": str(e)}
+        response["id"] = request.get("id") if isinstance(request, dict) else None
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def dispatch(self, request):
+        op = request.get("op", "assemble")
+        if op == "ping":
+            return {"ok": True, "requests": self.requests, "cache_hits": self.cache_hits, "pid": os.getpid()}
+        if op == "shutdown":
+            self.stopping.set()
+            return {"ok": True}
+        if op != "assemble":
+            raise ValueError(f"Unknown op '{op}'")
+
+        self.requests += 1
+        source = request.get("source")
+        if source is None:
+            if "path" not in request:
+                raise ValueError("assemble needs 'source' or 'path'")
+            source = await asyncio.to_thread(read_source, request["path"])
+        options = {name: bool(request.get(name, name == "listing")) for name in OPTIONS}
+
+        # Requests still being assembled are cached too, so duplicates share one run
+        key = hashlib.sha1(json.dumps([source, options]).encode()).digest()
+        result = self.cache.get(key)
+        cached = result is not None
+        if cached:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+        else:
+            loop = asyncio.get_running_loop()
+            result = self.cache[key] = loop.run_in_executor(self.pool, partial(assemble_source, source, **options))
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        try:
+            return {**await asyncio.shield(result), "cached": cached}
+        except Exception:
+            self.cache.pop(key, None)   # a broken pool is not a result
+            raise
+
+
+def read_source(path):
+    with open(path) as f:
+        return f.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SIC/XE assembler daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, metavar="PATH", help="Unix socket to listen on")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--cache", type=int, default=RESULT_CACHE, metavar="N",
+                        help="assembled results kept for unchanged sources")
+    args = parser.parse_args(argv)
+    server = AssemblerServer(args.socket, args.jobs, args.cache)
+    asyncio.run(server.serve(lambda: print(f"Assembler server listening on {args.socket}", flush=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# assembler/stats.py
+"""Opt-in instrumentation of an assembly run.
+
+Nothing here is imported or called on the normal path: a Stats object
+only does work once it is handed to an assembly (Pass2.stats, or
+main.assemble_file(stats=...)). Pass 2, its ObjectWriter and its
+ListingWriter are then instrumented per instance by wrapping the methods
+that matter, so the classes themselves never test for a stats object
+inside their per-line code.
+
+    stats = Stats()          # Stats(memory=True) adds tracemalloc peaks
+    stats.add_hook(lambda phase, result: print(phase, result["seconds"]))
+    with stats.phase("pass1") as result:
+        intermediate = ...
+        result["lines"] = len(intermediate)
+    pass2.stats = stats      # picked up by Pass2.begin()
+    print(stats.to_json())
+"""
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from assembler.parser import FLAG_E
+
+
+class Stats:
+    def __init__(self, memory=False):
+        # tracemalloc peaks per phase; tracing slows every allocation down, so
+        # phase seconds of a memory run are several times too high
+        self.memory = memory
+        self.phases = {}             # phase -> {"seconds", "lines", "peak_kib"}
+        self.counters = Counter()    # symbol hits/misses, encodings, records written
+        self.timers = Counter()      # seconds spent inside instrumented writers and the encoder
+        self.hooks = []              # callables (phase, result) run as each phase ends
+
+    def add_hook(self, hook):
+        """Call hook(phase, result) whenever a phase ends"""
+        self.hooks.append(hook)
+
+    @contextmanager
+    def phase(self, name, lines=None):
+        """Time the body as phase name; the yielded dict may be filled in (e.g. "lines")
+
+        With memory on, tracing starts before the clock and its peak is read
+        after it stops, but the body still runs traced.
+        """
+        result = {"seconds": 0.0, "lines": lines, "peak_kib": None}
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            result["seconds"] = time.perf_counter() - start
+            if self.memory:
+                result["peak_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            if tracing:
+                tracemalloc.stop()
+            self.phases[name] = result
+            for hook in self.hooks:
+                hook(name, result)
+
+    # ----------------------------------------------------
+    # INSTRUMENTATION
+    # ----------------------------------------------------
+    def instrument(self, pass2):
+        """Wrap the hot methods of one Pass2 and its writers (called by Pass2.begin)"""
+        counters = self.counters
+        timers = self.timers
+        clock = time.perf_counter
+        symbols = pass2.symtab.symbols
+
+        resolve_target = pass2.resolve_target
+
+        def counted_resolve(symbol, locctr=0):
+            # A miss falls through to the literal, expression and number parsers
+            counters["symbol_hits" if symbol in symbols else "symbol_misses"] += 1
+            return resolve_target(symbol, locctr)
+        pass2.resolve_target = counted_resolve
+
+        encode = pass2.encode
+
+        def counted_encode(record):
+            start = clock()
+            obj_code = encode(record)
+            timers["encode"] += clock() - start
+            if record.format:
+                counters[f"format{4 if record.flags & FLAG_E else record.format}"] += 1
+            elif obj_code:
+                counters["data"] += 1
+            return obj_code
+        pass2.encode = counted_encode
+
+        writer = pass2.obj_writer
+        put = writer._put
+
+        def counted_put(record):
+            # Records held back until the header is known are put again later
+            if writer.stream is None or writer.header:
+                counters[f"{record[0]}_records"] += 1
+            return put(record)
+        writer._put = counted_put
+        write_end = writer.write_end
+
+        def counted_end(first_exec_addr):
+            write_end(first_exec_addr)
+            if writer.stream is None:   # only T records went through _put
+                for record in [writer.header, *writer.link_records, *writer.modification_records, "E"]:
+                    counters[f"{record[0]}_records"] += 1
+        writer.write_end = counted_end
+        self.time_methods(writer, "objectwriter", ("add_code", "write_header", "write_end"))
+
+        if pass2.listing is not None:
+            self.time_methods(pass2.listing, "listing", ("add_line", "write"))
+            add_line = pass2.listing.add_line
+
+            def counted_line(*args):
+                counters["listing_lines"] += 1
+                return add_line(*args)
+            pass2.listing.add_line = counted_line
+
+    def time_methods(self, target, timer, names):
+        """Add the time spent in target's methods names to self.timers[timer].
+
+        Only entry points are wrapped; methods they call internally would
+        be counted twice.
+        """
+        timers = self.timers
+        clock = time.perf_counter
+        for name in names:
+            method = getattr(target, name)
+
+            def timed(*args, _method=method, **kwargs):
+                start = clock()
+                try:
+                    return _method(*args, **kwargs)
+                finally:
+                    timers[timer] += clock() - start
+            setattr(target, name, timed)
+
+    # ----------------------------------------------------
+    # REPORT
+    # ----------------------------------------------------
+    def report(self):
+        """Everything collected, as plain data"""
+        return {
+            "phases": self.phases,
+            "seconds_in": {name: round(seconds, 6) for name, seconds in self.timers.items()},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.report(), indent=indent)
@@ -1,40 +1,76 @@
 # assembler/tables.py - CORRECTED INDENTATION
+from collections import namedtuple
+from itertools import accumulate
+from types import MappingProxyType
+
+# SIC/XE Instruction Set - opcode in hex, format
+SICXE_INSTRUCTIONS = {
+    'ADD': ('18', 3), 'ADDF': ('58', 3), 'ADDR': ('90', 2),
+    'AND': ('40', 3), 'CLEAR': ('B4', 2), 'COMP': ('28', 3),
+    'COMPF': ('88', 3), 'COMPR': ('A0', 2), 'DIV': ('24', 3),
+    'DIVF': ('64', 3), 'DIVR': ('9C', 2), 'FIX': ('C4', 1),
+    'FLOAT': ('C0', 1), 'HIO': ('F4', 1), 'J': ('3C', 3),
+    'JEQ': ('30', 3), 'JGT': ('34', 3), 'JLT': ('38', 3),
+    'JSUB': ('48', 3), 'LDA': ('00', 3), 'LDB': ('68', 3),
+    'LDCH': ('50', 3), 'LDF': ('70', 3), 'LDL': ('08', 3),
+    'LDS': ('6C', 3), 'LDT': ('74', 3), 'LDX': ('04', 3),
+    'LPS': ('D0', 3), 'MUL': ('20', 3), 'MULF': ('60', 3),
+    'MULR': ('98', 2), 'NORM': ('C8', 1), 'OR': ('44', 3),
+    'RD': ('D8', 3), 'RMO': ('AC', 2), 'RSUB': ('4C', 3),
+    'SHIFTL': ('A4', 2), 'SHIFTR': ('A8', 2), 'SIO': ('F0', 1),
+    'SSK': ('EC', 3), 'STA': ('0C', 3), 'STB': ('78', 3),
+    'STCH': ('54', 3), 'STF': ('80', 3), 'STI': ('D4', 3),
+    'STL': ('14', 3), 'STS': ('7C', 3), 'STSW': ('E8', 3),
+    'STT': ('84', 3), 'STX': ('10', 3), 'SUB': ('1C', 3),
+    'SUBF': ('5C', 3), 'SUBR': ('94', 2), 'SVC': ('B0', 2),
+    'TD': ('E0', 3), 'TIO': ('F8', 1), 'TIX': ('2C', 3),
+    'TIXR': ('B8', 2), 'WD': ('DC', 3)
+}
+
+# Assembler directives - no opcode, never encoded
+DIRECTIVES = frozenset({
+    'START', 'END', 'BYTE', 'WORD', 'RESB', 'RESW', 'BASE', 'NOBASE',
+    'LTORG', 'EQU', 'ORG', 'USE', 'CSECT', 'EXTDEF', 'EXTREF',
+})
+
+# One decoded instruction. first_bytes[ni] is the first object code byte
+# with the n/i bits already ORed in (ni = n*2 + i), so format 3/4 encoding
+# never touches the opcode itself.
+Instruction = namedtuple("Instruction", ["mnemonic", "opcode", "format", "size", "first_bytes"])
+
+def _build_instruction_table():
+    table = {}
+    for mnemonic, (opcode_hex, fmt) in SICXE_INSTRUCTIONS.items():
+        opcode = int(opcode_hex, 16)
+        table[mnemonic] = Instruction(mnemonic, opcode, fmt, fmt, tuple(opcode | ni for ni in range(4)))
+    return MappingProxyType(table)
+
+# The canonical instruction table - built once at import, read-only, shared
+# by Pass 1 sizing and Pass 2 encoding.
+INSTRUCTION_TABLE = _build_instruction_table()
+
+
 class OPTAB:
-    # SIC/XE Instruction Set - opcode in hex, format
-    INSTRUCTIONS = {
-        'ADD': ('18', 3), 'ADDF': ('58', 3), 'ADDR': ('90', 2),
-        'AND': ('40', 3), 'CLEAR': ('B4', 2), 'COMP': ('28', 3),
-        'COMPF': ('88', 3), 'COMPR': ('A0', 2), 'DIV': ('24', 3),
-        'DIVF': ('64', 3), 'DIVR': ('9C', 2), 'FIX': ('C4', 1),
-        'FLOAT': ('C0', 1), 'HIO': ('F4', 1), 'J': ('3C', 3),
-        'JEQ': ('30', 3), 'JGT': ('34', 3), 'JLT': ('38', 3),
-        'JSUB': ('48', 3), 'LDA': ('00', 3), 'LDB': ('68', 3),
-        'LDCH': ('50', 3), 'LDF': ('70', 3), 'LDL': ('08', 3),
-        'LDS': ('6C', 3), 'LDT': ('74', 3), 'LDX': ('04', 3),
-        'LPS': ('D0', 3), 'MUL': ('20', 3), 'MULF': ('60', 3),
-        'MULR': ('98', 2), 'NORM': ('C8', 1), 'OR': ('44', 3),
-        'RD': ('D8', 3), 'RMO': ('AC', 2), 'RSUB': ('4C', 3),
-        'SHIFTL': ('A4', 2), 'SHIFTR': ('A8', 2), 'SIO': ('F0', 1),
-        'SSK': ('EC', 3), 'STA': ('0C', 3), 'STB': ('78', 3),
-        'STCH': ('54', 3), 'STF': ('80', 3), 'STI': ('D4', 3),
-        'STL': ('14', 3), 'STS': ('7C', 3), 'STSW': ('E8', 3),
-        'STT': ('84', 3), 'STX': ('10', 3), 'SUB': ('1C', 3),
-        'SUBF': ('5C', 3), 'SUBR': ('94', 2), 'SVC': ('B0', 2),
-        'TD': ('E0', 3), 'TIO': ('F8', 1), 'TIX': ('2C', 3),
-        'TIXR': ('B8', 2), 'WD': ('DC', 3)
-    }  # ← MAKE SURE THIS BRACE IS HERE!
+    # Legacy (opcode hex, format) view of INSTRUCTION_TABLE
+    INSTRUCTIONS = MappingProxyType(SICXE_INSTRUCTIONS)
 
     @classmethod
     def get_opcode(cls, mnemonic):
         return cls.INSTRUCTIONS.get(mnemonic, (None, None))
-    
+
     @classmethod
     def is_instruction(cls, mnemonic):
-        return mnemonic in cls.INSTRUCTIONS
+        return mnemonic in INSTRUCTION_TABLE
+
+    @classmethod
+    def lookup(cls, mnemonic):
+        return INSTRUCTION_TABLE.get(mnemonic)
 
 class SymbolTable:
     def __init__(self):
         self.symbols = {}
+        self.extdefs = []    # EXTDEF names, in order
+        self.extrefs = {}    # EXTREF name -> 0 (resolved by the loader), in order
 
     def add(self, label, address):
         if label in self.symbols:
@@ -66,22 +102,85 @@ class SymbolTable:
             raise ValueError(f"Duplicate symbol: {label}")
         self.symbols[label] = address
     
+def constant_bytes(text):
+    """Bytes of a constant: C'..' characters, X'..' hex digits or a decimal word."""
+    kind = text[:2].upper()
+    if kind == "C'" and text.endswith("'"):
+        return text[2:-1].encode("latin-1")
+    if kind == "X'" and text.endswith("'"):
+        return bytes.fromhex(text[2:-1])
+    return (int(text) & 0xFFFFFF).to_bytes(3, "big")
+
+
 class LiteralTable:
     def __init__(self):
-        self.literals = {}
+        """Literal pool entries, deduplicated by canonical byte value within a pool.
+
+        =C'EOF' and =X'454F46' are the same 3 bytes and share one pool
+        entry. Literals wait in pending (first-use order) until the next
+        LTORG or END places them; a literal used again after its pool was
+        placed joins the next pool, since the earlier entry may be out of
+        reach and is never relocated for it.
+
+        Each entry is known by a name: the spelling that created it, or
+        for a later pool of the same spelling an alias (=C'EOF'@2) that
+        add() returns for the reference to use as its operand symbol.
+        """
+        self.values = {}      # literal text or alias -> canonical bytes
+        self.entries = {}     # literal text or alias -> name of its pool entry
+        self.addresses = {}   # entry name -> address, None while pending
+        self.pending = {}     # canonical bytes -> entry name, not placed yet
+        self.aliases = {}     # alias -> the literal text it was made for
+
+    def value(self, literal):
+        value = self.values.get(literal)
+        if value is None:
+            value = self.values[literal] = constant_bytes(literal[1:] if literal.startswith("=") else literal)
+        return value
 
-    def add(self, literal, address=None):
-        self.literals[literal] = address
+    def add(self, literal):
+        """Note a literal reference; returns the name the reference resolves by"""
+        value = self.value(literal)
+        name = self.pending.get(value)
+        if name is None:
+            # The first literal with this value since the last pool starts an entry
+            name = literal
+            if literal in self.entries:
+                name = f"{literal}@{len(self.addresses)}"
+                self.aliases[name] = literal
+            self.values[name] = value
+            self.entries[name] = name
+            self.addresses[name] = None
+            self.pending[value] = name
+        return literal if self.entries.setdefault(literal, name) == name else name
+
+    def pool(self):
+        """Take the pending literals as (entry name, bytes) pairs for the pool being placed"""
+        pool = [(name, value) for value, name in self.pending.items()]
+        self.pending = {}
+        return pool
+
+    def place(self, name, address):
+        self.addresses[self.entries.get(name, name)] = address
 
     def assign_addresses(self, start_address):
-        for lit in self.literals:
-            if self.literals[lit] is None:
-                self.literals[lit] = start_address
-                start_address += 3
+        """Place every pending literal from start_address on; returns the next free address"""
+        for name, value in self.pool():
+            self.place(name, start_address)
+            start_address += len(value)
         return start_address
 
     def get(self, literal):
-        return self.literals.get(literal, None)
+        name = self.entries.get(literal)
+        return self.addresses.get(name) if name is not None else None
+
+    def spelling(self, name):
+        """The literal text an entry name stands for"""
+        return self.aliases.get(name, name)
+
+    @property
+    def literals(self):
+        return {literal: self.addresses[name] for literal, name in self.entries.items()}
 
     def __repr__(self):
         return str(self.literals)
@@ -91,57 +190,86 @@ class BlockTable:
         self.blocks = {"DEFAULT": 0}
         self.current = "DEFAULT"
         self.next_block_num = 1
+        self.locctrs = [None]    # saved LOCCTR of each block while another one is in use
+        self.starts = [0]        # block start addresses, set by assign_starts()
 
     def add(self, name):
         if name not in self.blocks:
             self.blocks[name] = self.next_block_num
             self.next_block_num += 1
+            self.locctrs.append(0)   # a new block counts from 0
         self.current = name
 
     def get(self, name):
         return self.blocks.get(name, 0)
-    
+
+    @property
+    def number(self):
+        return self.blocks[self.current]
+
+    @property
+    def in_use(self):
+        return self.next_block_num > 1
+
+    def use(self, name, locctr):
+        """Switch to block name (USE); saves locctr for the current block, returns the new block's"""
+        self.locctrs[self.number] = locctr
+        self.add(name or "DEFAULT")
+        return self.locctrs[self.number]
+
+    def assign_starts(self, start_addr, locctr):
+        """Lay the blocks out one after another from start_addr; returns the program length.
+
+        locctr is the LOCCTR of the current block. The default block counts
+        from start_addr, the others from 0, so its length is measured from there.
+        """
+        self.locctrs[self.number] = locctr
+        lengths = list(self.locctrs)
+        lengths[0] -= start_addr
+        self.starts = [start_addr + total for total in accumulate(lengths[:-1], initial=0)]
+        return sum(lengths)
 
 class OpcodeTable:
-    """Compatibility class for tests that expect OpcodeTable instead of OPTAB"""
-    def __init__(self):
-        # Use the same data as OPTAB but in the expected format
-        self.table = {
-            "LDA": ("00", 3), "LDX": ("04", 3), "LDL": ("08", 3),
-            "STA": ("0C", 3), "STX": ("10", 3), "STL": ("14", 3),
-            "LDCH": ("50", 3), "STCH": ("54", 3), "ADD": ("18", 3),
-            "SUB": ("1C", 3), "MUL": ("20", 3), "DIV": ("24", 3),
-            "COMP": ("28", 3), "J": ("3C", 3), "JLT": ("38", 3),
-            "JEQ": ("30", 3), "JGT": ("34", 3), "JSUB": ("48", 3),
-            "RSUB": ("4C", 3), "TIX": ("2C", 3), "TIXR": ("B8", 2),
-            "CLEAR": ("B4", 2), "COMPR": ("A0", 2), "ADDR": ("90", 2),
-            "SUBR": ("94", 2), "MULR": ("98", 2), "DIVR": ("9C", 2),
-            "LDB": ("68", 3), "LDS": ("6C", 3), "LDT": ("74", 3),
-            "STB": ("78", 3), "STS": ("7C", 3), "STT": ("84", 3),
-            "TD": ("E0", 3), "RD": ("D8", 3), "WD": ("DC", 3),
-            "START": (None, 0), "END": (None, 0), "RESW": (None, 0), 
-            "RESB": (None, 0), "BYTE": (None, 0), "BASE": (None, 0),
-            "WORD": (None, 0), "LTORG": (None, 0),
-            "+JSUB": ("48", 4), "+LDT": ("74", 4), "+STCH": ("54", 4), 
-            "+LDCH": ("50", 4), "+LDA": ("00", 4), "+STA": ("0C", 4)
-        }
+    """Compatibility class for tests that expect OpcodeTable instead of OPTAB.
+
+    Every instance reads the shared INSTRUCTION_TABLE; nothing is rebuilt.
+    """
+
+    def lookup(self, mnemonic):
+        """Instruction for a bare mnemonic, or None"""
+        return INSTRUCTION_TABLE.get(mnemonic)
 
     def get(self, mnemonic):
-        return self.table.get(mnemonic)
+        """Legacy (opcode hex, format) lookup; '+' gives format 4, directives (None, 0)"""
+        if mnemonic.startswith('+'):
+            instr = INSTRUCTION_TABLE.get(mnemonic[1:])
+            return (f"{instr.opcode:02X}", 4) if instr and instr.format == 3 else None
+        instr = INSTRUCTION_TABLE.get(mnemonic)
+        if instr:
+            return f"{instr.opcode:02X}", instr.format
+        if mnemonic in DIRECTIVES:
+            return None, 0
+        return None
+
+    @property
+    def table(self):
+        return {mnem: (f"{instr.opcode:02X}", instr.format) for mnem, instr in INSTRUCTION_TABLE.items()}
 
     def display(self):
         print("\nOPCODE TABLE")
         print("============")
-        for mnem, (op, fmt) in self.table.items():
-            print(f"{mnem:<8} Opcode: {op:<3} Format: {fmt}")
+        for mnem, instr in INSTRUCTION_TABLE.items():
+            print(f"{mnem:<8} Opcode: {instr.opcode:02X}  Format: {instr.format}")
+
 
+REGISTERS = MappingProxyType({
+    "A": 0, "X": 1, "L": 2, "B": 3,
+    "S": 4, "T": 5, "F": 6, "PC": 8, "SW": 9
+})
 
 class RegisterTable:
     def __init__(self):
-        self.registers = {
-            "A": 0, "X": 1, "L": 2, "B": 3,
-            "S": 4, "T": 5, "F": 6, "PC": 8, "SW": 9
-        }
+        self.registers = REGISTERS
 
     def get(self, reg):
         return self.registers.get(reg)
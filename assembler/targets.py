@@ -0,0 +1,29 @@
+# assembler/targets.py
+"""Source files named on a command line (shared by main.py and client.py)."""
+import glob
+import os
+
+EXAMPLE_FILES = [
+    'examples/basic.txt',
+    'examples/functions.txt',
+    'examples/literals.txt',
+    'examples/prog_blocks.txt',
+    'examples/control_section.txt',
+    'examples/macros.txt'
+]
+
+
+def collect_sources(targets):
+    """Expand directories and glob patterns into a sorted list of source files"""
+    sources = []
+    for target in targets:
+        if os.path.isdir(target):
+            sources.extend(glob.glob(os.path.join(target, "*.txt")))
+        elif glob.has_magic(target):
+            sources.extend(path for path in glob.glob(target) if os.path.isfile(path))
+        elif os.path.exists(target):
+            sources.append(target)
+        else:
+            print(f"Error: File '{target}' not found")
+    # Keep first occurrence so overlapping globs don't assemble a file twice
+    return sorted(dict.fromkeys(sources))
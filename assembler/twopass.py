@@ -0,0 +1,37 @@
+# assembler/twopass.py
+"""The default engine: Pass 1, then Pass 2 over its records.
+
+run_pass2() is the one place a finished Pass 1 is handed to Pass 2 -
+its symbols, literal pool, name, start address and length - so main.py,
+control sections, the daemon, the benchmarks and the tests all assemble
+the same way.
+"""
+from assembler.pass1 import Pass1
+from assembler.pass2 import Pass2
+
+
+def pass2_for(pass1):
+    """A Pass2 using a finished Pass 1's symbol and literal tables"""
+    return Pass2(pass1.symtab, littab=pass1.littab)
+
+
+def run_pass2(pass1, listing_path=None, stream=None, stats=None):
+    """Pass 2 over a finished Pass 1; returns the object program ("" when streamed).
+
+    A Pass 1 run with vectorized=True hands its columns to the batch encoder.
+    """
+    pass2 = pass2_for(pass1)
+    pass2.stats = stats
+    return pass2.assemble(pass1.intermediate, pass1.program_name or "PROGRAM", pass1.start_addr, listing_path,
+                          stream=stream, program_length=pass1.locctr - pass1.start_addr,
+                          columns=pass1.columns)
+
+
+def two_pass(lines, listing_path=None, vectorized=False, relax=False, **options):
+    """Assemble lines with both passes; returns (object program, the finished Pass1).
+
+    options (stream, stats) go to run_pass2().
+    """
+    pass1 = Pass1()
+    pass1.assemble(lines, vectorized=vectorized, relax=relax)
+    return run_pass2(pass1, listing_path, **options), pass1
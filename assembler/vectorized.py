@@ -0,0 +1,144 @@
+# assembler/vectorized.py
+"""NumPy fast path for large programs.
+
+NumPy is optional: the batch encoder has a plain-Python equivalent in
+Pass2, and HAVE_NUMPY tells callers whether it can be used. Its input,
+Columns, is plain Python and is filled by Pass 1.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+from array import array
+from itertools import repeat
+from operator import attrgetter
+from assembler.parser import FLAG_X, FLAG_E, is_constant
+from assembler.tables import INSTRUCTION_TABLE
+
+HAVE_NUMPY = np is not None
+MISSING = 1 << 62   # target of a line whose operand is not in the symbol table
+OPCODES = {mnemonic: instr.opcode for mnemonic, instr in INSTRUCTION_TABLE.items()}
+
+
+class Columns:
+    """The format 3/4 lines of a Pass 1, one column per field, in source order.
+
+    Pass 1 adds its records as it goes (see Pass1.assemble(vectorized=True))
+    and calls build() once every address is final, so encode_format3_4()
+    never walks the records: opcode, flags, LOCCTR and operand symbol,
+    plus the BASE/NOBASE records with the number of lines before each.
+    Number columns are arrays NumPy reads without copying.
+    """
+
+    def __init__(self):
+        self.records = []     # the format 3/4 records
+        self.bases = []       # (lines before it, BASE/NOBASE record)
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        if record.format == 3:
+            self.records.append(record)
+        elif record.mnemonic == "BASE" or record.mnemonic == "NOBASE":
+            self.bases.append((len(self.records), record))
+
+    def build(self):
+        """Fill the columns from the records - one C-level map() per column"""
+        records = self.records
+        self.opcodes = array("q", list(map(OPCODES.__getitem__, map(attrgetter("mnemonic"), records))))
+        self.flags = array("q", list(map(attrgetter("flags"), records)))
+        self.locctrs = array("q", list(map(attrgetter("locctr"), records)))
+        self.symbols = list(map(attrgetter("symbol"), records))
+
+
+def name_value(pass2, name):
+    """Value of an operand that is not a symbol, or MISSING if that depends on its line.
+
+    Literals and plain numbers; expressions (which may use *) and
+    anything Pass 2 would warn about are left to resolve_target per line.
+    """
+    if name is None:
+        return 0
+    value = None
+    if name[0] == "=" and pass2.littab is not None:
+        value = pass2.littab.get(name)
+    if value is None and name.isdigit():
+        value = int(name)
+    return MISSING if value is None else value
+
+
+def encode_format3_4(pass2, columns):
+    """Encode every format 3/4 line of a Pass 1 in one vectorized batch.
+
+    Returns the object code (hex string) of each line of columns (built),
+    in order. Symbols are looked up with one map() over the symbol column;
+    only the lines it misses (no operand, literals, numbers, expressions)
+    are resolved in Python, and BASE/NOBASE values once each. Displacement-
+    mode selection, bit packing and hex conversion run as array operations.
+    The result is identical to Pass2.generate_format3_4 line by line.
+    """
+    count = len(columns)
+    if not count:
+        return []
+
+    opcode = np.frombuffer(columns.opcodes, dtype=np.int64)
+    flags = np.frombuffer(columns.flags, dtype=np.int64)
+    locctr = np.frombuffer(columns.locctrs, dtype=np.int64)
+    symbols = columns.symbols
+    target = np.fromiter(map(pass2.symtab.symbols.get, symbols, repeat(MISSING)), dtype=np.int64, count=count)
+
+    # Constants (#5, RSUB) are never symbols, so they are all among the misses
+    constant = np.zeros(count, dtype=bool)
+    values = {}
+    for i in np.flatnonzero(target == MISSING).tolist():
+        symbol = symbols[i]
+        value = values.get(symbol)
+        if value is None:
+            value = values[symbol] = name_value(pass2, symbol)
+        if value == MISSING:
+            value = pass2.resolve_target(symbol, columns.locctrs[i])
+        target[i] = value
+        constant[i] = is_constant(columns.flags[i], symbol)
+
+    # BASE/NOBASE hold from their line on (-1: no base register)
+    bases = [pass2.base_value if pass2.base_value is not None else -1]
+    for _, record in columns.bases:
+        base_record = record.mnemonic == "BASE" and record.operand
+        bases.append(pass2.resolve_target(record.operand, record.locctr) if base_record else -1)
+    rows = np.array([row for row, _ in columns.bases], dtype=np.int64)
+    base = np.array(bases, dtype=np.int64)[np.searchsorted(rows, np.arange(count), side="right")]
+
+    first = opcode | (flags >> 4)   # n,i bits sit right above x in the flags
+    pc = locctr + 3
+
+    x = (flags & FLAG_X) != 0
+    e = (flags & FLAG_E) != 0
+
+    # Format 3 displacement: a constant that fits as is, then PC-relative,
+    # then base-relative, else direct
+    relative = ~e & ~(constant & (target >= 0) & (target <= 0xFFF))
+    disp_pc = target - pc
+    use_p = relative & (disp_pc >= -2048) & (disp_pc <= 2047)
+    disp_b = target - base
+    use_b = relative & ~use_p & (base >= 0) & (disp_b >= 0) & (disp_b <= 4095)
+    field3 = np.where(use_p, disp_pc, np.where(use_b, disp_b, target)) & 0xFFF
+    direct = np.flatnonzero(relative & ~use_p & ~use_b)
+
+    xbpe = (x.astype(np.int64) << 3) | (use_b.astype(np.int64) << 2) | (use_p.astype(np.int64) << 1) | e
+    word3 = (first << 16) | (xbpe << 12) | field3
+    word4 = (first << 24) | (xbpe << 20) | (target & 0xFFFFF)
+
+    # Every instruction gets a 4-byte big-endian slot, written out as 8 hex
+    # digits and a space; format 3 blanks its last byte and one split()
+    # cuts the lot into codes
+    words = np.where(e, word4, word3 << 8).astype(">u4")
+    chars = np.full((count, 9), ord(" "), dtype=np.uint8)
+    chars[:, :8] = np.frombuffer(words.tobytes().hex().upper().encode(), dtype=np.uint8).reshape(count, 8)
+    chars[~e, 6:8] = ord(" ")
+    codes = chars.tobytes().decode("ascii").split()
+
+    for i in direct.tolist():
+        pass2.direct_address(columns.records[i], int(target[i]))
+    return codes
@@ -0,0 +1,91 @@
+# benchmarks/generator.py
+"""Deterministic synthetic SIC/XE programs for benchmarking.
+
+generate_program(n) returns n source lines (plus START and END) of a
+valid program: every label is defined once, operands only name defined
+labels, and literal pools are flushed with LTORG often enough to stay in
+PC-relative range. The same size, seed and mix always give the same
+program, so timings of different revisions compare like for like.
+"""
+import random
+from bisect import bisect_left
+
+# Share of statements of each kind
+DEFAULT_MIX = {
+    "format1": 0.02,    # FIX, NORM, ...
+    "format2": 0.15,    # CLEAR, ADDR, COMPR, TIXR, ...
+    "format3": 0.55,    # LDA LABEL, STA LABEL,X, J @LABEL, COMP #5
+    "format4": 0.08,    # +JSUB LABEL, +LDT #4096
+    "literal": 0.06,    # LDA =C'EOF', TD =X'F1'
+    "word": 0.06,
+    "byte": 0.04,
+    "resb": 0.04,
+}
+LABEL_RATIO = 0.3       # share of statements that carry a label
+REFERENCE_WINDOW = 200  # operands name labels at most this many statements away
+LTORG_EVERY = 400       # statements between literal pools (about 1.6 KB, inside PC-relative reach)
+RESB_MAX = 64           # largest RESB, so big programs stay inside 2^20 bytes of memory
+
+FORMAT1 = ["FIX", "FLOAT", "NORM"]
+FORMAT2 = ["CLEAR {r1}", "ADDR {r1},{r2}", "SUBR {r1},{r2}", "COMPR {r1},{r2}", "RMO {r1},{r2}", "TIXR {r1}"]
+FORMAT3 = ["LDA", "LDX", "LDT", "LDCH", "STA", "STX", "STCH", "ADD", "SUB", "COMP", "TIX", "J", "JEQ", "JLT", "JSUB"]
+FORMAT4 = ["+LDA", "+LDT", "+STA", "+JSUB", "+J"]
+REGISTERS = ["A", "X", "S", "T", "B"]
+LITERALS = ["=C'EOF'", "=X'F1'", "=X'05'", "=C'Z'", "=X'000001'"]
+
+
+def generate_program(lines, seed=335, mix=None, label_ratio=LABEL_RATIO):
+    """Return a list of about lines source lines (START and END included)."""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    count = max(lines - 2, 1)
+    choices = rng.choices(kinds, weights, k=count)
+    labelled = [i for i in range(count) if rng.random() < label_ratio] or [0]
+
+    def label_near(i):
+        # A label within REFERENCE_WINDOW statements of i, before or after it
+        lo = bisect_left(labelled, i - REFERENCE_WINDOW)
+        hi = bisect_left(labelled, i + REFERENCE_WINDOW)
+        return f"L{labelled[rng.randrange(lo, hi)] if hi > lo else labelled[0]}"
+
+    is_label = set(labelled)
+    source = ["BENCH   START   0"]
+    append = source.append
+    for i, kind in enumerate(choices):
+        label = f"L{i}" if i in is_label else ""
+        if kind == "format1":
+            statement = rng.choice(FORMAT1)
+        elif kind == "format2":
+            statement = rng.choice(FORMAT2).format(r1=rng.choice(REGISTERS), r2=rng.choice(REGISTERS))
+        elif kind == "format3":
+            mnemonic = rng.choice(FORMAT3)
+            roll = rng.random()
+            if roll < 0.1 and mnemonic[0] != "J" and mnemonic[:2] != "ST":
+                statement = f"{mnemonic} #{rng.randrange(4096)}"
+            elif roll < 0.3 and mnemonic[0] != "J":
+                statement = f"{mnemonic} {label_near(i)},X"
+            elif roll < 0.4:
+                statement = f"{mnemonic} @{label_near(i)}"
+            else:
+                statement = f"{mnemonic} {label_near(i)}"
+        elif kind == "format4":
+            mnemonic = rng.choice(FORMAT4)
+            if mnemonic == "+LDT" and rng.random() < 0.5:
+                statement = f"{mnemonic} #{rng.randrange(1 << 20)}"
+            else:
+                statement = f"{mnemonic} {label_near(i)}"
+        elif kind == "literal":
+            statement = f"{rng.choice(['LDA', 'COMP', 'TD', 'WD'])} {rng.choice(LITERALS)}"
+        elif kind == "word":
+            statement = f"WORD {rng.randrange(1 << 23)}"
+        elif kind == "byte":
+            statement = f"BYTE X'{rng.randrange(256):02X}'" if rng.random() < 0.5 else "BYTE C'SIC'"
+        else:
+            statement = f"RESB {rng.randint(1, RESB_MAX)}"
+        append(f"{label:<8}{statement}")
+        if i % LTORG_EVERY == LTORG_EVERY - 1:
+            append("        LTORG")
+    append(f"        END     L{labelled[0]}")
+    return source
@@ -0,0 +1,189 @@
+# benchmarks/run.py
+"""Throughput benchmarks for the assembler phases.
+
+    python -m benchmarks.run                       # 1k, 10k and 100k lines
+    python -m benchmarks.run --sizes 1000000       # production-size input
+    python -m benchmarks.run --save                # store the results as the new baselines
+
+Each phase is timed on its own over a generated program (see
+benchmarks.generator): Pass 1, a full Pass 2, the encoder alone, the
+object writer alone and the listing writer alone. With NumPy installed,
+encode_batch encodes the same lines as encode, format 3/4 through the
+batch encoder (see assembler.vectorized). The best of --repeat
+runs gives lines/s; one more run under tracemalloc gives the peak memory.
+Results are compared with benchmarks/baselines.json and any phase slower
+than its baseline by more than the threshold is reported as a regression
+(exit status 1).
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from assembler.listing import ListingWriter
+from assembler.objectwriter import ObjectWriter
+from assembler.pass1 import Pass1
+from assembler.twopass import pass2_for, run_pass2
+from assembler.vectorized import HAVE_NUMPY, encode_format3_4
+from benchmarks.generator import generate_program
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_THRESHOLD = 0.25   # slower than baseline by more than this fraction is a regression
+PHASES = ("pass1", "pass2", "encode", "objectwriter", "listing", "encode_batch")
+
+
+def measure(function, repeat=3, memory=True):
+    """(best wall time in seconds, peak traced bytes or None) of calling function()"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def phase_functions(lines):
+    """Zero-argument callables running each phase on its own, inputs prepared up front"""
+    pass1 = Pass1()
+    intermediate, symtab, length, name, start = pass1.assemble(lines)
+    encoder = pass2_for(pass1)
+    codes = [encoder.encode_line(record) for record in intermediate]
+    coded = [(record.locctr, code) for record, code in zip(intermediate, codes) if code]
+
+    def write_objects():
+        writer = ObjectWriter()
+        writer.write_header(name, start, length)
+        for address, code in coded:
+            writer.add_code(address, code)
+        writer.write_end(start)
+        return writer.generate()
+
+    def write_listing():
+        listing = ListingWriter(io.StringIO())
+        for record, code in zip(intermediate, codes):
+            listing.add_line(record.locctr, record.label, record.opcode, record.operand, code)
+        listing.write()
+
+    phases = {
+        "pass1": lambda: Pass1().assemble(lines),
+        "pass2": lambda: run_pass2(pass1),
+        "encode": lambda: [encoder.encode_line(record) for record in intermediate],
+        "objectwriter": write_objects,
+        "listing": write_listing,
+    }
+    if HAVE_NUMPY:
+        vector = Pass1()
+        vector.assemble(lines, vectorized=True)
+        batch_encoder = pass2_for(vector)
+
+        def encode_batch():
+            codes = iter(encode_format3_4(batch_encoder, vector.columns))
+            return [next(codes) if record.format == 3 else batch_encoder.encode_line(record)
+                    for record in vector.intermediate]
+
+        phases["encode_batch"] = encode_batch
+    return phases
+
+
+def run_size(size, seed=335, repeat=3, memory=True):
+    """Benchmark every phase on a generated program of size lines; returns phase -> result"""
+    lines = generate_program(size, seed)
+    results = {}
+    for phase, function in phase_functions(lines).items():
+        seconds, peak = measure(function, repeat, memory)
+        results[phase] = {"lines": len(lines), "seconds": seconds, "lines_per_s": len(lines) / seconds,
+                          "peak_kib": None if peak is None else peak / 1024}
+    return results
+
+
+def compare(results, baselines, threshold=DEFAULT_THRESHOLD):
+    """Regressions as (key, baseline lines/s, current lines/s); keys are "phase@size"."""
+    regressions = []
+    for key, current in sorted(results.items()):
+        baseline = baselines.get(key)
+        if baseline and current < baseline * (1 - threshold):
+            regressions.append((key, baseline, current))
+    return regressions
+
+
+def load_baselines(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}, DEFAULT_THRESHOLD
+    with open(path) as f:
+        data = json.load(f)
+    return data.get("lines_per_s", {}), data.get("threshold", DEFAULT_THRESHOLD)
+
+
+def save_baselines(rates, threshold, path=BASELINE_PATH):
+    with open(path, "w") as f:
+        json.dump({"threshold": threshold, "lines_per_s": {key: round(rate) for key, rate in sorted(rates.items())}},
+                  f, indent=2)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SIC/XE assembler benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), metavar="LINES",
+                        help="program sizes to generate (default: 1000 10000 100000)")
+    parser.add_argument("--seed", type=int, default=335, help="generator seed")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per phase (the best one counts)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory run")
+    parser.add_argument("--baseline", default=BASELINE_PATH, metavar="PATH", help="baseline file")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help=f"allowed slowdown before a regression is reported (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--save", action="store_true", help="store these results as the new baselines")
+    parser.add_argument("--json", metavar="PATH", help="also write the full results as JSON")
+    args = parser.parse_args(argv)
+
+    baselines, threshold = load_baselines(args.baseline)
+    if args.threshold is not None:
+        threshold = args.threshold
+
+    report = {}
+    rates = {}
+    print(f"{'phase':<14}{'lines':>9}{'seconds':>10}{'lines/s':>12}{'peak KiB':>11}{'baseline':>12}")
+    for size in args.sizes:
+        results = run_size(size, args.seed, args.repeat, not args.no_memory)
+        report[size] = results
+        for phase, result in results.items():
+            key = f"{phase}@{size}"
+            rates[key] = result["lines_per_s"]
+            peak = "-" if result["peak_kib"] is None else f"{result['peak_kib']:.0f}"
+            baseline = f"{baselines[key]:.0f}" if key in baselines else "-"
+            print(f"{phase:<14}{result['lines']:>9}{result['seconds']:>10.4f}{result['lines_per_s']:>12.0f}"
+                  f"{peak:>11}{baseline:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"threshold": threshold, "results": report}, f, indent=2)
+
+    if args.save:
+        save_baselines({**baselines, **rates}, threshold, args.baseline)
+        print(f"Baselines saved to {args.baseline}")
+        return 0
+
+    regressions = compare(rates, baselines, threshold)
+    for key, baseline, current in regressions:
+        print(f"REGRESSION {key}: {current:.0f} lines/s vs baseline {baseline:.0f} "
+              f"({(1 - current / baseline) * 100:.0f}% slower, threshold {threshold * 100:.0f}%)")
+    if not regressions:
+        print(f"No regressions against {len(baselines)} baselines (threshold {threshold * 100:.0f}%)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# client.py
+"""Thin client for the resident assembler (python -m assembler.server).
+
+Takes the same targets as main.py and its --one-pass, --vectorized,
+--relax and --auto-base flags, but only reads paths and writes results:
+every file is assembled by the daemon, all over one connection, so many
+small files cost a socket round trip each rather than an interpreter
+start. Only the standard library is imported here.
+"""
+import sys
+import os
+import argparse
+from assembler.protocol import DEFAULT_SOCKET, OPTIONS, request_all
+from assembler.targets import EXAMPLE_FILES, collect_sources
+
+def write_results(filename, response, listing_path):
+    """Write <source>.obj (and the listing) from one daemon response"""
+    print(f" Assembling {filename}...")
+    if response.get("diagnostics"):
+        print(response["diagnostics"], end="")
+    if not response["ok"]:
+        print(f"   Failed: {response.get('error', 'see diagnostics')}")
+        return False
+    obj_filename = f"{os.path.splitext(filename)[0]}.obj"
+    with open(obj_filename, 'w') as f:
+        f.write(response["object"])
+    print(f"   Success! Object file: {obj_filename}{' (cached)' if response.get('cached') else ''}")
+    if listing_path:
+        with open(listing_path, 'w') as f:
+            f.write(response["listing"])
+        print(f"   Listing file: {listing_path}")
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SIC/XE assembler client")
+    parser.add_argument("targets", nargs="*", help="source files, directories or glob patterns")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, metavar="PATH", help="daemon socket")
+    parser.add_argument("--one-pass", action="store_true",
+                        help="use the single-pass engine with forward-reference backpatching")
+    parser.add_argument("--listing", default="output_listing.txt", metavar="PATH",
+                        help="listing file for single-file runs (several files write <source>.lst)")
+    parser.add_argument("--no-listing", action="store_true",
+                        help="skip listing generation entirely")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="use the NumPy address assignment and format 3/4 encoder (needs numpy)")
+    parser.add_argument("--relax", action="store_true",
+                        help="promote only the format 3 lines that cannot reach their operand to format 4")
+    parser.add_argument("--auto-base", action="store_true",
+                        help="insert LDB/BASE where a base register saves format 4 promotions (implies --relax)")
+    parser.add_argument("--ping", action="store_true", help="print the daemon's request counters")
+    parser.add_argument("--shutdown", action="store_true", help="stop the daemon")
+    args = parser.parse_args(argv)
+    if (args.relax or args.auto_base) and args.one_pass:
+        print("Error: --relax and --auto-base need the whole program laid out first - not with --one-pass")
+        return 1
+
+    try:
+        if args.ping or args.shutdown:
+            response, = request_all([{"op": "shutdown" if args.shutdown else "ping"}], args.socket)
+            print(" Daemon stopped" if args.shutdown else
+                  f" Daemon {response['pid']}: {response['requests']} requests, {response['cache_hits']} cached")
+            return 0
+
+        sources = collect_sources(args.targets or EXAMPLE_FILES)
+        if not sources:
+            print("Error: no source files to assemble")
+            return 1
+        single = len(sources) == 1
+        options = {name: getattr(args, name) for name in OPTIONS if name != "listing"}
+        requests = [{"op": "assemble", "path": os.path.abspath(source), "listing": not args.no_listing, **options}
+                    for source in sources]
+        responses = request_all(requests, args.socket)
+    except OSError as e:
+        print(f"Error: cannot reach the assembler daemon at {args.socket} ({e}); "
+              f"start it with: python -m assembler.server")
+        return 1
+
+    success_count = 0
+    for source, response in zip(sources, responses):
+        if args.no_listing:
+            listing_path = None
+        else:
+            listing_path = args.listing if single else f"{os.path.splitext(source)[0]}.lst"
+        success_count += write_results(source, response, listing_path)
+    if not single:
+        print(f" Results: {success_count}/{len(sources)} files assembled successfully!")
+    return 0 if success_count == len(sources) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
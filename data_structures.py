@@ -14,6 +14,8 @@ Each class provides methods for insertion, lookup, and debugging display.
 All classes are designed to be reusable and easily imported by other modules.
 """
 
+from assembler.tables import OPTAB, INSTRUCTION_TABLE
+
 class SymbolTable:
     #Stores symbol names with their corresponding memory addresses.
     def __init__(self):
@@ -36,22 +38,17 @@ class SymbolTable:
 
 class OpcodeTable:
     #Contains opcode and instruction format for all SIC/XE mnemonics.
+    #Backed by the assembler's shared INSTRUCTION_TABLE so there is only one opcode list.
     def __init__(self):
         # Mnemonic: (Opcode, Format)
-        self.table = {
-            "LDA": ("00", 3), "LDX": ("04", 3), "LDS": ("6C", 3),
-            "STA": ("0C", 3), "STX": ("10", 3), "STCH": ("54", 3),
-            "ADD": ("18", 3), "SUB": ("1C", 3), "MUL": ("20", 3),
-            "DIV": ("24", 3), "COMP": ("28", 3), "J": ("3C", 3),
-            "JEQ": ("30", 3), "JLT": ("38", 3), "JSUB": ("48", 3),
-            "RSUB": ("4C", 3), "CLEAR": ("B4", 2), "TIXR": ("B8", 2),
-            "COMPR": ("A0", 2), "TD": ("E0", 3), "RD": ("D8", 3),
-            "WD": ("DC", 3), "STL": ("14", 3)
-        }
+        self.table = OPTAB.INSTRUCTIONS
 
     def get(self, mnemonic):
         return self.table.get(mnemonic)
 
+    def lookup(self, mnemonic):
+        return INSTRUCTION_TABLE.get(mnemonic)
+
     def display(self):
         print("\nOPCODE TABLE")
         print("============")
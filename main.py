@@ -1,84 +1,272 @@
 # main.py
-import sys
 import os
+import sys
+import time
+import argparse
+import json
+from contextlib import nullcontext, redirect_stdout
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from assembler.pass1 import Pass1
 from assembler.tables import OpcodeTable, RegisterTable
-from assembler.pass2 import Pass2
+from assembler.onepass import OnePass
+from assembler.sections import assemble_sections, has_sections
+from assembler.scanner import SourceScanner
+from assembler.loader import LinkingLoader
+from assembler.emulator import Emulator
+from assembler.stats import Stats
+from assembler.autobase import plan_base
+from assembler.twopass import run_pass2
+from assembler.targets import EXAMPLE_FILES, collect_sources
+
+def timed(stats, name):
+    """stats.phase(name), or a context that records nothing when stats are off"""
+    return stats.phase(name) if stats is not None else nullcontext({})
+
+def assemble_file(filename, listing_path="output_listing.txt", quiet=False, one_pass=False, vectorized=False,
+                  section_jobs=None, stats=None, relax=False, auto_base=False):
+    """Assemble a single SIC/XE file
 
-def assemble_file(filename):
-    """Assemble a single SIC/XE file"""
+    one_pass and vectorized select the alternative engines
+    (see the matching command-line flags); relax promotes out-of-reach
+    format 3 lines to format 4 in the two-pass engine, and auto_base
+    first places a BASE register where that saves promotions. Sources with CSECTs always go
+    through assembler.sections, on section_jobs worker processes; one_pass
+    and stats are refused for them. stats (an assembler.stats.Stats)
+    collects per-phase timings and counters.
+    """
+    log = (lambda *args: None) if quiet else print
     try:
-        print(f" Assembling {filename}...")
-        
-        # Read input file
-        with open(filename, 'r') as f:
-            lines = [line.rstrip() for line in f if line.strip()]
-        
-        # Run Pass 1
-        pass1 = Pass1()
-        intermediate, symtab, length = pass1.assemble(lines)
-        print(f"   ✓ Pass 1: {len(intermediate)} lines, {len(symtab.symbols)} symbols")
-        
-        # Run Pass 2
-        optab = OpcodeTable()
-        regtab = RegisterTable()
-        pass2 = Pass2(symtab, optab, regtab)
-        
-        # Get program name and start address
-        first_parts = lines[0].split()
-        if len(first_parts) >= 3 and first_parts[1].upper() == "START":
-            prog_name = first_parts[0]
-            start_addr = int(first_parts[2], 16)
-        else:
-            prog_name = "PROGRAM"
-            start_addr = 0
-        
-        object_program = pass2.assemble(intermediate, prog_name, start_addr)
-        
-        # Write object file
-        base_name = os.path.splitext(filename)[0]
-        obj_filename = f"{base_name}.obj"
-        with open(obj_filename, 'w') as f:
-            f.write(object_program)
-        
-        print(f"   Success! Object file: {obj_filename}")
-        print(f"   Listing file: output_listing.txt")
-        return True
-        
+        log(f" Assembling {filename}...")
+
+        # The source is memory-mapped once and every engine reads it from the map
+        with SourceScanner(filename) as source:
+            return assemble_scanned(source, filename, listing_path, log, one_pass, vectorized,
+                                   section_jobs, stats, relax, auto_base)
+
     except Exception as e:
-        print(f"   Failed: {e}")
+        log(f"   Failed: {e}")
         return False
 
+def assemble_scanned(source, filename, listing_path, log, one_pass, vectorized, section_jobs, stats,
+                     relax=False, auto_base=False):
+    """assemble_file() on an open SourceScanner"""
+    # The word search over the map rules out most sources before any line is split
+    if source.mentions("CSECT") and has_sections(source):
+        if one_pass or stats is not None:
+            raise ValueError(f"{'--one-pass' if one_pass else '--stats'} does not support control sections (CSECT)")
+        # Control sections are assembled separately (in parallel when large)
+        object_program = assemble_sections(list(source), listing_path, jobs=section_jobs,
+                                           vectorized=vectorized, relax=relax)
+        log(f"   ✓ Control sections: {object_program.count(chr(10) + 'H') + 1}")
+        return write_object(filename, object_program, listing_path, log)
+
+    if one_pass:
+        # Single traversal with forward-reference backpatching
+        assembler = OnePass(OpcodeTable(), RegisterTable())
+        assembler.encoder.stats = stats
+        with timed(stats, "one_pass"):
+            object_program = assembler.assemble(source, listing_path=listing_path)
+        log(f"   ✓ One pass")
+        return write_object(filename, object_program, listing_path, log)
+
+    if auto_base:
+        # Assemble the source with LDB/BASE inserted, if they pay off
+        plan = plan_base(source)
+        log(f"   ✓ Auto BASE: {plan.summary()}")
+        source, relax = plan.lines, True
+
+    # Pass 1 tokenizes straight from the memory map - the source text is never copied
+    pass1 = Pass1()
+    with timed(stats, "pass1") as phase:
+        intermediate, symtab, length, prog_name, start_addr = pass1.assemble(source, vectorized=vectorized,
+                                                                             relax=relax)
+        phase["lines"] = len(intermediate)
+    log(f"   ✓ Pass 1: {len(intermediate)} lines, {len(symtab.symbols)} symbols")
+    if relax:
+        log(f"   ✓ Relaxed: {pass1.promoted} lines promoted to format 4")
+
+    # Stream Pass 2 straight into the object file, header first
+    obj_filename = f"{os.path.splitext(filename)[0]}.obj"
+    with timed(stats, "pass2") as phase, open(obj_filename, 'w') as f:
+        run_pass2(pass1, listing_path, stream=f, stats=stats)
+        phase["lines"] = len(intermediate)
+
+    log(f"   Success! Object file: {obj_filename}")
+    if listing_path:
+        log(f"   Listing file: {listing_path}")
+    return True
+
+def write_object(filename, object_program, listing_path, log=print):
+    """Write <source>.obj next to the source file"""
+    base_name = os.path.splitext(filename)[0]
+    obj_filename = f"{base_name}.obj"
+    with open(obj_filename, 'w') as f:
+        f.write(object_program)
+
+    log(f"   Success! Object file: {obj_filename}")
+    if listing_path:
+        log(f"   Listing file: {listing_path}")
+    return True
+
+def assemble_worker(filename, listing=True, **options):
+    """Process pool entry point: assemble one file with its own listing"""
+    listing_path = f"{os.path.splitext(filename)[0]}.lst" if listing else None
+    start = time.perf_counter()
+    ok = assemble_file(filename, listing_path, quiet=True, **options)
+    return filename, ok, time.perf_counter() - start
+
+def assemble_batch(sources, jobs=None, listing=True, **options):
+    """Assemble many files across a process pool and print one summary"""
+    start = time.perf_counter()
+    worker = partial(assemble_worker, listing=listing, **options)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(worker, sources, chunksize=max(1, len(sources) // 64)))
+    wall = time.perf_counter() - start
+
+    print("=== BATCH SUMMARY ===")
+    for filename, ok, elapsed in results:
+        status = "OK  " if ok else "FAIL"
+        print(f" {status} {elapsed * 1000:8.1f} ms  {filename}")
+
+    success_count = sum(1 for _, ok, _ in results if ok)
+    cpu = sum(elapsed for _, _, elapsed in results)
+    print(f" Results: {success_count}/{len(results)} files assembled successfully!")
+    print(f" Wall time: {wall:.3f}s, summed file time: {cpu:.3f}s, workers: {jobs or os.cpu_count()}")
+    return results
+
+def link_objects(paths, image_path, progaddr=0):
+    """Link object files into one memory image written to image_path"""
+    loader = LinkingLoader(progaddr)
+    start_time = time.perf_counter()
+    memory = loader.load(paths)
+    loader.dump(image_path)
+    elapsed = time.perf_counter() - start_time
+    print("\n".join(loader.load_map()))
+    entry = f"{loader.entry:06X}" if loader.entry is not None else "none"
+    print(f" Linked {len(paths)} file(s): {len(memory)} bytes at {progaddr:06X}, entry {entry} ({elapsed:.3f}s)")
+    print(f" Memory image: {image_path}")
+    return loader
+
+def run_image(loader, max_steps=None):
+    """Execute a linked program in the emulator and report its speed"""
+    if loader.entry is None:
+        print("Error: no entry point (E record) to start from")
+        return None
+    emulator = Emulator(blocks=True)
+    emulator.load(loader.memory, loader.progaddr)
+    start_time = time.perf_counter()
+    try:
+        steps = emulator.run(loader.entry, max_steps)
+    except ValueError as e:
+        print(f"Error: {e} (after {emulator.steps} instructions)")
+        return emulator
+    elapsed = time.perf_counter() - start_time
+    rate = steps / elapsed / 1e6 if elapsed else 0.0
+    state = "halted" if emulator.halted else f"stopped at {emulator.pc:06X}"
+    print(f" Ran {steps} instructions in {elapsed:.3f}s ({rate:.2f} MIPS), {state}")
+    print(" " + "  ".join(f"{name}={emulator.registers[i]:06X}" for i, name in enumerate("AXLBST")))
+    return emulator
+
+def write_stats(reports, path):
+    """Per-file stats reports as JSON, to stdout for "-" """
+    text = json.dumps(reports, indent=2)
+    if path == "-":
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+
 def main():
-    if len(sys.argv) > 1:
+    parser = argparse.ArgumentParser(description="SIC/XE assembler")
+    parser.add_argument("targets", nargs="*", help="source files, directories or glob patterns")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="assemble in batch mode on N worker processes")
+    parser.add_argument("--one-pass", action="store_true",
+                        help="use the single-pass engine with forward-reference backpatching")
+    parser.add_argument("--listing", default="output_listing.txt", metavar="PATH",
+                        help="listing file for single-file runs (batch mode writes <source>.lst)")
+    parser.add_argument("--no-listing", action="store_true",
+                        help="skip listing generation entirely")
+    parser.add_argument("--section-jobs", type=int, default=None, metavar="N",
+                        help="worker processes for control sections (1 = serial; default: automatic)")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="encode format 3/4 lines in one NumPy batch (needs numpy)")
+    parser.add_argument("--relax", action="store_true",
+                        help="promote only the format 3 lines that cannot reach their operand to format 4")
+    parser.add_argument("--auto-base", action="store_true",
+                        help="insert LDB/BASE where a base register saves format 4 promotions (implies --relax)")
+    parser.add_argument("--stats", nargs="?", const="-", metavar="PATH",
+                        help="write per-phase timings and counters as JSON to PATH (default: stdout; not in batch mode)")
+    parser.add_argument("--stats-memory", action="store_true",
+                        help="with --stats: also record peak memory per phase (tracing makes the timings several times higher)")
+    parser.add_argument("--link", metavar="IMAGE",
+                        help="link the given .obj files into a memory image instead of assembling")
+    parser.add_argument("--load-address", default="0", metavar="HEX",
+                        help="address the linked program is loaded at (default 0)")
+    parser.add_argument("--run", action="store_true",
+                        help="with --link: execute the linked program in the emulator")
+    parser.add_argument("--max-steps", type=int, default=None, metavar="N",
+                        help="with --run: stop after about N instructions")
+    args = parser.parse_args()
+    listing_path = None if args.no_listing else args.listing
+    options = dict(one_pass=args.one_pass, vectorized=args.vectorized,
+                   section_jobs=args.section_jobs, relax=args.relax, auto_base=args.auto_base)
+    if (args.relax or args.auto_base) and args.one_pass:
+        print("Error: --relax and --auto-base need the whole program laid out first - not with --one-pass")
+        return
+
+    # With --stats - stdout carries nothing but the JSON: progress and warnings go to stderr
+    progress = redirect_stdout(sys.stderr) if args.stats == "-" else nullcontext()
+
+    if args.link:
+        missing = [path for path in args.targets if not os.path.exists(path)]
+        if not args.targets or missing:
+            print(f"Error: object files not found: {', '.join(missing) or 'none given'}")
+            return
+        loader = link_objects(args.targets, args.link, int(args.load_address, 16))
+        if args.run:
+            run_image(loader, args.max_steps)
+    elif args.jobs is not None:
+        # Batch mode: every worker writes <source>.lst next to its .obj
+        sources = collect_sources(args.targets or EXAMPLE_FILES)
+        if not sources:
+            print("Error: no source files to assemble")
+            return
+        assemble_batch(sources, args.jobs if args.jobs > 0 else None, not args.no_listing, **options)
+    elif args.targets:
         # Assemble specific file
-        filename = sys.argv[1]
+        filename = args.targets[0]
         if not os.path.exists(filename):
             print(f"Error: File '{filename}' not found")
             return
-        assemble_file(filename)
+        stats = Stats(memory=args.stats_memory) if args.stats else None
+        with progress:
+            assemble_file(filename, listing_path, stats=stats, **options)
+        if stats is not None:
+            write_stats({filename: stats.report()}, args.stats)
     else:
         # Assemble all example files
-        print("=== SIC/XE ASSEMBLER ===")
-        files = [
-            'examples/basic.txt',
-            'examples/functions.txt', 
-            'examples/literals.txt',
-            'examples/prog_blocks.txt',
-            'examples/control_section.txt',
-            'examples/macros.txt'
-        ]
-        
+        files = EXAMPLE_FILES
+
         success_count = 0
-        for file in files:
-            if os.path.exists(file):
-                if assemble_file(file):
-                    success_count += 1
-                print()  # blank line between files
-            else:
-                print(f"File not found: {file}")
-        
-        print(f" Results: {success_count}/{len(files)} files assembled successfully!")
+        reports = {}
+        with progress:
+            print("=== SIC/XE ASSEMBLER ===")
+            for file in files:
+                if os.path.exists(file):
+                    stats = Stats(memory=args.stats_memory) if args.stats else None
+                    if assemble_file(file, listing_path, stats=stats, **options):
+                        success_count += 1
+                    if stats is not None:
+                        reports[file] = stats.report()
+                    print()  # blank line between files
+                else:
+                    print(f"File not found: {file}")
+
+            print(f" Results: {success_count}/{len(files)} files assembled successfully!")
+        if args.stats:
+            write_stats(reports, args.stats)
 
 if __name__ == "__main__":
     main()
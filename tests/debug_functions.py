@@ -35,7 +35,7 @@ for line in lines:
 print("\nNow let's test the actual assembly...")
 pass1 = Pass1()
 try:
-    intermediate, symtab, length = pass1.assemble(lines)
+    intermediate, symtab, length, prog_name, start_addr = pass1.assemble(lines)
     print("✓ Pass 1 completes successfully")
     
     # Test Pass 2 on just the first few lines to see where it fails
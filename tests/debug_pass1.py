@@ -11,7 +11,7 @@ for i, line in enumerate(lines):
 print("\nTracing Pass 1 execution...")
 pass1 = Pass1()
 try:
-    intermediate, symtab, length = pass1.assemble(lines)
+    intermediate, symtab, length, prog_name, start_addr = pass1.assemble(lines)
     print("SUCCESS!")
     print(f"Intermediate: {len(intermediate)} lines")
     print(f"Symbols: {symtab.symbols}")
@@ -12,7 +12,7 @@ def test_functions():
 
     # Run Pass 1
     pass1 = Pass1()
-    intermediate, symtab, length = pass1.assemble(lines)
+    intermediate, symtab, length, prog_name, start_addr = pass1.assemble(lines)
     print(f"✓ Pass 1: {len(intermediate)} lines, {len(symtab.symbols)} symbols")
 
     # Run Pass 2 with detailed error handling
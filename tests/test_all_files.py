@@ -16,15 +16,13 @@ for filename in files:
             lines = [line.rstrip() for line in f if line.strip() and not line.strip().startswith('.')]
         
         pass1 = Pass1()
-        intermediate, symtab, length = pass1.assemble(lines)
+        intermediate, symtab, length, prog_name, start_addr = pass1.assemble(lines)
         
         optab = OpcodeTable()
         regtab = RegisterTable()
         pass2 = Pass2(symtab, optab, regtab)
         
-        # Use first word as program name
-        prog_name = lines[0].split()[0] if lines else "TEST"
-        object_program = pass2.assemble(intermediate, prog_name, 0x0000)
+        object_program = pass2.assemble(intermediate, prog_name or "TEST", start_addr)
         
         print(f" {filename}: SUCCESS - {len(object_program)} chars")
         
@@ -0,0 +1,56 @@
+# test_autobase.py
+from assembler.autobase import plan_base
+from assembler.emulator import Emulator
+from assembler.loader import LinkingLoader
+from assembler.twopass import two_pass
+
+SOURCE = [
+    "PROG    START   0",
+    "FIRST   +J      WORK",
+    "ALPHA   WORD    5",
+    "BETA    WORD    7",
+    "GAMMA   RESW    1",
+    "BUFFER  RESB    4000",
+    "WORK    LDA     ALPHA",
+    "        ADD     BETA",
+    "        STA     GAMMA",
+    "        LDA     BETA",
+    "        STA     ALPHA",
+    "        J       *",
+    "        END     FIRST",
+]
+
+def run(lines):
+    object_program, pass1 = two_pass(lines, relax=True)
+    loader = LinkingLoader()
+    loader.load([object_program.split("\n")])
+    emulator = Emulator()
+    emulator.load(loader.memory)
+    emulator.run(loader.entry, 100)
+    return emulator, pass1.symtab.symbols, pass1.locctr - pass1.start_addr
+
+def test_base_covers_far_data():
+    plan = plan_base(SOURCE)
+    assert plan.applied and plan.covered == 5
+    assert (plan.promoted, plan.promoted_with_base, plan.saved) == (5, 0, 2)
+    assert plan.lines[1:4] == ["FIRST   LDB     #FIRST", "        BASE    FIRST", "        +J      WORK"]
+    assert "5 format 4 promotions saved" in plan.summary()
+
+    # The rewritten program is smaller and computes the same
+    emulator, symbols, length = run(plan.lines)
+    original, original_symbols, original_length = run(SOURCE)
+    assert length == original_length - 2
+    assert emulator.word(symbols["GAMMA"]) == original.word(original_symbols["GAMMA"]) == 12
+    assert emulator.word(symbols["ALPHA"]) == 7
+
+def test_programs_left_alone():
+    assert not plan_base(SOURCE[:5] + ["        END     FIRST"]).applied   # nothing far
+    uses_b = plan_base(SOURCE[:6] + ["        RMO     A,B"] + SOURCE[6:])
+    assert uses_b.label == "FIRST" and not uses_b.applied and "register B" in uses_b.summary()
+    few = plan_base(SOURCE[:8] + SOURCE[11:])   # LDA ALPHA, ADD BETA: 2 bytes saved, LDB costs 3
+    assert few.label is not None and not few.applied and few.lines == SOURCE[:8] + SOURCE[11:]
+
+if __name__ == "__main__":
+    test_base_covers_far_data()
+    test_programs_left_alone()
+    print("Auto BASE tests passed")
@@ -0,0 +1,24 @@
+# test_batch.py
+import os
+from main import collect_sources, assemble_worker
+
+SOURCE = ["COPY START 1000", "FIRST LDA FIVE", "FIVE WORD 5", "END FIRST"]
+
+def test_batch_worker_writes_own_listing(tmp_path):
+    for name in ("a.txt", "b.txt"):
+        (tmp_path / name).write_text("\n".join(SOURCE) + "\n")
+
+    sources = collect_sources([str(tmp_path)])
+    assert [os.path.basename(s) for s in sources] == ["a.txt", "b.txt"]
+
+    for source in sources:
+        filename, ok, elapsed = assemble_worker(source)
+        assert ok and filename == source and elapsed >= 0
+        base = os.path.splitext(source)[0]
+        assert os.path.exists(base + ".obj")
+        assert os.path.exists(base + ".lst")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_batch_worker_writes_own_listing(pathlib.Path(tempfile.mkdtemp()))
+    print("Batch test passed")
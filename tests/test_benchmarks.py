@@ -0,0 +1,41 @@
+# test_benchmarks.py
+from assembler.twopass import two_pass
+from assembler.vectorized import HAVE_NUMPY
+from benchmarks.generator import generate_program, DEFAULT_MIX, LTORG_EVERY
+from benchmarks.run import compare, run_size
+
+def test_generator_is_deterministic():
+    assert generate_program(2000) == generate_program(2000)
+    assert generate_program(2000, seed=1) != generate_program(2000)
+    lines = generate_program(5000)
+    assert lines[0].split()[1] == "START" and lines[-1].split()[0] == "END"
+    assert 5000 <= len(lines) <= 5000 + 5000 // LTORG_EVERY + 1   # plus one LTORG per LTORG_EVERY statements
+
+def test_generated_program_assembles_cleanly(capsys):
+    lines = generate_program(3000, seed=9)
+    two_pass(lines)
+    assert capsys.readouterr().out == ""   # no undefined symbols, unknown operations or bad literals
+
+def test_mix_is_honoured():
+    lines = generate_program(2000, mix={**DEFAULT_MIX, "resb": 0, "literal": 0})
+    assert not any(" RESB " in line or "=" in line for line in lines)
+    only_format2 = generate_program(500, mix={"format2": 1})
+    assert all(line.split()[-1].replace(",", "").isalpha() for line in only_format2[1:-1])
+
+def test_every_phase_is_measured():
+    results = run_size(300, repeat=1, memory=False)
+    phases = {"pass1", "pass2", "encode", "objectwriter", "listing"} | ({"encode_batch"} if HAVE_NUMPY else set())
+    assert set(results) == phases
+    assert all(result["lines_per_s"] > 0 and result["peak_kib"] is None for result in results.values())
+
+def test_regressions_use_the_threshold():
+    baselines = {"pass1@1000": 1000.0, "pass2@1000": 1000.0}
+    current = {"pass1@1000": 800.0, "pass2@1000": 700.0, "encode@1000": 5.0}
+    assert compare(current, baselines, threshold=0.25) == [("pass2@1000", 1000.0, 700.0)]
+
+if __name__ == "__main__":
+    test_generator_is_deterministic()
+    test_mix_is_honoured()
+    test_every_phase_is_measured()
+    test_regressions_use_the_threshold()
+    print("Benchmark tests passed")
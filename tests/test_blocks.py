@@ -0,0 +1,101 @@
+# test_blocks.py
+from assembler.objectwriter import ObjectWriter
+from assembler.onepass import OnePass
+from assembler.pass1 import Pass1
+from assembler.tables import OpcodeTable, RegisterTable
+from assembler.twopass import two_pass
+
+SOURCE = [
+    "COPY    START   0",
+    "FIRST   STL     RETADR",
+    "CLOOP   JSUB    RDREC",
+    "        LDA     LENGTH",
+    "        COMP    #0",
+    "        JEQ     ENDFIL",
+    "        JSUB    WRREC",
+    "        J       CLOOP",
+    "ENDFIL  LDA     =C'EOF'",
+    "        STA     BUFFER",
+    "        LDA     #3",
+    "        STA     LENGTH",
+    "        JSUB    WRREC",
+    "        J       @RETADR",
+    "        USE     CDATA",
+    "RETADR  RESW    1",
+    "LENGTH  RESW    1",
+    "        USE     CBLKS",
+    "BUFFER  RESB    4096",
+    "BUFEND  EQU     *",
+    "MAXLEN  EQU     BUFEND-BUFFER",
+    "        USE",
+    "RDREC   CLEAR   X",
+    "        CLEAR   A",
+    "        CLEAR   S",
+    "        +LDT    #MAXLEN",
+    "RLOOP   TD      INPUT",
+    "        JEQ     RLOOP",
+    "        RD      INPUT",
+    "        COMPR   A,S",
+    "        JEQ     EXIT",
+    "        STCH    BUFFER,X",
+    "        TIXR    T",
+    "        JLT     RLOOP",
+    "EXIT    STX     LENGTH",
+    "        RSUB",
+    "        USE     CDATA",
+    "INPUT   BYTE    X'F1'",
+    "        USE",
+    "WRREC   CLEAR   X",
+    "        LDT     LENGTH",
+    "WLOOP   TD      =X'05'",
+    "        JEQ     WLOOP",
+    "        LDCH    BUFFER,X",
+    "        WD      =X'05'",
+    "        TIXR    T",
+    "        JLT     WLOOP",
+    "        RSUB",
+    "        USE     CDATA",
+    "        LTORG",
+    "        END     FIRST",
+]
+
+def test_blocks_are_laid_out_in_order():
+    pass1 = Pass1()
+    intermediate, symtab, length, prog_name, start_addr = pass1.assemble(SOURCE)
+    assert pass1.blocktab.blocks == {"DEFAULT": 0, "CDATA": 1, "CBLKS": 2}
+    assert pass1.blocktab.starts == [0x0000, 0x0066, 0x0071]
+    assert length == 0x1071
+    symbols = symtab.symbols
+    assert (symbols["RETADR"], symbols["LENGTH"], symbols["INPUT"]) == (0x66, 0x69, 0x6C)
+    assert (symbols["BUFFER"], symbols["BUFEND"], symbols["MAXLEN"]) == (0x71, 0x1071, 0x1000)
+    assert (symbols["RDREC"], symbols["WRREC"]) == (0x27, 0x4D)
+    # LTORG in CDATA places the pool after INPUT
+    assert pass1.littab.get("=C'EOF'") == 0x6D and pass1.littab.get("=X'05'") == 0x70
+
+def test_object_program_uses_absolute_addresses():
+    records = two_pass(SOURCE)[0].split("\n")
+    assert records[0] == "HCOPY  000000001071"
+    assert records[1].startswith("T0000001E172063")       # STL RETADR, PC-relative into CDATA
+    assert "T00006C05F1454F4605" in records              # INPUT, =C'EOF' and =X'05' in one record
+    assert not any(record.startswith("T0000") and int(record[1:7], 16) >= 0x71 for record in records)
+    assert records[-1] == "E000000"
+
+def test_engines_agree_on_blocks():
+    expected = two_pass(SOURCE)[0]
+    assert OnePass(OpcodeTable(), RegisterTable()).assemble(iter(SOURCE), listing_path=None) == expected
+
+def test_switching_blocks_keeps_text_records_open():
+    writer = ObjectWriter()
+    writer.write_header("P", 0, 0x20)
+    writer.add_code(0x00, "AAAAAA")
+    writer.add_code(0x10, "BBBBBB", block=1)
+    writer.add_code(0x03, "CCCCCC")
+    writer.add_code(0x13, "DDDDDD", block=1)
+    writer.write_end(0)
+    assert writer.generate().split("\n")[1:-1] == ["T00000006AAAAAACCCCCC", "T00001006BBBBBBDDDDDD"]
+
+if __name__ == "__main__":
+    test_blocks_are_laid_out_in_order()
+    test_object_program_uses_absolute_addresses()
+    test_switching_blocks_keeps_text_records_open()
+    print("Program block tests passed")
@@ -0,0 +1,95 @@
+# test_emulator.py
+import pytest
+from assembler.emulator import Emulator, HALT, A, X, T
+from assembler.loader import LinkingLoader
+from assembler.twopass import two_pass
+
+SUM = [
+    "SUM     START   0",
+    "FIRST   LDX     #0",
+    "        LDA     #0",
+    "        LDS     #3",
+    "        +LDT    #3000",
+    "LOOP    ADD     TABLE,X",
+    "        ADDR    S,X",
+    "        COMPR   X,T",
+    "        JLT     LOOP",
+    "        STA     TOTAL",
+    "        J       *",
+    "TOTAL   RESW    1",
+    "TABLE   WORD    7",
+    "        END     FIRST",
+]
+
+COPY = [
+    "COPY    START   0",
+    "FIRST   STL     RETADR",
+    "        CLEAR   A",
+    "RLOOP   TD      INDEV",
+    "        JEQ     RLOOP",
+    "        RD      INDEV",
+    "        COMP    ZERO",
+    "        JEQ     EXIT",
+    "        WD      OUTDEV",
+    "        J       RLOOP",
+    "EXIT    J       @RETADR",
+    "RETADR  RESW    1",
+    "ZERO    WORD    0",
+    "INDEV   BYTE    X'F1'",
+    "OUTDEV  BYTE    X'05'",
+    "        END     FIRST",
+]
+
+def load(lines, blocks=False):
+    object_program, pass1 = two_pass(lines)
+    loader = LinkingLoader()
+    loader.load([object_program.split("\n")])
+    emulator = Emulator(blocks=blocks)
+    emulator.load(loader.memory)
+    return emulator, loader.entry, pass1.symtab.symbols
+
+@pytest.mark.parametrize("blocks", [False, True])
+def test_loop_runs_to_completion(blocks):
+    emulator, entry, symbols = load(SUM, blocks)
+    # TABLE is followed by zeros, so only its first word is added (once per 3 bytes of X)
+    steps = emulator.run(entry)
+    assert emulator.halted and emulator.registers[X] == emulator.registers[T] == 3000
+    assert emulator.word(symbols["TOTAL"]) == 7
+    assert steps == 4 + 4 * 1000 + 2
+    # Every instruction was decoded exactly once
+    assert len(emulator.decoded) == 10
+
+@pytest.mark.parametrize("blocks", [False, True])
+def test_devices_and_return_to_caller(blocks):
+    emulator, entry, symbols = load(COPY, blocks)
+    emulator.devices[0xF1] = bytearray(b"HELLO")
+    emulator.run(entry)
+    assert emulator.halted and emulator.registers[A] == 0
+    assert emulator.devices[0x05] == bytearray(b"HELLO")
+    assert emulator.word(symbols["RETADR"]) == HALT
+
+def test_writes_invalidate_decoded_instructions():
+    emulator = Emulator(memory_size=64)
+    emulator.load(bytes.fromhex("010005" "3F2FFD"))    # LDA #5 / J *
+    emulator.run(0)
+    assert emulator.registers[A] == 5 and 0 in emulator.decoded
+    emulator.store(1, bytes.fromhex("0007"))         # now LDA #7
+    assert 0 not in emulator.decoded
+    emulator.run(0)
+    assert emulator.registers[A] == 7
+
+def test_max_steps_and_bad_opcodes():
+    emulator = Emulator(memory_size=64)
+    emulator.load(bytes.fromhex("3F2FFD"))           # J *
+    assert emulator.run(0, max_steps=1) == 1 and emulator.halted
+    emulator.load(bytes.fromhex("FF"), 8)
+    with pytest.raises(ValueError):
+        emulator.run(8)
+
+if __name__ == "__main__":
+    test_loop_runs_to_completion(False)
+    test_loop_runs_to_completion(True)
+    test_devices_and_return_to_caller(False)
+    test_writes_invalidate_decoded_instructions()
+    test_max_steps_and_bad_opcodes()
+    print("Emulator tests passed")
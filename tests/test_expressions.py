@@ -0,0 +1,116 @@
+# test_expressions.py
+import pytest
+from assembler.expressions import compile_expression, is_expression, resolve_equates
+from assembler.pass1 import Pass1
+from assembler.pass2 import Pass2
+from assembler.onepass import OnePass
+from assembler.tables import OpcodeTable, RegisterTable
+from assembler.twopass import two_pass
+
+PROGRAM = [
+    "EQUS    START   1000",
+    "FIRST   LDA     #MAXLEN",
+    "WAIT    TD      DEVICE",
+    "        JEQ     *-3",
+    "        J       NEXT",
+    "MAXLEN  EQU     BUFEND-BUFFER",
+    "HALF    EQU     MAXLEN/2+1",
+    "DEVICE  BYTE    X'F1'",
+    "BUFFER  RESB    100",
+    "BUFEND  EQU     *",
+    "NEXT    LDA     #BUFEND-BUFFER",
+    "        END     FIRST",
+]
+
+def test_compile_and_evaluate():
+    expr = compile_expression("BUFEND-BUFFER")
+    assert expr.symbols == ("BUFEND", "BUFFER") and not expr.uses_locctr
+    assert expr.evaluate({"BUFEND": 0x2000, "BUFFER": 0x1000}) == 0x1000
+    assert compile_expression("*-3").evaluate({}, locctr=0x1006) == 0x1003
+    assert compile_expression("*").evaluate({}, locctr=7) == 7
+    assert compile_expression("2*(A+1)-B/2").evaluate({"A": 4, "B": 6}) == 7
+    assert compile_expression("-5").evaluate({}) == -5
+    assert compile_expression("*-3") is compile_expression("*-3")   # compiled once
+
+def test_bad_expressions():
+    for text in ("", "A+", "(A", "A B", "A%2"):
+        with pytest.raises(ValueError):
+            compile_expression(text)
+    with pytest.raises(ValueError):
+        compile_expression("A+B").evaluate({"A": 1})
+
+def test_is_expression():
+    assert is_expression("*") and is_expression("*-3") and is_expression("BUFEND-BUFFER")
+    assert not is_expression("BUFFER") and not is_expression("4096")
+    assert not is_expression("C'E-F'") and not is_expression("=X'05'")
+
+def test_equates_resolve_in_dependency_order():
+    symbols = {"BUFFER": 10}
+    equates = {
+        "C": (compile_expression("B+1"), 0),
+        "B": (compile_expression("A*2"), 0),
+        "A": (compile_expression("BUFFER+5"), 0),
+        "LOOP1": (compile_expression("LOOP2"), 0),
+        "LOOP2": (compile_expression("LOOP1"), 0),
+        "BAD": (compile_expression("MISSING"), 0),
+    }
+    unresolved = resolve_equates(equates, symbols)
+    assert symbols == {"BUFFER": 10, "A": 15, "B": 30, "C": 31}
+    assert sorted(unresolved) == ["BAD", "LOOP1", "LOOP2"]
+
+def test_pass1_defines_equates():
+    intermediate, symtab, length, prog_name, start_addr = Pass1().assemble(PROGRAM)
+    assert symtab.symbols["BUFEND"] == symtab.symbols["BUFFER"] + 100
+    assert symtab.symbols["MAXLEN"] == 100
+    assert symtab.symbols["HALF"] == 51
+
+def test_pass2_encodes_expression_operands():
+    intermediate, symtab, length, prog_name, start_addr = Pass1().assemble(PROGRAM)
+    pass2 = Pass2(symtab)
+    codes = {record.operand: pass2.encode(record) for record in intermediate}
+    assert codes["*-3"] == "332FFA"            # back to WAIT, PC-relative
+    assert codes["#MAXLEN"] == "010064"
+    assert codes["#BUFEND-BUFFER"] == "010064"
+
+def test_unresolvable_equate_warns(capsys):
+    intermediate, symtab, length, prog_name, start_addr = Pass1().assemble(
+        ["P START 0", "A EQU B", "B EQU A", "END"])
+    assert "Cannot resolve EQU 'A'" in capsys.readouterr().out
+    assert "A" not in symtab.symbols
+
+def test_division_by_zero_warns(capsys):
+    source = ["P       START   0", "ZERO    EQU     4/0", "LATER   EQU     NEXT/0", "AFTER   EQU     LATER+1",
+              "        LDA     #8/0", "NEXT    RSUB", "        END"]
+    object_program, pass1 = two_pass(source)
+    out = capsys.readouterr().out
+    assert "Division by zero in '4/0' - 'ZERO' not defined" in out
+    assert "Cannot resolve EQU 'LATER'" in out and "Cannot resolve EQU 'AFTER'" in out
+    assert not {"ZERO", "LATER", "AFTER"} & set(pass1.symtab.symbols)
+    assert "Division by zero in '8/0' at 0000 - assembled as 0" in out
+    assert "T00000006012FFD4F0000" in object_program
+    assert OnePass(OpcodeTable(), RegisterTable()).assemble(iter(source), listing_path=None) == object_program
+
+def test_unresolvable_operands_warn(capsys):
+    object_program, _ = two_pass(["P       START   0", "        EXTREF  EXT", "        WORD    5/0",
+                                  "        LDA     NOSUCH", "        LDA     NOSUCH+1", "        +JSUB   EXT", "        END"])
+    out = capsys.readouterr().out
+    assert "Division by zero in '5/0' at 0000 - assembled as 0" in out
+    assert "Undefined symbol 'NOSUCH' at 0003 - assembled as 0" in out
+    assert "Undefined symbol 'NOSUCH' in 'NOSUCH+1' at 0006 - assembled as 0" in out
+    assert "EXT" not in out                             # filled in by its M record
+    assert "T0000000D000000032FFA032FF74B100000" in object_program
+
+def test_engines_agree_on_equates():
+    expected = two_pass(PROGRAM)[0]
+
+    assert OnePass(OpcodeTable(), RegisterTable()).assemble(iter(PROGRAM), listing_path=None) == expected
+
+if __name__ == "__main__":
+    test_compile_and_evaluate()
+    test_bad_expressions()
+    test_is_expression()
+    test_equates_resolve_in_dependency_order()
+    test_pass1_defines_equates()
+    test_pass2_encodes_expression_operands()
+    test_engines_agree_on_equates()
+    print("Expression tests passed")
@@ -15,7 +15,7 @@ print(f"JSUB in OPTAB: {optab.get('JSUB')}")
 test_code = ["TEST START 1000", "+JSUB SUBRTN", "SUBRTN RSUB", "END TEST"]
 
 pass1 = Pass1()
-intermediate, symtab, length = pass1.assemble(test_code)
+intermediate, symtab, length, prog_name, start_addr = pass1.assemble(test_code)
 
 optab = OpcodeTable()
 from assembler.tables import RegisterTable
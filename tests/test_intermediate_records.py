@@ -0,0 +1,45 @@
+# test_intermediate_records.py
+from assembler.parser import make_record, as_record, FLAG_N, FLAG_I, FLAG_X, FLAG_E
+from assembler.pass1 import Pass1
+from assembler.tables import OpcodeTable, RegisterTable
+from assembler.pass2 import Pass2
+
+def test_operand_flags_decoded_once():
+    assert make_record(0, "", "LDA", "#3").flags == FLAG_I
+    assert make_record(0, "", "J", "@RETADR").flags == FLAG_N
+    indexed = make_record(0, "", "STCH", "BUFFER,X")
+    assert indexed.flags == FLAG_N | FLAG_I | FLAG_X
+    assert indexed.symbol == "BUFFER"
+
+    extended = make_record(0, "", "+JSUB", "RDREC")
+    assert extended.mnemonic == "JSUB" and extended.format == 3
+    assert extended.size == 4 and extended.flags & FLAG_E
+
+def test_sizes_by_format():
+    assert make_record(0, "", "CLEAR", "X").size == 2
+    assert make_record(0, "", "FIX", "").size == 1
+    assert make_record(0, "", "RESW", "2").size == 6
+    assert make_record(0, "", "BYTE", "X'F1'").size == 1
+    assert make_record(0, "", "BASE", "LENGTH").size == 0
+
+def test_legacy_tuples_still_accepted():
+    record = as_record((0x0003, "CLOOP", "JSUB", "RDREC"))
+    loc, label, op, operand = record
+    assert (loc, label, op, operand) == (0x0003, "CLOOP", "JSUB", "RDREC")
+
+def test_pass2_reads_records():
+    source = ["COPY START 0", "FIRST CLEAR X", "LDA FIVE", "FIVE WORD 5", "END FIRST"]
+    intermediate, symtab, length, prog_name, start_addr = Pass1().assemble(source)
+    assert [r.locctr for r in intermediate] == [0, 0, 2, 5, 8]
+
+    pass2 = Pass2(symtab, OpcodeTable(), regtab=RegisterTable())
+    codes = [pass2.encode(r) for r in intermediate]
+    assert codes[1] == "B410"
+    assert codes[2] == pass2.generate_object_code("LDA", "FIVE", 2)
+
+if __name__ == "__main__":
+    test_operand_flags_decoded_once()
+    test_sizes_by_format()
+    test_legacy_tuples_still_accepted()
+    test_pass2_reads_records()
+    print("Intermediate record tests passed")
@@ -0,0 +1,30 @@
+# test_listing.py
+from assembler.listing import ListingWriter
+from assembler.pass1 import Pass1
+from assembler.pass2 import Pass2
+from assembler.tables import OpcodeTable, RegisterTable
+
+def test_listing_written_in_batches(tmp_path):
+    path = tmp_path / "out.lst"
+    listing = ListingWriter(str(path), batch_lines=2)
+    for loc in range(5):
+        listing.add_line(loc * 3, "", "LDA", "FIVE", "032000")
+    assert len(listing.pending) == 1      # two full batches already handed to the file
+    listing.write()
+    lines = path.read_text().splitlines()
+    assert len(lines) == 5
+    assert lines[1] == "0003\t          LDA       FIVE      032000"
+
+def test_listing_disabled(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    intermediate, symtab, length, prog_name, start_addr = Pass1().assemble(["LDA FIVE", "FIVE WORD 5"])
+    pass2 = Pass2(symtab, OpcodeTable(), regtab=RegisterTable())
+    object_program = pass2.assemble(intermediate, "P", start_addr, listing_path=None)
+    assert object_program.startswith("HP")
+    assert pass2.listing is None
+    assert not list(tmp_path.iterdir())
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_listing_written_in_batches(pathlib.Path(tempfile.mkdtemp()))
+    print("Listing tests passed")
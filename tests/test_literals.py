@@ -0,0 +1,71 @@
+# test_literals.py
+from assembler.onepass import OnePass
+from assembler.tables import LiteralTable, OpcodeTable, RegisterTable
+from assembler.twopass import pass2_for, two_pass
+
+SOURCE = [
+    "LITS    START   1000",
+    "FIRST   LDA     =C'EOF'",
+    "        STA     BUFFER",
+    "        LDA     =X'454F46'",
+    "        TD      =X'05'",
+    "        LTORG",
+    "        WD      =X'05'",
+    "        LDT     =4096",
+    "        J       FIRST",
+    "BUFFER  RESB    10",
+    "        END     FIRST",
+]
+
+def test_literal_table_dedupes_by_value():
+    littab = LiteralTable()
+    for literal in ("=C'EOF'", "=X'454F46'", "=X'05'", "=C'EOF'"):
+        littab.add(literal)
+    assert littab.pool() == [("=C'EOF'", b"EOF"), ("=X'05'", b"\x05")]
+    assert littab.assign_addresses(0x100) == 0x100   # pool() already took them
+
+    littab.add("=X'F1'")
+    littab.add("=3")
+    assert littab.assign_addresses(0x200) == 0x204   # 1 byte + one 3-byte word
+    assert littab.get("=X'F1'") == 0x200 and littab.get("=3") == 0x201
+
+def test_pools_placed_at_ltorg_and_end():
+    intermediate = two_pass(SOURCE)[1].intermediate
+    pool = [(record.locctr, record.opcode, record.size) for record in intermediate if record.label == "*"]
+    # LTORG pool after the 4 instructions: EOF (shared by both spellings) and X'05'
+    # END pool after BUFFER: =X'05' was used again after the LTORG, so it is pooled again
+    assert pool == [(0x100C, "=C'EOF'", 3), (0x100F, "=X'05'", 1), (0x1023, "=X'05'", 1), (0x1024, "=4096", 3)]
+    assert intermediate[-1].opcode == "END" and intermediate[-1].locctr == 0x1027
+    assert two_pass(SOURCE)[0].startswith("HLITS  001000000027")
+
+def test_pass2_references_pool_addresses():
+    object_program, pass1 = two_pass(SOURCE)
+    codes = {record.operand: pass2_for(pass1).encode(record) for record in pass1.intermediate}
+    assert codes["=C'EOF'"] == "032009"      # PC-relative to 100C
+    assert codes["=X'454F46'"] == "032003"   # same pool entry
+    assert codes["=X'05'"] == "DF2010"       # WD: PC-relative to the END pool's copy at 1023
+    assert codes["=4096"] == "77200E"        # PC-relative to 1024
+    assert "454F4605" in object_program   # the LTORG pool's bytes are in the text records
+
+def test_literal_used_after_its_pool_is_pooled_again():
+    # The first pool is 8000 bytes back - out of reach, and a direct address would not relocate
+    source = ["FAR     START   0", "        LDA     =C'EOF'", "        LTORG", "        RESB    8000",
+              "        LDA     =C'EOF'", "        LTORG", "        END     FAR"]
+    object_program, pass1 = two_pass(source)
+    pool = [(record.locctr, record.opcode) for record in pass1.intermediate if record.label == "*"]
+    assert pool == [(0x0003, "=C'EOF'"), (0x1F49, "=C'EOF'")]
+    assert "T000003060320" not in object_program
+    assert "T001F4606032000454F46" in object_program   # second LDA, PC-relative to its own pool
+    assert "\nM" not in object_program
+    assert OnePass(OpcodeTable(), RegisterTable()).assemble(iter(source), listing_path=None) == object_program
+
+def test_engines_agree_on_literals():
+    expected = two_pass(SOURCE)[0]
+    assert OnePass(OpcodeTable(), RegisterTable()).assemble(iter(SOURCE), listing_path=None) == expected
+
+if __name__ == "__main__":
+    test_literal_table_dedupes_by_value()
+    test_pools_placed_at_ltorg_and_end()
+    test_pass2_references_pool_addresses()
+    test_engines_agree_on_literals()
+    print("Literal tests passed")
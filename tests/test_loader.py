@@ -0,0 +1,46 @@
+# test_loader.py
+from assembler.loader import LinkingLoader
+from assembler.sections import assemble_sections
+from test_sections import SOURCE
+
+def test_estab_and_load_map():
+    loader = LinkingLoader(0x4000)
+    loader.load([assemble_sections(SOURCE, jobs=1).split("\n")])
+    assert loader.estab == {"COPY": 0x4000, "BUFFER": 0x4029, "BUFEND": 0x5029, "LENGTH": 0x4023,
+                            "RDREC": 0x5029, "WRREC": 0x5048}
+    assert loader.entry == 0x4000 and len(loader.memory) == 0x1029 + 0x1F + 0x10
+    assert loader.load_map()[:3] == ["COPY            004000  001029", "        LENGTH  004023",
+                                     "        BUFFER  004029"]
+
+def test_modifications_link_sections():
+    loader = LinkingLoader(0x4000)
+    memory = loader.load([assemble_sections(SOURCE, jobs=1).split("\n")])
+    assert memory[0x03:0x07].hex() == "4b105029"              # +JSUB RDREC
+    assert memory[0x1029 + 0x0B:0x1029 + 0x0F].hex() == "57904029"   # +STCH BUFFER,X
+    assert memory[0x1029 + 0x1C:0x1029 + 0x1F].hex() == "001000"     # WORD BUFEND-BUFFER
+    assert memory[0x1048 + 0x02:0x1048 + 0x06].hex() == "77104023"   # +LDT LENGTH
+
+def test_relocation_and_absolute_programs():
+    records = ["HPROG  001000000009", "T00100009031010060000000000", "M00100105", "E001000"]
+    loader = LinkingLoader(0x2000)
+    memory = loader.load([records])
+    # Moved from 1000 to 2000: the unnamed M record adds the difference
+    assert memory.hex() == "031020060000000000" and loader.entry == 0x2000
+
+def test_undefined_symbol_is_reported(capsys):
+    loader = LinkingLoader()
+    memory = loader.load([["HMAIN  000000000004", "T0000000403100000", "M00000105+NOWHERE", "E"]])
+    assert memory.hex() == "03100000"
+    assert "Undefined external symbol 'NOWHERE'" in capsys.readouterr().out
+
+def test_dump_through_mmap(tmp_path):
+    loader = LinkingLoader()
+    loader.load([["HMAIN  000000000004", "T00000004DEADBEEF", "E000000"]])
+    loader.dump(tmp_path / "image.bin")
+    assert (tmp_path / "image.bin").read_bytes() == bytes.fromhex("DEADBEEF")
+
+if __name__ == "__main__":
+    test_estab_and_load_map()
+    test_modifications_link_sections()
+    test_relocation_and_absolute_programs()
+    print("Loader tests passed")
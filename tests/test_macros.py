@@ -0,0 +1,114 @@
+# test_macros.py
+from assembler.macros import MacroProcessor
+from assembler.pass1 import Pass1
+from assembler.onepass import OnePass
+from assembler.tables import OpcodeTable, RegisterTable
+from assembler.twopass import two_pass
+
+SOURCE = [
+    "COPY    START   0",
+    "RDBUFF  MACRO   &INDEV,&BUFADR,&RECLTH",
+    ".       read a record into the buffer",
+    "        CLEAR   X",
+    "        +LDT    #4096",
+    "        TD      =X'&INDEV'",
+    "        JEQ     *-3",
+    "        RD      =X'&INDEV'",
+    "        STCH    &BUFADR,X",
+    "        TIXR    T",
+    "        JLT     *-19",
+    "        STX     &RECLTH",
+    "        MEND",
+    "FIRST   STL     RETADR",
+    "CLOOP   RDBUFF  F1,BUFFER,LENGTH",
+    "        RDBUFF  F1,BUFFER,LENGTH",
+    "        RDBUFF  F2,BUFFER,LENGTH",
+    "        J       @RETADR",
+    "RETADR  RESW    1",
+    "LENGTH  RESW    1",
+    "BUFFER  RESB    4096",
+    "        END     FIRST",
+]
+
+def test_definitions_removed_and_invocations_expanded():
+    processor = MacroProcessor()
+    lines = list(processor.expand(SOURCE))
+    assert not any("MACRO" in line or "MEND" in line or "&" in line for line in lines)
+    assert lines[2] == "CLOOP EQU *"
+    assert lines[3:12] == ["CLEAR   X", "+LDT    #4096", "TD      =X'F1'", "JEQ     *-3", "RD      =X'F1'",
+                           "STCH    BUFFER,X", "TIXR    T", "JLT     *-19", "STX     LENGTH"]
+    assert "TD      =X'F2'" in lines
+    assert len(lines) == len(SOURCE) - 12 + 3 * 9 - 3 + 1
+
+def test_expansions_are_memoized():
+    processor = MacroProcessor()
+    list(processor.expand(SOURCE))
+    info = processor.expand_call.cache_info()
+    assert processor.expansions == 3
+    assert (info.hits, info.misses) == (1, 2)   # the second F1 invocation is reused
+
+def test_defaults_nesting_and_local_labels():
+    source = [
+        "ZERO    MACRO   &REG=A",
+        "        CLEAR   &REG",
+        "        MEND",
+        "WAIT    MACRO   &DEV",
+        "$LOOP   TD      &DEV",
+        "        JEQ     $LOOP",
+        "        ZERO",
+        "        MEND",
+        "        WAIT    DEVICE",
+        "        WAIT    DEVICE",
+        "        ZERO    X",
+    ]
+    lines = list(MacroProcessor().expand(source))
+    assert lines == ["$1_LOOP   TD      DEVICE", "JEQ     $1_LOOP", "CLEAR   A",
+                     "$3_LOOP   TD      DEVICE", "JEQ     $3_LOOP", "CLEAR   A",
+                     "CLEAR   X"]
+
+def test_only_local_labels_are_renamed():
+    source = [
+        "SHOW    MACRO",
+        "$MSG    BYTE    C'$'",
+        "        LDA     =C'$A'  . loads $MSG",
+        "        J       $MSG",
+        "        MEND",
+        "        SHOW",
+    ]
+    lines = list(MacroProcessor().expand(source))
+    assert lines == ["$1_MSG    BYTE    C'$'", "LDA     =C'$A'  . loads $MSG", "J       $1_MSG"]
+
+def test_local_labels_never_repeat(capsys):
+    source = ["PROG    START   0", "WAIT    MACRO", "$LOOP   TD      DEVICE", "        JEQ     $LOOP",
+              "        MEND"] + ["        WAIT"] * 700 + ["DEVICE  BYTE    X'F1'", "        END"]
+    intermediate, symtab = Pass1().assemble(source)[:2]
+    assert len([name for name in symtab.symbols if name.endswith("_LOOP")]) == 700
+    assert "Duplicate symbol" not in capsys.readouterr().out
+    # Every JEQ jumps back to the TD of its own expansion
+    jumps = [record for record in intermediate if record.mnemonic == "JEQ"]
+    assert all(symtab.symbols[record.symbol] == record.locctr - 3 for record in jumps)
+
+def test_recursive_macro_stops(capsys):
+    lines = list(MacroProcessor().expand(["LOOP MACRO &N", "LOOP", "MEND", "LOOP"]))
+    assert lines == []
+    assert "nested more than" in capsys.readouterr().out
+
+def test_pass1_assembles_expanded_source():
+    intermediate, symtab, length, prog_name, start_addr = Pass1().assemble(SOURCE)
+    assert symtab.symbols["CLOOP"] == 3
+    # STL + 3 x (CLEAR + LDT + 6 format 3 + TIXR) + J
+    assert symtab.symbols["RETADR"] == 3 + 3 * (2 + 4 + 6 * 3 + 2) + 3
+    assert not any(record.opcode in ("MACRO", "MEND") for record in intermediate)
+
+def test_engines_agree_on_macros():
+    expected, pass1 = two_pass(SOURCE)
+    assert OnePass(OpcodeTable(), RegisterTable()).assemble(iter(SOURCE), listing_path=None) == expected
+
+if __name__ == "__main__":
+    test_definitions_removed_and_invocations_expanded()
+    test_expansions_are_memoized()
+    test_defaults_nesting_and_local_labels()
+    test_only_local_labels_are_renamed()
+    test_pass1_assembles_expanded_source()
+    test_engines_agree_on_macros()
+    print("Macro tests passed")
@@ -0,0 +1,60 @@
+# test_objectwriter.py
+import io
+from assembler.objectwriter import ObjectWriter, MAX_TEXT_BYTES
+
+def test_long_runs_split_with_correct_addresses():
+    writer = ObjectWriter()
+    writer.write_header("BIG", 0x1000, 100)
+    writer.add_text_record(0x1000, ["AB" * 100])
+    writer.write_end(0x1000)
+
+    texts = [r for r in writer.generate().split("\n") if r.startswith("T")]
+    assert [r[1:7] for r in texts] == ["001000", "00101E", "00103C", "00105A"]
+    assert [int(r[7:9], 16) for r in texts] == [30, 30, 30, 10]
+    assert sum(len(r) - 9 for r in texts) == 200   # no bytes lost
+
+def test_address_gap_starts_new_record():
+    writer = ObjectWriter()
+    writer.write_header("GAP", 0, 0x20)
+    writer.add_code(0x0000, "172027")
+    writer.add_code(0x0003, "4B2000")
+    writer.add_code(0x0010, b"\x4f\x00\x00")   # after a RESB
+    writer.write_end(0)
+    assert writer.generate().split("\n")[1:3] == ["T000000061720274B2000", "T000010034F0000"]
+
+def test_instructions_are_not_split_across_records():
+    writer = ObjectWriter()
+    writer.write_header("FULL", 0, 0x40)
+    for addr in range(0, 27, 3):
+        writer.add_code(addr, "172027")          # 27 bytes
+    writer.add_code(0x1B, "4B100000")            # would make 31: starts the next record
+    writer.add_code(0x1F, "41" * 40)             # longer than a record: the only kind that is split
+    writer.write_end(0)
+    texts = [r for r in writer.generate().split("\n") if r.startswith("T")]
+    assert [(r[1:7], int(r[7:9], 16)) for r in texts] == [("000000", 27), ("00001B", 4), ("00001F", 30),
+                                                          ("00003D", 10)]
+
+def test_streaming_matches_generate():
+    codes = [(addr, "0F2003") for addr in range(0, 3 * 25, 3)]
+
+    buffered = ObjectWriter()
+    buffered.write_header("COPY", 0, 75)
+    stream = io.StringIO()
+    streamed = ObjectWriter(stream)
+    streamed.write_header("COPY", 0, 75)
+    for writer in (buffered, streamed):
+        for addr, code in codes:
+            writer.add_code(addr, code)
+        writer.add_modification_record(0x10, 5)
+        writer.write_end(0)
+
+    assert stream.getvalue() == buffered.generate()
+    assert streamed.generate() == "" and not streamed.text_records
+    assert all(len(r) <= 9 + 2 * MAX_TEXT_BYTES for r in stream.getvalue().split("\n"))
+
+if __name__ == "__main__":
+    test_long_runs_split_with_correct_addresses()
+    test_address_gap_starts_new_record()
+    test_instructions_are_not_split_across_records()
+    test_streaming_matches_generate()
+    print("ObjectWriter tests passed")
@@ -0,0 +1,92 @@
+# test_onepass.py
+import glob
+from assembler.onepass import OnePass
+from assembler.sections import has_sections, split_sections
+from assembler.tables import OpcodeTable, RegisterTable
+from assembler.twopass import two_pass
+
+SAMPLE = [
+    "COPY    START   1000",
+    "FIRST   STL     RETADR",
+    "CLOOP   JSUB    RDREC",
+    "        LDA     LENGTH",
+    "        COMP    #0",
+    "        JEQ     ENDFIL",
+    "        J       CLOOP",
+    "ENDFIL  LDA     EOF",
+    "        +JSUB   RDREC",
+    "        J       @RETADR",
+    "RDREC   CLEAR   X",
+    "        STCH    BUFFER,X",
+    "        RSUB",
+    "EOF     BYTE    C'EOF'",
+    "RETADR  RESW    1",
+    "LENGTH  RESW    1",
+    "BUFFER  RESB    4096",
+    "        END     FIRST",
+]
+
+def one_pass(lines, listing_path):
+    return OnePass(OpcodeTable(), RegisterTable()).assemble(iter(lines), listing_path=listing_path)
+
+def test_one_pass_matches_two_pass(tmp_path):
+    expected = two_pass(SAMPLE, tmp_path / "two.lst")[0]
+    assert one_pass(SAMPLE, tmp_path / "one.lst") == expected
+    assert (tmp_path / "one.lst").read_text() == (tmp_path / "two.lst").read_text()
+
+def test_one_pass_matches_on_sample_programs(tmp_path):
+    for filename in sorted(glob.glob("test_programs/*.txt")):
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        # Control sections are separate programs to both engines
+        for section in split_sections(lines) if has_sections(lines) else [lines]:
+            assert one_pass(section, tmp_path / "one.lst") == two_pass(section, tmp_path / "two.lst")[0], filename
+
+def test_fixup_chains_are_drained():
+    engine = OnePass(OpcodeTable(), RegisterTable())
+    engine.assemble(iter(SAMPLE), listing_path="/dev/null")
+    assert not engine.fixups and not engine.pending
+
+def test_lines_needing_a_forward_base_wait_for_it():
+    source = [
+        "P       START   0",
+        "T       WORD    7",
+        "        RESB    2500",
+        "        BASE    L-2509",
+        "        LDA     T",        # out of PC range: base-relative once L is known
+        "        STA     L",
+        "L       RESW    1",
+        "        END     P",
+    ]
+    expected = two_pass(source)[0]
+    assert "T0009C706" + "034000" + "0F2000" in expected
+    assert one_pass(source, None) == expected
+
+def test_reachable_lines_after_a_forward_base_are_not_held():
+    source = [
+        "P       START   0",
+        "BACK    WORD    2",
+        "        BASE    TABLE",
+        "        LDA     BACK",
+        "        STA     BACK",
+        "TABLE   RESW    1",
+        "        LDB     #TABLE",
+        "        END     P",
+    ]
+    engine = OnePass(OpcodeTable(), RegisterTable())
+    held = []
+
+    def lines():
+        for line in source:
+            if line.startswith("TABLE"):
+                held.append(len(engine.pending))
+            yield line
+
+    assert engine.assemble(lines(), listing_path=None) == two_pass(source)[0]
+    assert held == [0]
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_one_pass_matches_two_pass(pathlib.Path(tempfile.mkdtemp()))
+    test_fixup_chains_are_drained()
+    print("One-pass tests passed")
@@ -31,7 +31,7 @@ sample_assembly = [
 # Run Pass 1 
 print("Running Pass 1...")
 pass1 = Pass1()
-intermediate, symtab, length = pass1.assemble(sample_assembly)
+intermediate, symtab, length, prog_name, start_addr = pass1.assemble(sample_assembly)
 
 print(f"Pass 1 generated {len(intermediate)} intermediate lines")
 print(f"Symbol table has {len(symtab.symbols)} symbols")
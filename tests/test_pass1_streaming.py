@@ -0,0 +1,32 @@
+# test_pass1_streaming.py
+from assembler.pass1 import Pass1
+
+SOURCE = [
+    ". leading comment is skipped before START",
+    "COPY    START   1000",
+    "FIRST   LDA     FIVE",
+    "",
+    "FIVE    WORD    5",
+    "        END     FIRST",
+]
+
+def test_pass1_consumes_generator():
+    lines = (line for line in SOURCE)
+    intermediate, symtab, length, prog_name, start_addr = Pass1().assemble(lines)
+
+    assert prog_name == "COPY"
+    assert start_addr == 0x1000
+    assert symtab.lookup("FIRST") == 0x1000
+    assert symtab.lookup("FIVE") == 0x1003
+    assert length == 6
+    assert tuple(intermediate[0]) == (0x1000, "COPY", "START", "1000")
+
+def test_pass1_without_start():
+    intermediate, symtab, length, prog_name, start_addr = Pass1().assemble(iter(["LDA FIVE", "FIVE WORD 5"]))
+    assert prog_name == "" and start_addr == 0
+    assert symtab.lookup("FIVE") == 3
+
+if __name__ == "__main__":
+    test_pass1_consumes_generator()
+    test_pass1_without_start()
+    print("Streaming Pass 1 tests passed")
@@ -0,0 +1,44 @@
+# test_relax.py
+from assembler.twopass import two_pass
+
+SOURCE = [
+    "PROG    START   0",
+    "FIRST   {far}LDA    FAR",
+    "        {ldb}LDB    #TABLE",
+    "        BASE    TABLE",
+    "        {edge}J     EDGE",
+    "        STA     NEAR",
+    "        LDA     TABLE+100",
+    "        {literal}LDA    =C'EOF'",
+    "NEAR    RESW    1",
+    "        RESB    {gap}",
+    "EDGE    RSUB",
+    "TABLE   RESB    5000",
+    "FAR     WORD    5",
+    "        END     FIRST",
+]
+
+def assemble(relax=False, **formats):
+    fields = {"far": "", "ldb": "", "edge": "", "literal": "", "gap": 2035, **formats}
+    return two_pass([line.format(**fields) for line in SOURCE], relax=relax)
+
+def test_only_unreachable_lines_are_promoted():
+    relaxed, pass1 = assemble(relax=True)
+    # FAR and the literal are past BASE's reach and TABLE comes before it; J EDGE only
+    # once the literal line has grown (a second round)
+    assert pass1.promoted == 4
+    assert [record.opcode for record in pass1.intermediate if record.size == 4] == ["+LDA", "+LDB", "+J", "+LDA"]
+    assert relaxed == assemble(far="+", ldb="+", edge="+", literal="+")[0]
+
+def test_nothing_to_promote_leaves_the_program_alone(capsys):
+    # Short gap: every line reaches its operand PC- or base-relative
+    assert assemble(relax=True, gap=16, far="+", literal="+")[0] == assemble(gap=16, far="+", literal="+")[0]
+    assert "cannot reach" not in capsys.readouterr().out
+
+def test_unrelaxed_program_warns(capsys):
+    assemble()
+    assert "'LDA FAR' at 0000 cannot reach" in capsys.readouterr().out
+
+if __name__ == "__main__":
+    test_only_unreachable_lines_are_promoted()
+    print("Relaxation tests passed")
@@ -0,0 +1,76 @@
+# test_relocation.py
+from assembler.loader import LinkingLoader
+from assembler.twopass import two_pass
+
+SOURCE = [
+    "COPY    START   {start}",
+    "FIRST   +JSUB   RDREC",
+    "        +LDT    #MAXLEN",
+    "        +LDA    #BUFFER",
+    "        +STA    HERE",
+    "        +LDA    =C'EOF'",
+    "        LDA     LENGTH",
+    "        J       FIRST",
+    "RDREC   RSUB",
+    "LENGTH  WORD    BUFEND-BUFFER",
+    "POINTER WORD    BUFFER+3",
+    "TWICE   WORD    BUFFER+BUFEND",
+    "BUFFER  RESB    16",
+    "BUFEND  EQU     *",
+    "HERE    EQU     BUFFER+2",
+    "MAXLEN  EQU     BUFEND-BUFFER",
+    "        END     FIRST",
+]
+
+def assemble(start=0):
+    return two_pass([line.format(start=f"{start:X}") for line in SOURCE])[0]
+
+def test_address_fields_get_modification_records():
+    records = assemble().split("\n")
+    modifications = [record for record in records if record[0] == "M"]
+    # +JSUB RDREC, +LDA #BUFFER, +STA HERE, the literal, POINTER, and TWICE twice - in address order
+    assert modifications == ["M00000105", "M00000905", "M00000D05", "M00001105", "M00002006",
+                             "M00002306", "M00002306"]
+    assert records[-1] == "E000000" and records[-2] == modifications[-1]
+
+def test_one_object_loads_anywhere():
+    relocatable = assemble(0)
+    for address in (0x1000, 0x2345, 0x8000):
+        moved = LinkingLoader(address).load([relocatable.split("\n")])
+        # Same image as assembling the program at that address in the first place
+        assert moved == LinkingLoader(address).load([assemble(address).split("\n")])
+
+DIRECT = [
+    "JUMP    START   {start}",
+    "        J       GO",
+    "DATA    WORD    7",
+    "        RESB    5000",
+    "GO      LDA     DATA",
+    "        STA     DATA",
+    "ZERO    EQU     0",
+    "        LDX     ZERO",
+    "        END     JUMP",
+]
+
+def assemble_direct(start=0, relax=False):
+    return two_pass([line.format(start=f"{start:X}") for line in DIRECT], relax=relax)[0]
+
+def test_direct_address_of_a_label_warns(capsys):
+    # Out of PC range, but DATA fits 12 bits: a direct address the loader cannot move
+    assert "T00138E09" + "030003" + "0F0003" + "070000" in assemble_direct()
+    out = capsys.readouterr().out
+    assert "'LDA DATA' at 138E addresses 0003 directly, which does not relocate" in out
+    assert "'STA DATA'" in out and "LDX" not in out   # ZERO is absolute: a direct 0 is right
+
+def test_relaxed_direct_address_loads_anywhere():
+    relocatable = assemble_direct(relax=True)
+    assert "M00139005" in relocatable   # +LDA DATA, after +J GO
+    for address in (0x1000, 0x8000):
+        moved = LinkingLoader(address).load([relocatable.split("\n")])
+        assert moved == LinkingLoader(address).load([assemble_direct(address, relax=True).split("\n")])
+
+if __name__ == "__main__":
+    test_address_fields_get_modification_records()
+    test_one_object_loads_anywhere()
+    test_relaxed_direct_address_loads_anywhere()
+    print("Relocation tests passed")
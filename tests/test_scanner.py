@@ -0,0 +1,59 @@
+# test_scanner.py
+from assembler.pass1 import Pass1
+from assembler.scanner import SourceScanner
+
+SOURCE = [
+    "COPY    START   1000",
+    ". a comment line",
+    "",
+    "FIRST   lda     =C'EOF'",
+    "        +JSUB   FIRST",
+    "   .    indented comment",
+    "        RSUB",
+    "LOOP    STA     ALPHA,X   trailing words",
+    "ALPHA   RESW    1",
+    "        END     FIRST",
+]
+
+def scanner(tmp_path, lines, newline="\n"):
+    path = tmp_path / "prog.txt"
+    path.write_bytes(newline.join(lines).encode())
+    return SourceScanner(str(path))
+
+def test_statements_match_split_fields(tmp_path):
+    for newline in ("\n", "\r\n", "\r"):
+        with scanner(tmp_path, SOURCE, newline) as source:
+            scanned = [(str(line), label, opcode, operand) for line, label, opcode, operand in source.statements()]
+            assert scanned == list(Pass1().split_lines(SOURCE))
+            assert list(source) == SOURCE
+    assert scanned[1] == ("FIRST   lda     =C'EOF'", "FIRST", "LDA", "=C'EOF'")
+    assert scanned[4] == ("LOOP    STA     ALPHA,X   trailing words", "LOOP", "STA", "ALPHA,X")
+
+def test_pass1_from_scanner_matches_lines(tmp_path):
+    with scanner(tmp_path, SOURCE) as source:
+        from_map = Pass1().assemble(source)
+        assert not source.has_macros and source.mentions("rsub") and not source.mentions("CSECT")
+    from_lines = Pass1().assemble(SOURCE)
+    assert [tuple(record) for record in from_map[0]] == [tuple(record) for record in from_lines[0]]
+    assert from_map[1].symbols == from_lines[1].symbols and from_map[2:] == from_lines[2:]
+
+def test_macros_go_through_the_expander(tmp_path):
+    lines = ["PROG    START   0", "LOAD    MACRO   &A", "        LDA     &A", "        MEND",
+             "        LOAD    ALPHA", "ALPHA   WORD    1", "        END"]
+    with scanner(tmp_path, lines) as source:
+        assert source.has_macros
+        records = Pass1().assemble(source)[0]
+    assert [record.opcode for record in records] == ["START", "LDA", "WORD", "END"]
+
+def test_empty_file(tmp_path):
+    with scanner(tmp_path, []) as source:
+        assert list(source) == [] and list(source.statements()) == []
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_statements_match_split_fields(pathlib.Path(tmp))
+        test_pass1_from_scanner_matches_lines(pathlib.Path(tmp))
+        test_macros_go_through_the_expander(pathlib.Path(tmp))
+        test_empty_file(pathlib.Path(tmp))
+    print("All scanner tests passed!")
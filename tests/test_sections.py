@@ -0,0 +1,113 @@
+# test_sections.py
+from assembler.sections import split_sections, assemble_sections, has_sections
+from assembler.objectwriter import ObjectWriter
+from assembler.stats import Stats
+from main import assemble_file
+
+SOURCE = [
+    "COPY    START   0",
+    "        EXTDEF  BUFFER,BUFEND,LENGTH",
+    "        EXTREF  RDREC,WRREC",
+    "FIRST   STL     RETADR",
+    "CLOOP   +JSUB   RDREC",
+    "        LDA     LENGTH",
+    "        COMP    #0",
+    "        JEQ     ENDFIL",
+    "        +JSUB   WRREC",
+    "        J       CLOOP",
+    "ENDFIL  LDA     =C'EOF'",
+    "        STA     BUFFER",
+    "        J       @RETADR",
+    "RETADR  RESW    1",
+    "LENGTH  RESW    1",
+    "        LTORG",
+    "BUFFER  RESB    4096",
+    "BUFEND  EQU     *",
+    "RDREC   CSECT",
+    ".       read a record",
+    "        EXTREF  BUFFER,LENGTH,BUFEND",
+    "        CLEAR   X",
+    "        LDT     MAXLEN",
+    "RLOOP   TD      INPUT",
+    "        JEQ     RLOOP",
+    "        +STCH   BUFFER,X",
+    "        TIXR    T",
+    "        JLT     RLOOP",
+    "EXIT    +STX    LENGTH",
+    "        RSUB",
+    "INPUT   BYTE    X'F1'",
+    "MAXLEN  WORD    BUFEND-BUFFER",
+    "WRREC   CSECT",
+    "        EXTREF  LENGTH,BUFFER",
+    "        CLEAR   X",
+    "        +LDT    LENGTH",
+    "WLOOP   TD      =X'05'",
+    "        JEQ     WLOOP",
+    "        RSUB",
+    "        END     FIRST",
+]
+
+def test_split_sections():
+    sections = split_sections(SOURCE)
+    assert has_sections(SOURCE) and not has_sections(SOURCE[:18])
+    assert not has_sections([". one CSECT per routine", "        LDA     #1      . before the CSECT", "        BYTE    C'CSECT'"])
+    assert [section[0].split()[0] for section in sections] == ["COPY", "RDREC", "WRREC"]
+    assert sections[0][-1].split() == ["END", "FIRST"]
+    assert sections[1][-1].split() == ["END"] and sections[2][-1].split() == ["END"]
+
+def test_each_section_gets_its_own_records():
+    records = assemble_sections(SOURCE, jobs=1).split("\n")
+    copy = records[:records.index("E000000") + 1]
+    assert copy[0] == "HCOPY  000000001029"   # LOCCTR restarts at 0 in every section
+    assert copy[1] == "DBUFFER000029BUFEND001029LENGTH000023"
+    assert copy[2] == "RRDREC WRREC "
+    assert "M00000405+RDREC" in copy and "M00001105+WRREC" in copy
+
+    rdrec = records[records.index("HRDREC 00000000001F"):]
+    assert rdrec[1] == "RBUFFERLENGTHBUFEND"
+    assert "M00000C05+BUFFER" in rdrec and "M00001505+LENGTH" in rdrec
+    # WORD BUFEND-BUFFER: both names are fixed up by the loader
+    assert "M00001C06+BUFEND" in rdrec and "M00001C06-BUFFER" in rdrec
+    assert rdrec[rdrec.index("M00001C06-BUFFER") + 1] == "E"
+
+    assert records[-1] == "E" and "HWRREC 000000000010" in records
+    assert "M00000305+LENGTH" in records
+
+def test_parallel_matches_serial(tmp_path):
+    serial = assemble_sections(SOURCE, tmp_path / "serial.lst", jobs=1)
+    assert assemble_sections(SOURCE, tmp_path / "parallel.lst", jobs=3) == serial
+    assert (tmp_path / "parallel.lst").read_text() == (tmp_path / "serial.lst").read_text()
+
+def test_sections_refuse_one_pass_and_stats(tmp_path, capsys):
+    path = tmp_path / "copy.asm"
+    path.write_text("\n".join(SOURCE) + "\n")
+    assert not assemble_file(str(path), None, one_pass=True)
+    assert "--one-pass does not support control sections (CSECT)" in capsys.readouterr().out
+    assert not assemble_file(str(path), None, stats=Stats())
+    assert "--stats does not support control sections (CSECT)" in capsys.readouterr().out
+
+def test_word_csect_alone_is_not_a_section(tmp_path):
+    path = tmp_path / "plain.asm"
+    path.write_text("PLAIN   START   0\n. not a CSECT\n        LDA     #1\nNAME    BYTE    C'CSECT'\n        END\n")
+    stats = Stats()
+    assert assemble_file(str(path), None, quiet=True, one_pass=True, stats=stats)
+    assert list(stats.phases) == ["one_pass"]   # not routed to assembler.sections
+    assert (tmp_path / "plain.obj").read_text().startswith("HPLAIN ")
+
+def test_define_and_refer_records_are_split():
+    writer = ObjectWriter()
+    writer.add_define_records([(f"S{i}", i) for i in range(8)])
+    writer.add_refer_records([f"R{i}" for i in range(13)])
+    writer.write_header("P", 0, 0)
+    writer.write_end(None)
+    records = writer.generate().split("\n")
+    assert records[1] == "D" + "".join(f"S{i}    {i:06X}" for i in range(6))
+    assert records[2] == "DS6    000006S7    000007"
+    assert records[3] == "R" + "".join(f"R{i}".ljust(6) for i in range(12))
+    assert records[4] == "RR12   " and records[-1] == "E"
+
+if __name__ == "__main__":
+    test_split_sections()
+    test_each_section_gets_its_own_records()
+    test_define_and_refer_records_are_split()
+    print("Control section tests passed")
@@ -0,0 +1,81 @@
+# test_server.py
+import asyncio
+import subprocess
+import sys
+import threading
+import pytest
+from assembler.protocol import request_all
+from assembler.server import AssemblerServer, assemble_source
+from assembler.twopass import two_pass
+
+SOURCE = "\n".join([
+    "COPY    START   1000",
+    "FIRST   LDA     =C'EOF'",
+    "        +JSUB   FIRST",
+    "        STA     ALPHA",
+    "ALPHA   RESW    1",
+    "        END     FIRST",
+])
+
+@pytest.fixture(scope="module")
+def socket_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("server") / "asm.sock")
+    server = AssemblerServer(path, jobs=2)
+    ready = threading.Event()
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve(ready.set)), daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    yield path
+    request_all([{"op": "shutdown"}], path)
+    thread.join(10)
+
+def assembled(source):
+    return two_pass(source.splitlines())[0]
+
+def test_worker_captures_listing_and_diagnostics():
+    result = assemble_source(SOURCE)
+    assert result["ok"] and result["object"] == assembled(SOURCE)
+    assert "=C'EOF'" in result["listing"] and result["diagnostics"] == ""
+    bad = assemble_source(SOURCE.replace("STA     ALPHA", "FROB    ALPHA"), listing=False)
+    assert bad["listing"] == "" and "Unknown operation" in bad["diagnostics"]
+    sections = assemble_source(SOURCE.replace("        END     FIRST", "OTHER   CSECT\n        RSUB\n        END"),
+                               one_pass=True)
+    assert not sections["ok"] and "one_pass does not support control sections" in sections["diagnostics"]
+
+def test_daemon_assembles_sources_and_paths(socket_path, tmp_path):
+    path = tmp_path / "copy.txt"
+    path.write_text(SOURCE)
+    by_source, by_path, one_pass = request_all([
+        {"source": SOURCE}, {"path": str(path)}, {"source": SOURCE, "one_pass": True}], socket_path)
+    assert by_source["object"] == by_path["object"] == one_pass["object"] == assembled(SOURCE)
+    assert by_path["cached"] and not one_pass["cached"]   # same text and options as the first request
+
+def test_many_requests_on_one_connection(socket_path):
+    sources = [SOURCE.replace("1000", f"{i:X}") for i in range(200)]
+    responses = request_all([{"source": source, "listing": False} for source in sources], socket_path)
+    assert [response["object"] for response in responses] == [assembled(source) for source in sources]
+
+def test_daemon_takes_relax_and_auto_base(socket_path):
+    far = SOURCE.replace("ALPHA   RESW    1", "        RESB    4000\nALPHA   RESW    1")
+    plain, relaxed, based, refused = request_all([
+        {"source": far}, {"source": far, "relax": True}, {"source": far, "auto_base": True},
+        {"source": far, "relax": True, "one_pass": True}], socket_path)
+    assert "cannot reach" in plain["diagnostics"] and "cannot reach" not in relaxed["diagnostics"]
+    assert based["object"] == relaxed["object"]   # two far references: an LDB would not pay off
+    assert not refused["ok"] and "one_pass" in refused["diagnostics"]
+
+def test_client_imports_only_the_standard_library():
+    loaded = subprocess.run([sys.executable, "-c", "import sys, client; print(sorted(sys.modules))"],
+                            capture_output=True, text=True, check=True).stdout
+    assert "numpy" not in loaded and "asyncio" not in loaded and "assembler.pass1" not in loaded
+
+def test_bad_requests_get_errors(socket_path, tmp_path):
+    unknown, missing, no_source = request_all([
+        {"op": "reload"}, {"path": str(tmp_path / "missing.txt")}, {"op": "assemble"}], socket_path)
+    assert not (unknown["ok"] or missing["ok"] or no_source["ok"])
+    assert "reload" in unknown["error"] and "source" in no_source["error"]
+    assert request_all([{"op": "ping"}], socket_path)[0]["ok"]   # still serving
+
+if __name__ == "__main__":
+    test_worker_captures_listing_and_diagnostics()
+    print("All server tests passed!")
@@ -0,0 +1,74 @@
+# test_stats.py
+import io
+import json
+import os
+from assembler.stats import Stats
+from assembler.twopass import two_pass
+from main import assemble_file
+
+SOURCE = [
+    "COPY    START   1000",
+    "FIRST   LDA     ALPHA",
+    "        +JSUB   FIRST",
+    "        CLEAR   X",
+    "        FIX",
+    "        LDA     =C'EOF'",
+    "        LDT     #3",
+    "ALPHA   WORD    5",
+    "        END     FIRST",
+]
+
+def assemble(stats, stream=None):
+    return two_pass(SOURCE, stream=stream, stats=stats)[0]
+
+def test_counters_cover_encoder_and_writer():
+    stats = Stats()
+    assemble(stats)
+    counters = stats.counters
+    assert (counters["format1"], counters["format2"], counters["format3"], counters["format4"]) == (1, 1, 3, 1)
+    assert counters["data"] == 2   # WORD and the literal pool
+    assert counters["symbol_hits"] == 2 and counters["symbol_misses"] == 3   # =C'EOF' twice, and 3
+    assert counters["H_records"] == counters["E_records"] == counters["T_records"] == 1
+    streamed = Stats()
+    assemble(streamed, io.StringIO())
+    assert {kind: n for kind, n in streamed.counters.items() if kind.endswith("_records")} == \
+        {kind: n for kind, n in counters.items() if kind.endswith("_records")}
+    assert set(stats.timers) == {"encode", "objectwriter"}   # no listing path, no listing
+
+def test_instrumentation_does_not_change_output():
+    assert assemble(Stats()) == assemble(None)
+
+def test_phases_and_hooks():
+    stats = Stats(memory=True)
+    seen = []
+    stats.add_hook(lambda phase, result: seen.append((phase, result["lines"])))
+    with stats.phase("pass1", lines=3) as result:
+        [0] * 10000
+    with stats.phase("pass2") as result:
+        result["lines"] = 7
+    assert seen == [("pass1", 3), ("pass2", 7)]
+    assert stats.phases["pass1"]["peak_kib"] > 0 and stats.phases["pass2"]["seconds"] >= 0
+    report = json.loads(stats.to_json())
+    assert set(report) == {"phases", "seconds_in", "counters"}
+
+def test_memory_is_opt_in():
+    stats = Stats()
+    with stats.phase("pass1"):
+        [0] * 10000
+    assert stats.phases["pass1"]["peak_kib"] is None
+
+def test_assemble_file_records_phases(tmp_path):
+    path = tmp_path / "copy.asm"
+    path.write_text("\n".join(SOURCE) + "\n")
+    stats = Stats()
+    assert assemble_file(str(path), None, quiet=True, stats=stats)
+    assert list(stats.phases) == ["pass1", "pass2"]
+    assert stats.phases["pass1"]["lines"] == stats.phases["pass2"]["lines"] == len(SOURCE) + 1   # and the literal pool
+    assert os.path.exists(tmp_path / "copy.obj")
+
+if __name__ == "__main__":
+    test_counters_cover_encoder_and_writer()
+    test_instrumentation_does_not_change_output()
+    test_phases_and_hooks()
+    test_memory_is_opt_in()
+    print("All stats tests passed!")
@@ -0,0 +1,37 @@
+# test_tables.py
+import pytest
+from assembler.tables import INSTRUCTION_TABLE, OPTAB, OpcodeTable
+from assembler.pass2 import Pass2
+from assembler.tables import SymbolTable
+
+def test_single_immutable_table():
+    assert len(INSTRUCTION_TABLE) == 59
+    with pytest.raises(TypeError):
+        INSTRUCTION_TABLE["NEW"] = None
+    jsub = INSTRUCTION_TABLE["JSUB"]
+    assert jsub.opcode == 0x48 and jsub.format == 3
+    assert jsub.first_bytes == (0x48, 0x49, 0x4A, 0x4B)
+    assert OPTAB.lookup("JSUB") is jsub
+
+def test_legacy_views():
+    optab = OpcodeTable()
+    assert optab.get("LDA") == ("00", 3)
+    assert optab.get("+JSUB") == ("48", 4)
+    assert optab.get("RESW") == (None, 0)
+    assert optab.get("FIX") == ("C4", 1)    # missing from the old OpcodeTable
+    assert optab.get("BOGUS") is None
+
+def test_instructions_outside_old_tables_encode():
+    symtab = SymbolTable()
+    symtab.add("VALUE", 0x0030)
+    pass2 = Pass2(symtab)
+    assert pass2.generate_object_code("FIX", "", 0) == "C4"
+    assert pass2.generate_object_code("RMO", "A,S", 0) == "AC04"
+    assert pass2.generate_object_code("STSW", "VALUE", 0) == "EB202D"
+    assert pass2.generate_object_code("+LDB", "#VALUE", 0) == "69100030"
+
+if __name__ == "__main__":
+    test_single_immutable_table()
+    test_legacy_views()
+    test_instructions_outside_old_tables_encode()
+    print("Table tests passed")
@@ -0,0 +1,58 @@
+# test_tokenizer.py
+import glob
+from assembler.parser import split_statement, split_fields
+from assembler.scanner import SourceScanner
+from benchmarks.generator import generate_program
+
+def test_comment_fields():
+    assert split_statement("FIRST   STL     RETADR      SAVE RETURN ADDRESS") == (
+        "FIRST", "STL", "RETADR", "SAVE RETURN ADDRESS")
+    assert split_statement("        LDA\t#3\t.load three") == ("", "LDA", "#3", ".load three")
+    assert split_statement(". a full comment line") == ("", "", "", ". a full comment line")
+    assert split_statement("   .indented comment") == ("", "", "", ".indented comment")
+    assert split_statement("") == ("", "", "", "")
+
+def test_operations_without_operands():
+    assert split_statement("        RSUB        RETURN TO CALLER") == ("", "RSUB", "", "RETURN TO CALLER")
+    assert split_statement("EXIT    RSUB") == ("EXIT", "RSUB", "", "")
+    assert split_statement("RDREC   CSECT") == ("RDREC", "CSECT", "", "")
+    assert split_statement("        FIX     then float") == ("", "FIX", "", "then float")
+    assert split_statement("        LTORG") == ("", "LTORG", "", "")
+
+def test_labels_only_in_column_one():
+    assert split_fields("LOOP    STA     ALPHA,X") == ("LOOP", "STA", "ALPHA,X")
+    assert split_fields("        STA     ALPHA,X   trailing words") == ("", "STA", "ALPHA,X")
+    assert split_fields("STA ALPHA") == ("", "STA", "ALPHA")        # stripped, as macro bodies are
+    assert split_fields("+jsub   RDREC") == ("", "+JSUB", "RDREC")
+    assert split_fields("        RDBUFF  F1,BUFFER") == ("", "RDBUFF", "F1,BUFFER")   # macro call
+    assert split_fields("RDBUFF  F1,BUFFER") == ("", "RDBUFF", "F1,BUFFER")
+    assert split_fields("RDBUFF  MACRO   &INDEV,&BUFADR") == ("RDBUFF", "MACRO", "&INDEV,&BUFADR")
+
+def test_quoted_operands_keep_spaces():
+    assert split_statement("EOF     BYTE    C'E O F'  end marker") == ("EOF", "BYTE", "C'E O F'", "end marker")
+    assert split_statement("        LDA     =C'A.B'") == ("", "LDA", "=C'A.B'", "")
+
+def test_scanner_agrees_with_split_statement():
+    for path in sorted(glob.glob("examples/*.txt") + glob.glob("test_programs/*.txt")):
+        with open(path) as f:
+            expected = [split_statement(line)[:3] for line in f if split_statement(line)[1]]
+        with SourceScanner(path) as source:
+            assert [fields for _, *fields in source.statements()] == [list(fields) for fields in expected], path
+
+def test_plain_line_fast_path_matches_the_pattern():
+    lines = generate_program(2000, seed=3)
+    for path in sorted(glob.glob("examples/*.txt") + glob.glob("test_programs/*.txt")):
+        with open(path) as f:
+            lines += f.read().splitlines()
+    lines += ["", "   ", "\tLDA\tALPHA", "EXIT    RSUB    back to caller", "LOOP    TIXR    T  x y z"]
+    for line in lines:
+        assert split_fields(line) == split_statement(line)[:3], line
+
+if __name__ == "__main__":
+    test_comment_fields()
+    test_operations_without_operands()
+    test_labels_only_in_column_one()
+    test_quoted_operands_keep_spaces()
+    test_scanner_agrees_with_split_statement()
+    test_plain_line_fast_path_matches_the_pattern()
+    print("All tokenizer tests passed!")
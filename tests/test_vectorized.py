@@ -0,0 +1,59 @@
+# test_vectorized.py
+import random
+import pytest
+from assembler.pass1 import Pass1
+from assembler.pass2 import Pass2
+from assembler.twopass import two_pass
+
+np = pytest.importorskip("numpy")
+from assembler.vectorized import encode_format3_4
+
+def synthetic_program(count, seed=335):
+    rng = random.Random(seed)
+    lines = ["SYN START 1000"]
+    labels = [f"L{i}" for i in range(count)]
+    for i in range(count):
+        target = rng.choice(labels) if rng.random() < 0.9 else rng.choice(["#5", "#4095"])
+        mnemonic = rng.choice(["LDA", "STA", "JEQ", "LDX", "COMP", "+LDA", "+JSUB", "CLEAR", "RMO"])
+        if mnemonic == "CLEAR":
+            lines.append(f"{labels[i]} CLEAR X")
+        elif mnemonic == "RMO":
+            lines.append(f"{labels[i]} RMO A,S")
+        elif not target.startswith("#") and rng.random() < 0.3:
+            lines.append(f"{labels[i]} {mnemonic} {target},X")
+        else:
+            prefix = "@" if not target.startswith("#") and rng.random() < 0.2 else ""
+            lines.append(f"{labels[i]} {mnemonic} {prefix}{target}")
+        if rng.random() < 0.05:
+            lines.append(f"PAD{i} RESB {rng.randint(1, 3000)}")
+    lines.append("END L0")
+    return lines
+
+@pytest.mark.parametrize("base_value", [None, 0x1800])
+def test_batch_encoder_matches_scalar(base_value):
+    pass1 = Pass1()
+    intermediate, symtab, length, prog_name, start_addr = pass1.assemble(synthetic_program(2000), vectorized=True)
+    pass2 = Pass2(symtab)
+    pass2.base_value = base_value
+
+    batch = encode_format3_4(pass2, pass1.columns)
+    assert batch == [pass2.encode(record) for record in intermediate if record.format == 3]
+
+def test_vectorized_assemble_matches_scalar():
+    lines = synthetic_program(500, seed=1)
+    lines[5:5] = ["BASE L300", "LDB #L300", "USE DATA", "D1 LDA L4", "D2 +STA D1,X", "USE", "NOBASE", "RSUB"]
+    assert two_pass(lines, vectorized=True)[0] == two_pass(lines)[0]
+    assert two_pass(lines, vectorized=True, relax=True)[0] == two_pass(lines, relax=True)[0]
+
+def test_columns_follow_relocated_blocks():
+    pass1 = Pass1()
+    pass1.assemble(["P START 100", "USE DATA", "A LDA B", "USE", "B RSUB", "END"], vectorized=True)
+    assert list(pass1.columns.locctrs) == [0x103, 0x100]   # DATA follows the default block
+    assert [record.locctr for record in pass1.columns.records] == list(pass1.columns.locctrs)
+
+if __name__ == "__main__":
+    test_batch_encoder_matches_scalar(None)
+    test_batch_encoder_matches_scalar(0x1800)
+    test_vectorized_assemble_matches_scalar()
+    test_columns_follow_relocated_blocks()
+    print("Vectorized encoder tests passed")